@@ -0,0 +1,197 @@
+"""
+Fake MetaTrader5 module for benchmarks and tests.
+
+Put `backend/bench/fakes` on sys.path (before the real package, if installed)
+and `import MetaTrader5` resolves here. Collector workers are separate
+processes, so behaviour is configured through environment variables:
+
+    FAKE_MT5_LATENCY_MS     base latency of every call          (default 20)
+    FAKE_MT5_JITTER_MS      uniform extra latency               (default 5)
+    FAKE_MT5_FAILURE_RATE   probability a call fails, 0..1      (default 0)
+    FAKE_MT5_POSITIONS      open positions per account          (default 2)
+    FAKE_MT5_SEED           RNG seed                            (default 0)
+    FAKE_MT5_DEALS_PER_DAY  closed deals per account per day    (default 24)
+    FAKE_MT5_HANG_TERMINALS comma-separated terminal paths whose calls hang
+    FAKE_MT5_HANG_RATE      probability a call hangs, 0..1      (default 0)
+
+`history_deals_get` serves a deterministic synthetic deal history per login
+(the same deals whatever the requested window), so chunked backfills can be
+checked against one big request.
+"""
+import os
+import random
+import time
+from collections import namedtuple
+from datetime import datetime
+
+AccountInfo = namedtuple(
+    "AccountInfo",
+    "login balance equity margin margin_free margin_level profit currency server",
+)
+TradePosition = namedtuple(
+    "TradePosition",
+    "ticket time type magic volume price_open sl tp price_current swap profit symbol comment",
+)
+
+_LATENCY = float(os.getenv("FAKE_MT5_LATENCY_MS", "20")) / 1000.0
+_JITTER = float(os.getenv("FAKE_MT5_JITTER_MS", "5")) / 1000.0
+_FAILURE_RATE = float(os.getenv("FAKE_MT5_FAILURE_RATE", "0"))
+_POSITIONS = int(os.getenv("FAKE_MT5_POSITIONS", "2"))
+_DEALS_PER_DAY = int(os.getenv("FAKE_MT5_DEALS_PER_DAY", "24"))
+_HANG_TERMINALS = {t for t in os.getenv("FAKE_MT5_HANG_TERMINALS", "").split(",") if t}
+_HANG_RATE = float(os.getenv("FAKE_MT5_HANG_RATE", "0"))
+_rng = random.Random(int(os.getenv("FAKE_MT5_SEED", "0")) ^ os.getpid())
+
+TradeDeal = namedtuple(
+    "TradeDeal",
+    "ticket order time time_msc type entry magic position_id reason volume price "
+    "commission swap profit fee symbol comment external_id",
+)
+
+DEAL_TYPE_BUY, DEAL_TYPE_SELL, DEAL_TYPE_BALANCE = 0, 1, 2
+DEAL_ENTRY_IN, DEAL_ENTRY_OUT = 0, 1
+
+_terminal = None
+_login = None
+_last_error = (1, "Success")
+
+
+def _call() -> bool:
+    """Simulate latency; returns False when this call should fail."""
+    global _last_error
+    time.sleep(_LATENCY + _rng.uniform(0, _JITTER))
+    if _terminal in _HANG_TERMINALS or (_HANG_RATE and _rng.random() < _HANG_RATE):
+        while True:  # a wedged terminal never returns
+            time.sleep(3600)
+    if _FAILURE_RATE and _rng.random() < _FAILURE_RATE:
+        _last_error = (-10005, "IPC timeout (fake)")
+        return False
+    _last_error = (1, "Success")
+    return True
+
+
+def initialize(path=None, **kwargs) -> bool:
+    global _terminal, _login
+    if not _call():
+        return False
+    _terminal, _login = path, None
+    return True
+
+
+def shutdown():
+    global _terminal, _login
+    _terminal, _login = None, None
+    return True
+
+
+def login(login, password=None, server=None, **kwargs) -> bool:
+    global _login
+    if _terminal is None:
+        return False
+    if not _call():
+        return False
+    _login = int(login)
+    return True
+
+
+def last_error():
+    return _last_error
+
+
+def _equity(login: int, now: float) -> float:
+    # deterministic per-login random walk: a slow wave plus a per-second wiggle
+    base = 10_000.0 + (login % 50) * 1_000.0
+    return round(base * (1 + 0.01 * ((now / 60 + login) % 2 - 1)) + (int(now) % 7), 2)
+
+
+def account_info():
+    if _login is None or not _call():
+        return None
+    now = time.time()
+    equity = _equity(_login, now)
+    balance = 10_000.0 + (_login % 50) * 1_000.0
+    margin = 100.0 * _POSITIONS
+    return AccountInfo(
+        login=_login,
+        balance=balance,
+        equity=equity,
+        margin=margin,
+        margin_free=equity - margin,
+        margin_level=(equity / margin * 100.0) if margin else 0.0,
+        profit=round(equity - balance, 2),
+        currency="USD",
+        server="Fake-Server",
+    )
+
+
+def positions_get(**kwargs):
+    if _login is None or not _call():
+        return None
+    now = time.time()
+    out = []
+    for i in range(_POSITIONS):
+        price = 1.1 + i * 0.01
+        out.append(TradePosition(
+            ticket=_login * 100 + i,
+            time=int(now) - 3600,
+            type=i % 2,
+            magic=1000 + i,
+            volume=0.1 * (i + 1),
+            price_open=price,
+            sl=0.0,
+            tp=0.0,
+            price_current=round(price + 0.0001 * (int(now) % 10), 5),
+            swap=0.0,
+            profit=round(10.0 * ((int(now) + i) % 5 - 2), 2),
+            symbol="EURUSD",
+            comment="fake",
+        ))
+    return tuple(out)
+
+
+def _ts(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+def _deal(login: int, slot: int, slot_seconds: float) -> TradeDeal:
+    # the same (login, slot) always gives the same deal
+    rng = random.Random(login * 1_000_003 + slot)
+    t = slot * slot_seconds + rng.uniform(0, slot_seconds)
+    kind = rng.randrange(2)
+    profit = round(rng.gauss(5.0, 60.0), 2)
+    return TradeDeal(
+        ticket=login * 10_000_000 + slot % 10_000_000,
+        order=0,
+        time=int(t),
+        time_msc=int(t * 1000),
+        type=kind,
+        entry=DEAL_ENTRY_OUT,
+        magic=1000,
+        position_id=slot,
+        reason=0,
+        volume=0.1,
+        price=1.1,
+        commission=-0.7,
+        swap=round(rng.uniform(-1.0, 0.0), 2),
+        profit=profit,
+        fee=0.0,
+        symbol="EURUSD",
+        comment="fake",
+        external_id="",
+    )
+
+
+def history_deals_get(date_from=None, date_to=None, **kwargs):
+    """Closing deals of the logged-in account in [date_from, date_to], oldest first."""
+    if _login is None or not _call():
+        return None
+    if not _DEALS_PER_DAY:
+        return ()
+    t0, t1 = _ts(date_from), _ts(date_to)
+    slot_seconds = 86400.0 / _DEALS_PER_DAY
+    out = []
+    for slot in range(int(t0 // slot_seconds), int(t1 // slot_seconds) + 1):
+        d = _deal(_login, slot, slot_seconds)
+        if t0 <= d.time <= t1:
+            out.append(d)
+    return tuple(out)
@@ -0,0 +1,370 @@
+"""
+Local stand-in for the Supabase PostgREST surface the backend and tools use.
+
+Serves /rest/v1/<table> with the subset of PostgREST the code relies on:
+`select=`, `col=eq./neq./gt./gte./lt./lte./in.(...)` filters (and `not.`
+of any of them, and `or=(...)` with nested `and(...)`), `order=`,
+`limit=`/`offset=` (or a `Range:` header), POST inserts (with
+`Prefer: resolution=ignore-duplicates|merge-duplicates` + `on_conflict=` for
+upserts) and filtered DELETEs. Plain inserts into SERIAL_TABLES get an `id`
+like a bigserial primary key.
+Anything talking PostgREST over HTTP (supabase-py, a raw httpx client) can be
+pointed at it via SUPABASE_URL.
+"""
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlparse
+
+GROUPS = ("E2T Demos", "Nish Algos")
+SERIAL_TABLES = {"equity_snapshots"}
+
+# A service-role-shaped key: supabase-py only checks it looks like a JWT
+FAKE_KEY = "fake.service.role"
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+class StubData:
+    """
+    Synthetic tables for `accounts` accounts. `latest_equity_snapshots` is
+    computed on read as if a writer refreshed every `write_interval` seconds.
+    """
+
+    def __init__(self, accounts: int, *, first_login: int = 50_000_000, write_interval: float = 2.0,
+                 history_seconds: float = 0.0, seed: int = 0):
+        self.write_interval = write_interval
+        self.lock = threading.Lock()
+        rng = random.Random(seed)
+        self.tables: Dict[str, List[dict]] = {}
+
+        accs = []
+        for i in range(accounts):
+            accs.append({
+                "id": f"00000000-0000-0000-0000-{i:012d}",
+                "name": f"Account {i:04d}",
+                "broker": "Fake-Server",
+                "mt5_login": first_login + i,
+                "base_currency": "USD",
+                "account_size": 100_000,
+                "group_name": GROUPS[i % len(GROUPS)],
+            })
+        self.tables["accounts"] = [{k: v for k, v in a.items() if k != "group_name"} for a in accs]
+        self.tables["v_accounts_with_group"] = accs
+        self.tables["account_groups"] = [{"name": g, "sort_index": n + 1} for n, g in enumerate(GROUPS)]
+        self.tables["v_account_counts_by_group"] = [
+            {"group_name": g, "account_count": sum(1 for a in accs if a["group_name"] == g)} for g in GROUPS
+        ]
+
+        rows: List[dict] = []
+        if history_seconds > 0:
+            now = time.time()
+            steps = int(history_seconds / write_interval)
+            for a in accs:
+                eq = 100_000.0
+                for k in range(steps):
+                    eq += rng.gauss(0, 25)
+                    rows.append({
+                        "account_id": a["id"],
+                        "timestamp": _iso(now - (steps - k) * write_interval),
+                        "balance": 100_000.0,
+                        "equity": round(eq, 2),
+                        "margin": 0.0,
+                        "free_margin": round(eq, 2),
+                        "profit": round(eq - 100_000.0, 2),
+                        "net_return_pct": round((eq - 100_000.0) / 1000.0, 4),
+                    })
+        for i, r in enumerate(rows, 1):
+            r["id"] = i
+        self.tables["equity_snapshots"] = rows
+        self._rng = rng
+
+    def latest(self) -> List[dict]:
+        tick = int(time.time() / self.write_interval)
+        ts = _iso(tick * self.write_interval)
+        out = []
+        for i, a in enumerate(self.tables["accounts"]):
+            eq = 100_000.0 + ((tick + i) % 11 - 5) * 10.0
+            out.append({
+                "account_id": a["id"],
+                "balance": 100_000.0,
+                "equity": eq,
+                "margin": 0.0,
+                "free_margin": eq,
+                "profit": eq - 100_000.0,
+                "net_return_pct": (eq - 100_000.0) / 1000.0,
+                "timestamp": ts,
+            })
+        return out
+
+    def rows(self, table: str) -> List[dict]:
+        if table == "latest_equity_snapshots":
+            return self.latest()
+        with self.lock:
+            return list(self.tables.get(table, []))
+
+
+def _coerce(v: Any) -> Any:
+    return v if isinstance(v, str) else json.dumps(v) if isinstance(v, (dict, list)) else str(v)
+
+
+def _matches(row: dict, col: str, op: str, arg: str) -> bool:
+    v = row.get(col)
+    if op == "is":
+        return (v is None) if arg == "null" else str(v).lower() == arg
+    if v is None:
+        return False
+    left = _coerce(v)
+    if op == "in":
+        return left in {x.strip().strip('"') for x in arg.strip("()").split(",")}
+    try:
+        lf, rf = float(left), float(arg)
+        left_cmp, right_cmp = lf, rf
+    except ValueError:
+        left_cmp, right_cmp = left, arg
+    return {
+        "eq": left_cmp == right_cmp,
+        "neq": left_cmp != right_cmp,
+        "gt": left_cmp > right_cmp,
+        "gte": left_cmp >= right_cmp,
+        "lt": left_cmp < right_cmp,
+        "lte": left_cmp <= right_cmp,
+    }.get(op, False)
+
+
+def _split_terms(body: str) -> List[str]:
+    """Top-level comma-separated terms of an or=(...) / and(...) body."""
+    terms, depth, quoted, cur = [], 0, False, ""
+    for ch in body:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in "()":
+            depth += 1 if ch == "(" else -1
+        elif not quoted and ch == "," and depth == 0:
+            terms.append(cur)
+            cur = ""
+            continue
+        cur += ch
+    return terms + [cur] if cur else terms
+
+
+def _term_matches(row: dict, term: str) -> bool:
+    """One PostgREST logic term: and(...), or(...) or col.op.value (value optionally quoted)."""
+    for logic, combine in (("and(", all), ("or(", any)):
+        if term.startswith(logic):
+            return combine(_term_matches(row, t) for t in _split_terms(term[len(logic):-1]))
+    col, op, arg = term.split(".", 2)
+    if len(arg) >= 2 and arg[0] == arg[-1] == '"':
+        arg = arg[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return _filter_matches(row, col, op, arg)
+
+
+def _filter_matches(row: dict, col: str, op: str, arg: str) -> bool:
+    if op == "not":
+        op, arg = arg.split(".", 1)
+        return not _matches(row, col, op, arg)
+    return _matches(row, col, op, arg)
+
+
+def query(rows: List[dict], params: List[tuple], range_header: Optional[str]) -> List[dict]:
+    select, order, limit, offset = "*", None, None, 0
+    for key, value in params:
+        if key == "select":
+            select = value
+        elif key == "order":
+            order = value
+        elif key == "limit":
+            limit = int(value)
+        elif key == "offset":
+            offset = int(value)
+        elif key in ("on_conflict", "columns"):
+            continue
+        elif key == "or":
+            rows = [r for r in rows if _term_matches(r, "or" + value)]
+        elif "." in value:
+            op, arg = value.split(".", 1)
+            rows = [r for r in rows if _filter_matches(r, key, op, arg)]
+
+    if order:
+        # like Postgres, rows that tie on `order` come back in no particular order
+        rows = random.sample(rows, len(rows))
+        for part in reversed(order.split(",")):
+            bits = part.split(".")
+            desc = "desc" in bits[1:]
+            rows.sort(key=lambda r: (r.get(bits[0]) is None, r.get(bits[0])), reverse=desc)
+
+    if range_header and "-" in range_header:
+        a, b = range_header.split("-", 1)
+        offset, limit = int(a), int(b) - int(a) + 1
+    rows = rows[offset:offset + limit] if limit is not None else rows[offset:]
+
+    if select and select != "*":
+        cols = [c.strip() for c in select.split(",")]
+        rows = [{c: r.get(c) for c in cols} for r in rows]
+    return rows
+
+
+def make_handler(data: StubData, latency: Callable[[], float]):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: Any, extra: Optional[Dict[str, str]] = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (extra or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _table(self) -> Optional[str]:
+            path = urlparse(self.path).path
+            prefix = "/rest/v1/"
+            return path[len(prefix):] if path.startswith(prefix) else None
+
+        def do_GET(self):
+            delay = latency()
+            if delay:
+                time.sleep(delay)
+            table = self._table()
+            if table is None:
+                self._send(404, {"message": "not found"})
+                return
+            params = parse_qsl(urlparse(self.path).query, keep_blank_values=True)
+            rows = query(data.rows(table), params, self.headers.get("Range"))
+            accept = self.headers.get("Accept", "")
+            if "vnd.pgrst.object" in accept:
+                if len(rows) != 1:
+                    self._send(406, {"message": "JSON object requested, multiple (or no) rows returned"})
+                    return
+                self._send(200, rows[0])
+                return
+            self._send(200, rows, {"Content-Range": f"0-{max(0, len(rows) - 1)}/*"})
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_POST(self):
+            delay = latency()
+            if delay:
+                time.sleep(delay)
+            table = self._table()
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"[]")
+            new_rows = payload if isinstance(payload, list) else [payload]
+            params = dict(parse_qsl(urlparse(self.path).query))
+            prefer = self.headers.get("Prefer", "")
+            conflict = [c for c in params.get("on_conflict", "").split(",") if c]
+
+            with data.lock:
+                rows = data.tables.setdefault(table, [])
+                if conflict and "merge-duplicates" in prefer:
+                    at = {tuple(_coerce(r.get(c)) for c in conflict): i for i, r in enumerate(rows)}
+                    fresh = []
+                    for r in new_rows:
+                        k = tuple(_coerce(r.get(c)) for c in conflict)
+                        if k in at:
+                            rows[at[k]] = {**rows[at[k]], **r}
+                        else:
+                            at[k] = len(rows) + len(fresh)
+                            fresh.append(r)
+                    rows.extend(fresh)
+                elif conflict and "ignore-duplicates" in prefer:
+                    seen = {tuple(_coerce(r.get(c)) for c in conflict) for r in rows}
+                    fresh = []
+                    for r in new_rows:
+                        k = tuple(_coerce(r.get(c)) for c in conflict)
+                        if k not in seen:
+                            seen.add(k)
+                            fresh.append(r)
+                    new_rows = fresh
+                    rows.extend(new_rows)
+                else:
+                    if table in SERIAL_TABLES:
+                        serial = max((int(r.get("id") or 0) for r in rows), default=0)
+                        for r in new_rows:
+                            if r.get("id") is None:
+                                serial += 1
+                                r["id"] = serial
+                    rows.extend(new_rows)
+            if "return=minimal" in prefer:
+                self.send_response(201)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send(201, new_rows)
+
+        def do_DELETE(self):
+            table = self._table()
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))  # keep the connection reusable
+            params = parse_qsl(urlparse(self.path).query, keep_blank_values=True)
+            with data.lock:
+                rows = data.tables.get(table, [])
+                gone = query(list(rows), [p for p in params if p[0] != "select"], None)
+                ids = {id(r) for r in gone}
+                data.tables[table] = [r for r in rows if id(r) not in ids]
+            if "return=minimal" in self.headers.get("Prefer", ""):
+                self.send_response(204)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self._send(200, gone)
+
+    return Handler
+
+
+class SupabaseStub:
+    """Runs the stub on 127.0.0.1 in a background thread."""
+
+    def __init__(self, data: StubData, *, port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0):
+        rng = random.Random(1)
+        lat = lambda: (latency_ms + rng.uniform(0, jitter_ms)) / 1000.0  # noqa: E731
+        self.data = data
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(data, lat))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="supabase-stub", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "SupabaseStub":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Run the fake Supabase PostgREST stub.")
+    ap.add_argument("--accounts", type=int, default=100)
+    ap.add_argument("--port", type=int, default=54321)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--history-minutes", type=float, default=0.0)
+    args = ap.parse_args()
+    stub = SupabaseStub(
+        StubData(args.accounts, history_seconds=args.history_minutes * 60),
+        port=args.port,
+        latency_ms=args.latency_ms,
+    ).start()
+    print(f"SUPABASE_URL={stub.url} SUPABASE_SERVICE_ROLE_KEY={FAKE_KEY}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,362 @@
+"""
+Load/benchmark harness for the backend.
+
+Runs `src.main` under uvicorn in a child process against the fake MetaTrader5
+module (bench/fakes/MetaTrader5.py) and a local fake Supabase (PostgREST stub),
+then drives it with K concurrent /live SSE clients and K /snapshots/latest
+pollers. Results are written as JSON so runs can be compared across commits.
+
+    cd backend
+    python -m bench.run_bench --accounts 200 --terminals 8 --clients 20 --duration 30 --out bench.json
+
+Reported: poll-cycle time (from /metrics), end-to-end snapshot staleness
+(client receive time minus MT5 sample / Supabase write time), request
+p50/p99 for /snapshots/latest, and API-process CPU per client.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+FAKES_DIR = os.path.join(BENCH_DIR, "fakes")
+FIRST_LOGIN = 50_000_000
+
+sys.path.insert(0, FAKES_DIR)
+from supabase_stub import FAKE_KEY, StubData, SupabaseStub  # noqa: E402
+
+
+# ---- Server process ---------------------------------------------------------
+
+def _serve(port: int, env: Dict[str, str], conn):
+    """Child process: run the API with the fakes first on sys.path."""
+    os.environ.update(env)
+    sys.path.insert(0, FAKES_DIR)
+    sys.path.insert(1, BACKEND_DIR)
+    import uvicorn
+    from src import main
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+
+    def control():
+        while True:
+            msg = conn.recv()
+            if msg == "cpu":
+                conn.send(time.process_time())
+            elif msg == "stop":
+                server.should_exit = True
+                return
+
+    threading.Thread(target=control, daemon=True).start()
+    server.run()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _write_accounts(n: int, terminals: int) -> str:
+    accounts = [
+        {
+            "label": f"Account {i:04d}",
+            "login": FIRST_LOGIN + i,
+            "password": "x",
+            "server": "Fake-Server",
+            "currency": "USD",
+            "account_size": 100_000,
+            "terminal_path": f"C:/fake/terminal-{i % terminals}/terminal64.exe",
+        }
+        for i in range(n)
+    ]
+    fd, path = tempfile.mkstemp(prefix="bench-accounts-", suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(accounts, f)
+    return path
+
+
+# ---- Stats helpers ----------------------------------------------------------
+
+def _quantile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    s = sorted(values)
+    return s[min(len(s) - 1, int(q * len(s)))]
+
+
+def _summary_ms(values: List[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": None if not values else round(_quantile(values, 0.50) * 1000, 2),
+        "p99_ms": None if not values else round(_quantile(values, 0.99) * 1000, 2),
+        "max_ms": None if not values else round(max(values) * 1000, 2),
+    }
+
+
+def _histogram_from_metrics(text: str, name: str) -> dict:
+    """Mean and bucket-interpolated p50/p99 of an unlabelled histogram."""
+    buckets = []
+    total = count = 0.0
+    for line in text.splitlines():
+        m = re.match(rf'^{name}_bucket\{{le="([^"]+)"\}} (\S+)$', line)
+        if m:
+            le = float("inf") if m.group(1) == "+Inf" else float(m.group(1))
+            buckets.append((le, float(m.group(2))))
+        elif line.startswith(f"{name}_sum "):
+            total = float(line.split()[1])
+        elif line.startswith(f"{name}_count "):
+            count = float(line.split()[1])
+
+    def q(p: float) -> Optional[float]:
+        if not count:
+            return None
+        target, prev_le, prev_n = p * count, 0.0, 0.0
+        for le, n in buckets:
+            if n >= target:
+                if le == float("inf"):
+                    return prev_le * 1000
+                frac = (target - prev_n) / (n - prev_n) if n > prev_n else 1.0
+                return round((prev_le + (le - prev_le) * frac) * 1000, 2)
+            prev_le, prev_n = le, n
+        return None
+
+    return {
+        "count": int(count),
+        "mean_ms": round(total / count * 1000, 2) if count else None,
+        "p50_ms": q(0.50),
+        "p99_ms": q(0.99),
+    }
+
+
+def _parse_ts(v) -> Optional[float]:
+    if v is None:
+        return None
+    if isinstance(v, (int, float)):
+        return float(v)
+    try:
+        return datetime.fromisoformat(str(v).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+# ---- Clients ----------------------------------------------------------------
+
+async def _sse_client(base: str, stop: asyncio.Event, stats: dict):
+    async with httpx.AsyncClient(base_url=base, timeout=None) as client:
+        try:
+            async with client.stream("GET", "/live") as resp:
+                async for line in resp.aiter_lines():
+                    if stop.is_set():
+                        break
+                    stats["sse_bytes"] += len(line) + 1
+                    if not line.startswith("data:"):
+                        continue
+                    now = time.time()
+                    evt = json.loads(line[5:])
+                    stats["sse_events"] += 1
+                    ts = _parse_ts(evt.get("ts"))
+                    if ts is not None and stats["measuring"]:
+                        stats["sse_staleness"].append(max(0.0, now - ts))
+        except (httpx.HTTPError, asyncio.CancelledError):
+            pass
+
+
+async def _poll_client(base: str, stop: asyncio.Event, stats: dict, interval: float):
+    etag = None
+    async with httpx.AsyncClient(base_url=base, timeout=30.0) as client:
+        while not stop.is_set():
+            headers = {"Accept": "application/json"}
+            if etag:
+                headers["If-None-Match"] = etag
+            t0 = time.perf_counter()
+            try:
+                resp = await client.get("/snapshots/latest", headers=headers)
+            except httpx.HTTPError:
+                stats["poll_errors"] += 1
+                await asyncio.sleep(interval)
+                continue
+            elapsed = time.perf_counter() - t0
+            now = time.time()
+            if stats["measuring"]:
+                stats["poll_latency"].append(elapsed)
+                stats["poll_bytes"] += len(resp.content)
+            if resp.status_code == 304:
+                stats["poll_not_modified"] += 1
+            elif resp.status_code == 200:
+                etag = resp.headers.get("etag")
+                rows = resp.json()
+                newest = max((_parse_ts(r.get("updated_at")) or 0.0 for r in rows), default=0.0)
+                if newest and stats["measuring"]:
+                    stats["poll_staleness"].append(max(0.0, now - newest))
+            else:
+                stats["poll_errors"] += 1
+            await asyncio.sleep(interval)
+
+
+async def _wait_ready(base: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base, timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+# ---- Driver -----------------------------------------------------------------
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+async def _drive(args, base: str, conn) -> dict:
+    await _wait_ready(base)
+    stats = {
+        "measuring": False,
+        "sse_events": 0, "sse_bytes": 0, "sse_staleness": [],
+        "poll_latency": [], "poll_staleness": [], "poll_errors": 0, "poll_not_modified": 0, "poll_bytes": 0,
+    }
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(_sse_client(base, stop, stats)) for _ in range(args.clients)]
+    tasks += [asyncio.create_task(_poll_client(base, stop, stats, args.poll_interval)) for _ in range(args.clients)]
+
+    await asyncio.sleep(args.warmup)
+    conn.send("cpu")
+    cpu0 = await asyncio.to_thread(conn.recv)
+    stats["measuring"] = True
+    sse_events0 = stats["sse_events"]
+    t0 = time.monotonic()
+    await asyncio.sleep(args.duration)
+    stats["measuring"] = False
+    wall = time.monotonic() - t0
+    conn.send("cpu")
+    cpu1 = await asyncio.to_thread(conn.recv)
+
+    async with httpx.AsyncClient(base_url=base, timeout=10.0) as client:
+        metrics_text = (await client.get("/metrics")).text
+
+    stop.set()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    cpu = cpu1 - cpu0
+    total_clients = max(1, 2 * args.clients)
+    return {
+        "poll_cycle": _histogram_from_metrics(metrics_text, "eas_poll_cycle_seconds"),
+        "staleness": {
+            "sse": _summary_ms(stats["sse_staleness"]),
+            "snapshots_latest": _summary_ms(stats["poll_staleness"]),
+        },
+        "requests": {
+            "snapshots_latest": {
+                **_summary_ms(stats["poll_latency"]),
+                "errors": stats["poll_errors"],
+                "not_modified": stats["poll_not_modified"],
+                "bytes": stats["poll_bytes"],
+            },
+        },
+        "sse": {"events": stats["sse_events"] - sse_events0, "bytes": stats["sse_bytes"]},
+        "cpu": {
+            "server_seconds": round(cpu, 3),
+            "server_utilization": round(cpu / wall, 4),
+            "per_client_per_second_ms": round(cpu / wall / total_clients * 1000, 4),
+        },
+        "wall_seconds": round(wall, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--accounts", type=int, default=100, help="N accounts")
+    ap.add_argument("--terminals", type=int, default=4, help="M terminals the accounts are spread over")
+    ap.add_argument("--clients", type=int, default=10, help="K /live clients and K /snapshots/latest pollers")
+    ap.add_argument("--duration", type=float, default=20.0, help="measurement window, seconds")
+    ap.add_argument("--warmup", type=float, default=5.0, help="seconds before measuring")
+    ap.add_argument("--poll-interval", type=float, default=2.0, help="/snapshots/latest poll interval")
+    ap.add_argument("--mt5-latency-ms", type=float, default=20.0)
+    ap.add_argument("--mt5-jitter-ms", type=float, default=5.0)
+    ap.add_argument("--mt5-failure-rate", type=float, default=0.0)
+    ap.add_argument("--mt5-positions", type=int, default=2)
+    ap.add_argument("--supabase-latency-ms", type=float, default=20.0)
+    ap.add_argument("--supabase-jitter-ms", type=float, default=5.0)
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                    help="extra environment for the API process (repeatable)")
+    ap.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    stub = SupabaseStub(
+        StubData(args.accounts, first_login=FIRST_LOGIN),
+        latency_ms=args.supabase_latency_ms,
+        jitter_ms=args.supabase_jitter_ms,
+    ).start()
+    accounts_path = _write_accounts(args.accounts, args.terminals)
+    port = _free_port()
+    env = {
+        "MT5_ENABLED": "1",
+        "ACCOUNTS_JSON": accounts_path,
+        "SUPABASE_URL": stub.url,
+        "SUPABASE_SERVICE_ROLE_KEY": FAKE_KEY,
+        "FAKE_MT5_LATENCY_MS": str(args.mt5_latency_ms),
+        "FAKE_MT5_JITTER_MS": str(args.mt5_jitter_ms),
+        "FAKE_MT5_FAILURE_RATE": str(args.mt5_failure_rate),
+        "FAKE_MT5_POSITIONS": str(args.mt5_positions),
+    }
+    env.update(kv.split("=", 1) for kv in args.env)
+
+    ctx = mp.get_context("spawn")
+    parent_conn, child_conn = ctx.Pipe()
+    proc = ctx.Process(target=_serve, args=(port, env, child_conn), name="bench-api")
+    proc.start()
+    try:
+        results = asyncio.run(_drive(args, f"http://127.0.0.1:{port}", parent_conn))
+    finally:
+        try:
+            parent_conn.send("stop")
+        except Exception:
+            pass
+        proc.join(15)
+        if proc.is_alive():
+            proc.terminate()
+        stub.stop()
+        os.remove(accounts_path)
+
+    report = {
+        "commit": _git_commit(),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
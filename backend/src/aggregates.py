@@ -0,0 +1,260 @@
+import base64
+import bisect
+import json
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+# Per-group totals and sort orders for the overview, maintained incrementally:
+# when one account's equity changes, only that account is taken out of its
+# group's running sums and sorted lists and put back (O(log n) search), so a
+# summary or a sorted page costs O(1) / O(limit) per request instead of a
+# full recompute.
+
+ALL_ACCOUNTS = "All Accounts"
+SORTS = ("alpha", "equity_asc", "equity_desc", "net_asc", "net_desc")
+
+SortKey = Tuple[Any, ...]
+
+
+class _Entry:
+    __slots__ = ("login_hint", "label", "group", "account_size", "balance", "equity", "net_pct", "updated_at", "info")
+
+    def __init__(self, login_hint: str):
+        self.login_hint = login_hint
+        self.label = login_hint
+        self.group: Optional[str] = None
+        self.account_size: Optional[float] = None
+        self.balance: Optional[float] = None
+        self.equity: Optional[float] = None
+        self.net_pct: Optional[float] = None
+        self.updated_at: Any = None
+        self.info: dict = {}
+
+    def sort_key(self, sort: str) -> SortKey:
+        """Ascending key for `sort`; accounts without a value always sort last."""
+        hint = self.login_hint
+        if sort == "alpha":
+            return ((self.label or hint).lower(), hint)
+        value = self.equity if sort.startswith("equity") else self.net_pct
+        if value is None:
+            return (1, 0.0, hint)
+        return (0, value if sort.endswith("_asc") else -value, hint)
+
+
+class _Group:
+    __slots__ = ("members", "logins", "balance", "equity", "sized_equity", "sized_size", "reporting", "indexes")
+
+    def __init__(self):
+        self.members = 0
+        self.logins: Set[str] = set()
+        self.balance = 0.0
+        self.equity = 0.0
+        self.sized_equity = 0.0   # equity of accounts with a known size ...
+        self.sized_size = 0.0     # ... and their sizes, for the aggregate net %
+        self.reporting = 0        # members with an equity value
+        self.indexes: Dict[str, List[SortKey]] = {s: [] for s in SORTS}
+
+    def add(self, e: _Entry, sign: int):
+        self.members += sign
+        if sign > 0:
+            self.logins.add(e.login_hint)
+        else:
+            self.logins.discard(e.login_hint)
+        if e.balance is not None:
+            self.balance += sign * e.balance
+        if e.equity is not None:
+            self.equity += sign * e.equity
+            self.reporting += sign
+            if e.account_size:
+                self.sized_equity += sign * e.equity
+                self.sized_size += sign * e.account_size
+        for sort, index in self.indexes.items():
+            key = e.sort_key(sort)
+            if sign > 0:
+                bisect.insort(index, key)
+            else:
+                i = bisect.bisect_left(index, key)
+                if i < len(index) and index[i] == key:
+                    del index[i]
+
+
+def encode_cursor(sort: str, key: SortKey) -> str:
+    raw = json.dumps([sort, list(key)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> SortKey:
+    """Raises ValueError for a malformed cursor or one issued for another sort."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        got_sort, key = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if got_sort != sort or not isinstance(key, list):
+        raise ValueError("Cursor does not match this sort")
+    return tuple(key)
+
+
+class GroupIndex:
+    """
+    Accounts keyed by login_hint with their latest balance/equity, grouped by
+    group name (every account is also in 'All Accounts').
+
+    - `sync_accounts(rows)` sets membership and static fields (label, size);
+    - `update(login_hint, ...)` applies one snapshot; a no-op when unchanged;
+    - `summary(group)` / `page(group, sort, limit, cursor)` read the indexes;
+    - `members(group)` is the group's login hints (for scoping live streams);
+    - `counts()` is the member count of every known group.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._groups: Dict[str, _Group] = {ALL_ACCOUNTS: _Group()}
+
+    def _groups_of(self, e: _Entry) -> List[_Group]:
+        out = [self._groups[ALL_ACCOUNTS]]
+        if e.group and e.group != ALL_ACCOUNTS:
+            out.append(self._groups.setdefault(e.group, _Group()))
+        return out
+
+    def _detach(self, e: _Entry):
+        for g in self._groups_of(e):
+            g.add(e, -1)
+
+    def _attach(self, e: _Entry):
+        for g in self._groups_of(e):
+            g.add(e, +1)
+
+    @staticmethod
+    def _net(e: _Entry, fallback: Optional[float]) -> Optional[float]:
+        if e.equity is not None and e.account_size:
+            return (e.equity / e.account_size - 1.0) * 100.0
+        return fallback
+
+    # ---- writes -------------------------------------------------------------
+
+    def sync_accounts(self, rows: Iterable[dict]):
+        """
+        Membership from account rows ({login_hint, label, group_name?,
+        account_size, ...}); accounts missing from `rows` are dropped.
+        Extra keys are kept and returned with each page row.
+        """
+        with self._lock:
+            seen = set()
+            for r in rows:
+                hint = str(r.get("login_hint"))
+                seen.add(hint)
+                e = self._entries.get(hint)
+                size = r.get("account_size")
+                size = float(size) if size not in (None, "") else None
+                label = r.get("label") or hint
+                group = r.get("group_name")
+                info = {k: v for k, v in r.items() if k != "group_name"}
+                if e is not None and (e.label, e.group, e.account_size) == (label, group, size):
+                    e.info = info
+                    continue
+                if e is None:
+                    e = self._entries[hint] = _Entry(hint)
+                else:
+                    self._detach(e)
+                e.label, e.group, e.account_size, e.info = label, group, size, info
+                e.net_pct = self._net(e, e.net_pct)
+                self._attach(e)
+            for hint in [h for h in self._entries if h not in seen]:
+                self._detach(self._entries.pop(hint))
+
+    def update(
+        self,
+        login_hint: str,
+        *,
+        balance: Optional[float],
+        equity: Optional[float],
+        updated_at: Any = None,
+        net_return_pct: Optional[float] = None,
+    ) -> bool:
+        """Apply one account's latest values. Returns False if the account is unknown or nothing changed."""
+        with self._lock:
+            e = self._entries.get(str(login_hint))
+            if e is None:
+                return False
+            e.updated_at = updated_at
+            if e.balance == balance and e.equity == equity:
+                return False
+            self._detach(e)
+            e.balance, e.equity = balance, equity
+            e.net_pct = self._net(e, net_return_pct)
+            self._attach(e)
+            return True
+
+    # ---- reads --------------------------------------------------------------
+
+    def _row(self, e: _Entry) -> dict:
+        return {
+            **e.info,
+            "balance": e.balance,
+            "equity": e.equity,
+            "net_return_pct": e.net_pct,
+            "updated_at": e.updated_at,
+        }
+
+    def _brief(self, key: Optional[SortKey]) -> Optional[dict]:
+        if key is None or key[0] != 0:
+            return None
+        e = self._entries[key[-1]]
+        return {"login_hint": e.login_hint, "label": e.label, "equity": e.equity, "net_return_pct": e.net_pct}
+
+    def summary(self, group: str) -> Optional[dict]:
+        """Totals of one group; None if no account was ever in it."""
+        with self._lock:
+            g = self._groups.get(group)
+            if g is None:
+                return None
+            net = self._net_of(g)
+            return {
+                "group": group,
+                "count": g.members,
+                "reporting": g.reporting,
+                "total_balance": round(g.balance, 2),
+                "total_equity": round(g.equity, 2),
+                "total_account_size": round(g.sized_size, 2),
+                "net_return_pct": net,
+                "best": self._brief(g.indexes["net_desc"][0] if g.indexes["net_desc"] else None),
+                "worst": self._brief(g.indexes["net_asc"][0] if g.indexes["net_asc"] else None),
+            }
+
+    def members(self, group: str) -> FrozenSet[str]:
+        with self._lock:
+            g = self._groups.get(group)
+            return frozenset(g.logins) if g is not None else frozenset()
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: g.members for name, g in self._groups.items()}
+
+    @staticmethod
+    def _net_of(g: _Group) -> Optional[float]:
+        if g.sized_size <= 0:
+            return None
+        return (g.sized_equity / g.sized_size - 1.0) * 100.0
+
+    def page(
+        self, group: str, sort: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        (rows, next_cursor); keyset pagination, so pages stay stable while
+        values move. Raises KeyError for an unknown group.
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Unknown sort '{sort}'")
+        after = decode_cursor(cursor, sort) if cursor else None
+        with self._lock:
+            g = self._groups.get(group)
+            if g is None:
+                raise KeyError(group)
+            index = g.indexes[sort]
+            start = bisect.bisect_right(index, after) if after is not None else 0
+            keys = index[start:start + limit]
+            rows = [self._row(self._entries[k[-1]]) for k in keys]
+            more = start + limit < len(index)
+        return rows, (encode_cursor(sort, keys[-1]) if more and keys else None)
@@ -0,0 +1,95 @@
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+class AsyncTTLCache:
+    """
+    TTL cache with single-flight loading for loaders that are coroutines:
+    when several callers miss the same key at once, only one load runs and
+    the others await (and share) its result or exception. The load runs in
+    its own task, so a caller that is cancelled (client went away) does not
+    cancel it for the others waiting on the same key.
+    """
+
+    def __init__(self, ttl: float, *, clock: Callable[[], float] = time.monotonic):
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        hit = self._data.get(key)
+        if hit is not None and hit[0] > self._clock():
+            return hit[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            self._data[key] = (self._clock() + self.ttl, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+
+# ---- ETag'd JSON responses --------------------------------------------------
+
+@dataclass(frozen=True)
+class EncodedJSON:
+    body: bytes
+    etag: str
+    media_type: str = "application/json"
+
+
+def encode_bytes(body: bytes, media_type: str) -> EncodedJSON:
+    """Wrap an already-serialized body, deriving a strong ETag from its bytes."""
+    return EncodedJSON(body=body, etag='"%s"' % hashlib.sha256(body).hexdigest()[:32], media_type=media_type)
+
+
+def encode_json(payload: Any, media_type: str = "application/json") -> EncodedJSON:
+    """Serialize once and derive a strong ETag from the exact bytes."""
+    body = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return encode_bytes(body, media_type)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (t.strip() for t in header.split(","))
+
+
+def json_response(
+    request: Request, encoded: EncodedJSON, max_age: float, *, vary: Optional[str] = None
+) -> Response:
+    """
+    200 with the cached body, or 304 with no body when the client already has
+    this exact representation (If-None-Match).
+    """
+    headers = {
+        "ETag": encoded.etag,
+        "Cache-Control": f"private, max-age={max(0, int(max_age))}, must-revalidate",
+    }
+    if vary:
+        headers["Vary"] = vary
+    if _etag_matches(request.headers.get("if-none-match"), encoded.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=encoded.body, media_type=encoded.media_type, headers=headers)
@@ -0,0 +1,113 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Collection, Dict, Hashable, List, Optional, Tuple
+
+from .live_hub import parse_last_event_id
+
+# Versioned latest row per key (account) for /snapshots/changes. Every accepted
+# update gets a version, so "what changed since cursor N" is the set of keys
+# whose version is above N. Versions are either the next value of a counter
+# in this process, or derived from the data itself (an upstream timestamp, a
+# shared store generation) so that every process that sees the same data
+# versions it the same way and can answer any of their cursors. Keys are kept
+# in version order, so answering walks only the keys that changed, and a
+# poller that is already up to date costs one comparison.
+
+
+class ChangeLog:
+    """
+    - `update(key, row, version=..., fingerprint=...)` stores the latest row
+      for `key`; it is a no-op when the fingerprint matches the last accepted
+      one.
+    - `since(version)` returns the rows changed after `version`.
+    - `wait(version, timeout)` blocks until something changes after it.
+
+    Cursors are "<epoch>.<version>" like the hub's event ids. Without
+    `shared`, versions count this process's updates: a cursor from another
+    process (or from before a restart) parses as unknown, and the poller gets
+    every row again instead of a wrong slice. With `shared`, every update
+    passes its data-derived `version` (>= 1) and `epoch` names the data
+    source, so a cursor is valid in every process reading that source; one
+    ahead of this process only means it has not caught up yet.
+    """
+
+    def __init__(self, *, epoch: str = "", shared: bool = False):
+        self.epoch = epoch
+        self.shared = shared
+        self._version = 0
+        self._rows: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self._fingerprints: Dict[str, Hashable] = {}
+        self._changed = asyncio.Event()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def cursor(self, version: Optional[int] = None) -> str:
+        """Cursor for `version` (default: the latest)."""
+        version = self._version if version is None else version
+        return f"{self.epoch}.{version}" if self.epoch else str(version)
+
+    def parse_cursor(self, value: Optional[str]) -> Optional[int]:
+        """
+        Version from a cursor, or None if absent, malformed, from another
+        epoch, or (unless shared) ahead of us.
+        """
+        version = parse_last_event_id(value, self.epoch)
+        if version is None or version < 0 or (version > self._version and not self.shared):
+            return None
+        return version
+
+    def update(
+        self, key: str, row: Any, *, version: Optional[int] = None, fingerprint: Optional[Hashable] = None
+    ) -> bool:
+        """Store `row` as the latest for `key`. Returns False if it was deduplicated."""
+        if (version is None) == self.shared:
+            raise ValueError("shared change logs need a version per update, others take none")
+        if fingerprint is not None:
+            if self._fingerprints.get(key) == fingerprint:
+                return False
+            self._fingerprints[key] = fingerprint
+        version = self._version + 1 if version is None else int(version)
+        self._rows[key] = (version, row)
+        self._rows.move_to_end(key)
+        if version < self._version:
+            # arrived out of order: keys with later versions go back behind it
+            for later in [k for k, (v, _) in self._rows.items() if v > version]:
+                self._rows.move_to_end(later)
+        self._version = max(self._version, version)
+        # wake every waiter at once; later waiters get a fresh event
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return True
+
+    def since(self, version: int, keys: Optional[Collection[str]] = None) -> List[Any]:
+        """Rows changed after `version` (0 = all), oldest change first, limited to `keys` if given."""
+        out: List[Any] = []
+        for key in reversed(self._rows):
+            v, row = self._rows[key]
+            if v <= version:
+                break
+            if keys is None or key in keys:
+                out.append(row)
+        out.reverse()
+        return out
+
+    def reset(self, epoch: str):
+        """Forget every row and start over under a new epoch (the data source was replaced)."""
+        self.epoch = epoch
+        self._version = 0
+        self._rows.clear()
+        self._fingerprints.clear()
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, version: int, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for a change after `version`; False if none came."""
+        if self._version > version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
@@ -0,0 +1,75 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# Per-terminal circuit breaker. After `failure_threshold` consecutive failed
+# (or timed-out) fetches the circuit opens and the terminal is skipped, so its
+# accounts fail fast instead of stalling a poll cycle. Once `open_seconds` have
+# passed one probe fetch is let through (half-open): success closes the
+# circuit, failure re-opens it for twice as long (capped at `max_open_seconds`).
+
+
+@dataclass
+class CircuitPolicy:
+    failure_threshold: int = 3
+    open_seconds: float = 30.0
+    max_open_seconds: float = 300.0
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, policy: Optional[CircuitPolicy] = None, *, clock: Callable[[], float] = time.monotonic):
+        self.policy = policy or CircuitPolicy()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0             # consecutive failures
+        self.trips = 0                # times the circuit opened
+        self.last_error: Optional[str] = None
+        self._open_for = 0.0
+        self._open_until = 0.0
+
+    def allow(self) -> bool:
+        """Whether a fetch may go ahead now; in half-open state only one probe is allowed."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() >= self._open_until:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._open_for = 0.0
+
+    def record_failure(self, error: str):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            p = self.policy
+            if self.state == self.HALF_OPEN:
+                self._open(min(p.max_open_seconds, max(p.open_seconds, self._open_for * 2)))
+            elif self.state == self.CLOSED and self.failures >= p.failure_threshold:
+                self._open(p.open_seconds)
+
+    def _open(self, seconds: float):
+        self.state = self.OPEN
+        self.trips += 1
+        self._open_for = seconds
+        self._open_until = self._clock() + seconds
+
+    def status(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            return {
+                "state": self.state,
+                "failure_streak": self.failures,
+                "trips": self.trips,
+                "retry_in": round(max(0.0, self._open_until - now), 3) if self.state == self.OPEN else None,
+                "last_error": self.last_error,
+            }
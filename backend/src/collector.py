@@ -0,0 +1,181 @@
+"""
+Standalone MT5 collector for multi-worker API deployments.
+
+    cd backend
+    MT5_ENABLED=1 SNAPSHOT_STORE=eas_snapshots.db python -m src.collector
+
+Polls every account in accounts.json through the collector pool, on the same
+per-account schedule as the in-process poller, and writes each result to the
+shared SnapshotStore. Start the API with BRIDGE_COLLECTOR=external and the same
+SNAPSHOT_STORE to serve from the store with any number of workers.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Optional
+
+from .circuit import CircuitPolicy
+from .collector_pool import CollectorPool
+from .metrics import POLL_CYCLE_SECONDS, REGISTRY
+from .mt5_bridge import MT5_ENABLED, load_accounts_json
+from .scheduler import PollPolicy, PollScheduler
+from .snapshot_store import SnapshotStore
+
+
+def policy_from_env() -> PollPolicy:
+    return PollPolicy(
+        fast_interval=float(os.getenv("BRIDGE_POLL_FAST_SECONDS", "2")),
+        slow_interval=float(os.getenv("BRIDGE_POLL_SECONDS", "10")),
+        equity_epsilon=float(os.getenv("BRIDGE_EQUITY_EPSILON", "0")),
+        backoff_base=float(os.getenv("BRIDGE_BACKOFF_BASE_SECONDS", "5")),
+        backoff_max=float(os.getenv("BRIDGE_BACKOFF_MAX_SECONDS", "300")),
+    )
+
+
+def pool_from_env(accounts: Iterable[dict]) -> CollectorPool:
+    """Collector pool with MT5 call deadlines and circuit breaking configured from MT5_* env vars."""
+    return CollectorPool(
+        accounts,
+        call_timeout=float(os.getenv("MT5_CALL_TIMEOUT_SECONDS", "10")),
+        init_timeout=float(os.getenv("MT5_INIT_TIMEOUT_SECONDS", "60")),
+        circuit=CircuitPolicy(
+            failure_threshold=int(os.getenv("MT5_CIRCUIT_FAILURES", "3")),
+            open_seconds=float(os.getenv("MT5_CIRCUIT_OPEN_SECONDS", "30")),
+            max_open_seconds=float(os.getenv("MT5_CIRCUIT_MAX_OPEN_SECONDS", "300")),
+        ),
+    )
+
+
+def circuit_gauge(pool: CollectorPool):
+    REGISTRY.gauge(
+        "eas_mt5_circuit_open",
+        "1 while a terminal's circuit breaker is open or half-open",
+        ("terminal",),
+        callback=lambda: {(path,): float(c["state"] != "closed") for path, c in pool.circuits().items()},
+    )
+
+
+def store_path() -> str:
+    return os.getenv("SNAPSHOT_STORE", "eas_snapshots.db")
+
+
+def poll_terminal(pool: CollectorPool, scheduler: PollScheduler, terminal_path: str) -> Dict[int, dict]:
+    """Fetch the due accounts of one terminal and record the outcomes; returns the snapshots."""
+    due = scheduler.pop_due(partition=terminal_path)
+    if not due:
+        return {}
+    t0 = time.perf_counter()
+    try:
+        snaps, errors = pool.fetch_terminal(terminal_path, due)
+    except Exception as e:
+        snaps, errors = {}, {login: str(e) for login in due}
+    POLL_CYCLE_SECONDS.observe(time.perf_counter() - t0)
+    for login in due:
+        snap = snaps.get(login)
+        if snap is None:
+            scheduler.record_failure(login, errors.get(login) or "no result")
+        else:
+            scheduler.record_success(login, snap)
+    return snaps
+
+
+def run(
+    store: SnapshotStore,
+    pool: CollectorPool,
+    scheduler: PollScheduler,
+    *,
+    stop: Optional[threading.Event] = None,
+    status_interval: float = 1.0,
+):
+    """
+    Collect until `stop` is set. Each terminal is polled by its own thread,
+    which writes its results as soon as they arrive, so a hung terminal only
+    delays its own accounts. `scheduler` must be partitioned by
+    `pool.terminal_of`. Scheduler state is published every `status_interval`.
+    """
+    stop = stop or threading.Event()
+
+    def status() -> dict:
+        return {"terminals": pool.terminals, "circuits": pool.circuits(), "accounts": scheduler.status()}
+
+    def collect(terminal_path: str):
+        while not stop.is_set():
+            snaps = poll_terminal(pool, scheduler, terminal_path)
+            if snaps:
+                store.write(snaps, status=status())
+            wait = scheduler.seconds_until_next(partition=terminal_path)
+            stop.wait(min(1.0, wait) if wait is not None else 1.0)
+
+    threads = [
+        threading.Thread(target=collect, args=(path,), name=f"collector[{path}]", daemon=True)
+        for path in pool.terminals
+    ]
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            store.write({}, status=status())
+            if stop.wait(status_interval):
+                break
+    finally:
+        stop.set()
+        for t in threads:
+            t.join(timeout=5.0)
+
+
+def _serve_metrics(port: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="collector-metrics", daemon=True).start()
+    return server
+
+
+def main():
+    if not MT5_ENABLED:
+        print("[ERR] The collector needs MT5_ENABLED=1")
+        sys.exit(1)
+    accounts = load_accounts_json()
+    if not accounts:
+        print("[ERR] No accounts in accounts.json")
+        sys.exit(1)
+
+    store = SnapshotStore(store_path())
+    pool = pool_from_env(accounts.values())
+    pool.start()
+    circuit_gauge(pool)
+    scheduler = PollScheduler(accounts.keys(), policy_from_env(), partition_of=pool.terminal_of)
+
+    metrics_port = int(os.getenv("COLLECTOR_METRICS_PORT", "0"))
+    if metrics_port:
+        _serve_metrics(metrics_port)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    print(f"[OK] Collecting {len(accounts)} account(s) from {len(pool.terminals)} terminal(s) into {store.path}")
+    try:
+        run(store, pool, scheduler, stop=stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+        store.close()
+        print("[OK] Collector stopped")
+
+
+if __name__ == "__main__":
+    main()
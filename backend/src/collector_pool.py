@@ -0,0 +1,322 @@
+import importlib
+import multiprocessing as mp
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .circuit import CircuitBreaker, CircuitPolicy
+from .metrics import MT5_CALL_SECONDS, MT5_FAILURES, MT5_LOGINS, MT5_TERMINAL_REINITS, MT5_TIMEOUTS
+from .mt5_bridge import MT5Manager, snapshot_to_dict
+
+# A MetaTrader5 session is process-global, so the only way to talk to several
+# terminals at once is to give each terminal_path its own process. Every worker
+# keeps its MT5 session alive between cycles and only ever sees the accounts
+# pinned to its terminal, so there is no shutdown()/initialize() churn.
+#
+# MT5 calls can hang. Every account fetch has a deadline on the parent side;
+# a worker that misses it is killed (taking its stuck MT5 session with it) and
+# respawned on the next call, and a per-terminal circuit breaker stops sending
+# work to a terminal that keeps failing.
+
+FetchResults = Tuple[Dict[int, dict], Dict[int, str]]  # (snapshots, errors) keyed by login
+
+
+# ---- Worker process ---------------------------------------------------------
+
+def _worker_main(conn, terminal_path: str, accounts: List[dict], module_name: str):
+    """
+    Entry point of a terminal worker. Receives ("fetch", [logins]) / ("stop",)
+    messages on `conn` and answers each fetch with one
+    ("result", login, ok, snapshot_dict | error_str) message per login, as
+    soon as that login is done, then ("done", stats) where `stats` is
+    MT5Manager.drain_stats() (or None if MetaTrader5 could not be imported).
+    """
+    import_error: Optional[str] = None
+    try:
+        module = importlib.import_module(module_name)
+    except Exception as e:
+        module, import_error = None, f"cannot import {module_name}: {e}"
+
+    manager = MT5Manager(mt5_module=module) if module is not None else None
+    by_login = {int(a["login"]): a for a in accounts}
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError, KeyboardInterrupt):
+            break
+        if not msg or msg[0] == "stop":
+            break
+        if msg[0] != "fetch":
+            continue
+
+        try:
+            for login in msg[1]:
+                acc = by_login.get(int(login))
+                if acc is None:
+                    result = (int(login), False, f"account {login} is not pinned to {terminal_path}")
+                elif manager is None:
+                    result = (int(login), False, import_error)
+                else:
+                    try:
+                        snap = manager.fetch_snapshot(
+                            label=acc["label"],
+                            login=int(acc["login"]),
+                            password=acc["password"],
+                            server=acc["server"],
+                            currency=acc.get("currency", ""),
+                            terminal_path=terminal_path,
+                        )
+                        result = (int(login), True, snapshot_to_dict(snap))
+                    except Exception as e:
+                        result = (int(login), False, str(e))
+                conn.send(("result",) + result)
+            conn.send(("done", manager.drain_stats() if manager is not None else None))
+        except (EOFError, OSError):
+            break
+
+    if manager is not None:
+        manager.close()
+    conn.close()
+
+
+# ---- Parent-side handles ----------------------------------------------------
+
+class TerminalWorker:
+    """
+    Parent-side handle for one worker process. Calls are serialized per worker;
+    a dead or killed process is restarted transparently on the next call.
+
+    Each account must be answered within `call_timeout` seconds (plus
+    `init_timeout` for the first one after a (re)start, which initializes the
+    terminal); otherwise the process is killed and the remaining accounts of
+    the batch fail with a timeout.
+    """
+
+    def __init__(
+        self,
+        terminal_path: str,
+        accounts: List[dict],
+        module_name: str,
+        ctx,
+        *,
+        call_timeout: float = 10.0,
+        init_timeout: float = 60.0,
+        circuit: Optional[CircuitPolicy] = None,
+    ):
+        self.terminal_path = terminal_path
+        self.logins: List[int] = [int(a["login"]) for a in accounts]
+        self.call_timeout = call_timeout
+        self.init_timeout = init_timeout
+        self.breaker = CircuitBreaker(circuit)
+        self._accounts = accounts
+        self._module_name = module_name
+        self._ctx = ctx
+        self._lock = threading.Lock()
+        self._proc = None
+        self._conn = None
+        self._fresh = True  # the next answer includes initialize()
+        self.restarts = 0
+
+    def _start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.terminal_path, self._accounts, self._module_name),
+            name=f"mt5-worker[{self.terminal_path}]",
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        self._proc, self._conn = proc, parent_conn
+        self._fresh = True
+
+    def _stop(self, timeout: float = 2.0):
+        proc, conn = self._proc, self._conn
+        self._proc, self._conn = None, None
+        if conn is not None:
+            try:
+                conn.send(("stop",))
+            except Exception:
+                pass
+        if proc is not None:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout)
+        if conn is not None:
+            conn.close()
+
+    def _kill(self):
+        """Hard stop for a hung worker: no polite "stop", it would never be read."""
+        proc, conn = self._proc, self._conn
+        self._proc, self._conn = None, None
+        if proc is not None:
+            proc.kill()
+            proc.join(2.0)
+        if conn is not None:
+            conn.close()
+        self.restarts += 1
+
+    def start(self):
+        with self._lock:
+            if self._proc is None or not self._proc.is_alive():
+                self._stop()
+                self._start()
+
+    def _recv(self, timeout: float):
+        if not self._conn.poll(timeout):
+            raise TimeoutError
+        return self._conn.recv()
+
+    def fetch(self, logins: Iterable[int]) -> List[Tuple[int, bool, Any]]:
+        """
+        Results for `logins`, one (login, ok, snapshot | error) each. A hung or
+        dead worker does not raise: accounts it did not answer get an error.
+        """
+        batch = [int(x) for x in logins]
+        results: List[Tuple[int, bool, Any]] = []
+        stats: Optional[dict] = None
+        failure: Optional[str] = None
+        with self._lock:
+            if self._proc is None or not self._proc.is_alive():
+                self._stop()
+                self._start()
+            try:
+                self._conn.send(("fetch", batch))
+                for _ in batch:
+                    timeout = self.call_timeout + (self.init_timeout if self._fresh else 0.0)
+                    _, login, ok, value = self._recv(timeout)
+                    self._fresh = False
+                    results.append((login, ok, value))
+                _, stats = self._recv(self.call_timeout)
+            except TimeoutError:
+                self._kill()
+                MT5_TIMEOUTS.inc(terminal=self.terminal_path)
+                failure = f"MT5 call on {self.terminal_path} timed out; worker restarted"
+            except (EOFError, OSError) as e:
+                self._stop()
+                failure = f"MT5 worker for {self.terminal_path} died: {e}"
+        if failure is not None:
+            answered = {login for login, _, _ in results}
+            results += [(login, False, failure) for login in batch if login not in answered]
+        self._record(results, stats)
+
+        # The terminal is healthy if it answered anything; a batch of errors
+        # only (or a hang) counts against it.
+        if any(ok for _, ok, _ in results):
+            self.breaker.record_success()
+        elif results:
+            self.breaker.record_failure(failure or str(results[-1][2]))
+        return results
+
+    def _record(self, results: List[Tuple[int, bool, Any]], stats: Optional[dict]):
+        terminal = self.terminal_path
+        failed = sum(1 for _, ok, _ in results if not ok)
+        if failed:
+            MT5_FAILURES.inc(failed, terminal=terminal)
+        if not stats:
+            return
+        if stats["reinits"]:
+            MT5_TERMINAL_REINITS.inc(stats["reinits"], terminal=terminal)
+        if stats["logins"]:
+            MT5_LOGINS.inc(stats["logins"], terminal=terminal)
+        for call, seconds in stats["calls"]:
+            MT5_CALL_SECONDS.observe(seconds, call=call, terminal=terminal)
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+
+class CollectorPool:
+    """
+    One long-lived worker process (and MT5 session) per terminal_path.
+    Accounts are pinned to the worker of their terminal. `fetch_terminal`
+    talks to one worker only, so callers run one poll loop per terminal and a
+    slow or hung terminal never holds up the others' results.
+
+    `mt5_module` is the import name used inside the workers, so tests can point
+    it at a fake MetaTrader5 module available on sys.path.
+    """
+
+    def __init__(
+        self,
+        accounts: Iterable[dict],
+        *,
+        mt5_module: str = "MetaTrader5",
+        start_method: str = "spawn",
+        call_timeout: float = 10.0,
+        init_timeout: float = 60.0,
+        circuit: Optional[CircuitPolicy] = None,
+    ):
+        ctx = mp.get_context(start_method)
+        by_terminal: Dict[str, List[dict]] = {}
+        for a in accounts:
+            by_terminal.setdefault(a["terminal_path"], []).append(a)
+
+        self._workers: Dict[str, TerminalWorker] = {
+            path: TerminalWorker(
+                path, accs, mt5_module, ctx, call_timeout=call_timeout, init_timeout=init_timeout, circuit=circuit
+            )
+            for path, accs in by_terminal.items()
+        }
+        self._pinned: Dict[int, TerminalWorker] = {
+            login: w for w in self._workers.values() for login in w.logins
+        }
+
+    @property
+    def terminals(self) -> List[str]:
+        return list(self._workers)
+
+    def circuits(self) -> Dict[str, dict]:
+        """Circuit breaker state (and worker restarts) per terminal."""
+        return {path: {**w.breaker.status(), "restarts": w.restarts} for path, w in self._workers.items()}
+
+    def start(self):
+        """Spawn all workers up front (otherwise they start on first use)."""
+        for w in self._workers.values():
+            w.start()
+
+    def terminal_of(self, login: int) -> Optional[str]:
+        w = self._pinned.get(int(login))
+        return None if w is None else w.terminal_path
+
+    def fetch_terminal(self, terminal_path: str, logins: Iterable[int]) -> FetchResults:
+        """
+        Fetch snapshots for `logins` from the worker of `terminal_path`.
+        Blocks until that worker answers or misses its deadline; logins pinned
+        to another terminal (or to none) come back as errors.
+        """
+        snaps: Dict[int, dict] = {}
+        errors: Dict[int, str] = {}
+        w = self._workers.get(terminal_path)
+        batch: List[int] = []
+        for login in (int(x) for x in logins):
+            if w is None or self._pinned.get(login) is not w:
+                errors[login] = "Account not found"
+            else:
+                batch.append(login)
+        if not batch:
+            return snaps, errors
+        if not w.breaker.allow():
+            for login in batch:
+                errors[login] = f"circuit open for {terminal_path}"
+            return snaps, errors
+
+        try:
+            for login, ok, value in w.fetch(batch):
+                if ok:
+                    snaps[login] = value
+                else:
+                    errors[login] = value
+        except Exception as e:
+            for login in batch:
+                errors[login] = str(e)
+        return snaps, errors
+
+    def close(self):
+        for w in self._workers.values():
+            try:
+                w.close()
+            except Exception:
+                pass
@@ -0,0 +1,87 @@
+from typing import List, Tuple
+
+import numpy as np
+
+# Shape-preserving downsampling for equity curves. Both functions return the
+# *indices* of the points to keep (sorted, first and last always included), so
+# callers can apply them to any number of parallel arrays.
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets. Keeps at most `n` points; each bucket is
+    scored with NumPy, only the walk over the `n - 2` buckets is in Python.
+    """
+    size = len(x)
+    if n >= size or size <= 2:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1])
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)  # n - 2 buckets over the interior
+
+    # mean of every bucket (used as the "next" vertex of the triangle)
+    cx = np.add.reduceat(x[1:size - 1], edges[:-1] - 1)
+    cy = np.add.reduceat(y[1:size - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    counts[counts == 0] = 1
+    mean_x = np.append(cx / counts, x[-1])
+    mean_y = np.append(cy / counts, y[-1])
+
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        bx, by = x[lo:hi], y[lo:hi]
+        nx, ny = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[a] - nx) * (by - y[a]) - (x[a] - bx) * (ny - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return np.unique(out)
+
+
+def minmax(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Min/max per bucket, fully vectorized: `(n - 2) // 2` equal-count buckets,
+    each contributing its lowest and highest point (plus the first and last
+    point), so spikes are never dropped.
+    """
+    size = len(x)
+    if n >= size or size <= 2:
+        return np.arange(size)
+    buckets = (n - 2) // 2
+    if buckets < 1:
+        return np.array([0, size - 1])
+
+    bucket_id = (np.arange(size) * buckets) // size
+    order = np.lexsort((y, bucket_id))                 # by bucket, then by value
+    starts = np.searchsorted(bucket_id[order], np.arange(buckets), side="left")
+    ends = np.append(starts[1:], size) - 1
+    keep = np.concatenate(([0, size - 1], order[starts], order[ends]))
+    return np.unique(keep)
+
+
+def downsample(x: np.ndarray, y: np.ndarray, n: int, method: str = "lttb") -> np.ndarray:
+    if method == "minmax":
+        return minmax(x, y, n)
+    return lttb(x, y, n)
+
+
+def step_sum(series: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum several step series (each value holds until the account's next sample)
+    on the union of their timestamps. Before its first sample an account
+    contributes its first value, so curves do not jump when one joins late.
+    """
+    series = [(t, v) for t, v in series if len(t)]
+    if not series:
+        return np.empty(0), np.empty(0)
+    grid = np.unique(np.concatenate([t for t, _ in series]))
+    total = np.zeros(len(grid), dtype=np.float64)
+    for t, v in series:
+        idx = np.searchsorted(t, grid, side="right") - 1
+        total += v[np.clip(idx, 0, None)]
+    return grid, total
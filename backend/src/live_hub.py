@@ -0,0 +1,249 @@
+import asyncio
+import json
+from collections import deque
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Collection, Deque, Dict, Hashable, Iterable, List, Optional, Set, Tuple,
+)
+
+# Single producer, many consumers: an event is JSON-encoded once, framed as an
+# SSE message once, and the same bytes are handed to every connected client.
+# Each client owns a bounded queue; when it overflows the client is switched to
+# "coalesced" mode and catches up with the latest frame per key instead of
+# replaying every intermediate update. A client can be scoped to a set of keys
+# (accounts); clients are indexed by key, so publishing touches only the
+# clients that want that key.
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+
+class LiveClient:
+    __slots__ = ("queue", "delivered", "lagged", "keys")
+
+    def __init__(self, maxsize: int, keys: Optional[Collection[str]] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.delivered = 0     # last seq sent to this client
+        self.lagged = False    # queue overflowed, needs a coalesced catch-up
+        self.keys: Optional[Set[str]] = None if keys is None else set(keys)  # None = every key
+
+    def wants(self, key: str) -> bool:
+        return self.keys is None or key in self.keys
+
+
+class LiveHub:
+    """
+    In-process broadcast hub for the /live SSE stream.
+
+    - `publish(key, event, fingerprint=...)` encodes an event once; it is a
+      no-op when the fingerprint matches the last one published for `key`.
+      When `event` is incremental (a delta), pass the full `state` too: that is
+      what coalesced or resuming clients receive for `key` instead of the delta.
+    - `stream(...)` yields pre-encoded frames for one client, with heartbeats
+      and `Last-Event-ID` resume from a bounded backlog. `keys` limits the
+      client to those keys; `open()` + `subscribe()` / `unsubscribe()` change
+      them while the stream runs.
+
+    With an `epoch`, event ids are "<epoch>.<seq>": ids issued by another
+    process (or before a restart) then parse as unknown and the client gets
+    the full latest state instead of a wrong resume point.
+    """
+
+    def __init__(
+        self, *, queue_size: int = 256, backlog: int = 2048, heartbeat: float = 15.0, epoch: str = ""
+    ):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.epoch = epoch
+        self._seq = 0
+        self._latest: Dict[str, Tuple[int, bytes]] = {}
+        self._fingerprints: Dict[str, Hashable] = {}
+        self._backlog: Deque[Tuple[int, str, bytes]] = deque(maxlen=backlog)
+        self._clients: Set[LiveClient] = set()
+        self._wildcard: Set[LiveClient] = set()            # clients that want every key
+        self._by_key: Dict[str, Set[LiveClient]] = {}      # key -> scoped clients
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    # ---- producer side ------------------------------------------------------
+
+    def _frame(self, seq: int, event: dict) -> bytes:
+        body = json.dumps(event, separators=(",", ":"))
+        event_id = f"{self.epoch}.{seq}" if self.epoch else str(seq)
+        return f"id: {event_id}\ndata: {body}\n\n".encode("utf-8")
+
+    def publish(
+        self,
+        key: str,
+        event: dict,
+        *,
+        fingerprint: Optional[Hashable] = None,
+        state: Optional[dict] = None,
+    ) -> bool:
+        """Encode and fan out one event. Returns False if it was deduplicated."""
+        if fingerprint is not None:
+            if self._fingerprints.get(key) == fingerprint:
+                return False
+            self._fingerprints[key] = fingerprint
+
+        self._seq += 1
+        seq = self._seq
+        frame = self._frame(seq, event)
+
+        self._latest[key] = (seq, frame if state is None else self._frame(seq, state))
+        self._backlog.append((seq, key, frame))
+        for clients in (self._wildcard, self._by_key.get(key, ())):
+            for c in clients:
+                if c.lagged:
+                    continue
+                try:
+                    c.queue.put_nowait((seq, frame))
+                except asyncio.QueueFull:
+                    self._coalesce(c)
+        return True
+
+    @staticmethod
+    def _coalesce(c: LiveClient):
+        while not c.queue.empty():
+            c.queue.get_nowait()
+        c.lagged = True
+        # wake the consumer so it notices the flag
+        c.queue.put_nowait((0, b""))
+
+    # ---- subscriptions ------------------------------------------------------
+
+    def open(self, keys: Optional[Collection[str]] = None) -> LiveClient:
+        """A client for `stream(client=...)`, limited to `keys` (None = every key)."""
+        c = LiveClient(self.queue_size, keys)
+        self._clients.add(c)
+        if c.keys is None:
+            self._wildcard.add(c)
+        else:
+            for key in c.keys:
+                self._by_key.setdefault(key, set()).add(c)
+        return c
+
+    def close(self, c: LiveClient):
+        self._clients.discard(c)
+        self._wildcard.discard(c)
+        for key in c.keys or ():
+            self._drop(key, c)
+
+    def _drop(self, key: str, c: LiveClient):
+        clients = self._by_key.get(key)
+        if clients is not None:
+            clients.discard(c)
+            if not clients:
+                del self._by_key[key]
+
+    def subscribe(self, c: LiveClient, keys: Iterable[str]):
+        """Add `keys` to a scoped client; it gets their latest state right away."""
+        if c.keys is None:
+            return
+        added = [k for k in keys if k not in c.keys]
+        for key in added:
+            c.keys.add(key)
+            self._by_key.setdefault(key, set()).add(c)
+        # Queued in seq order behind everything already queued; seq 0 marks
+        # them as out-of-band so the consumer's resume check lets them through.
+        for seq, frame in sorted(self._latest[k] for k in added if k in self._latest):
+            if c.lagged:
+                break
+            try:
+                c.queue.put_nowait((0, frame))
+            except asyncio.QueueFull:
+                self._coalesce(c)
+        if added and c.lagged:
+            c.delivered = 0  # so the coalesced catch-up covers the new keys too
+
+    def unsubscribe(self, c: LiveClient, keys: Iterable[str]):
+        """Remove `keys` from a client (a client on every key becomes scoped to the rest)."""
+        if c.keys is None:
+            self._wildcard.discard(c)
+            c.keys = set(self._latest)
+            for key in c.keys:
+                self._by_key.setdefault(key, set()).add(c)
+        for key in keys:
+            if key in c.keys:
+                c.keys.discard(key)
+                self._drop(key, c)
+
+    # ---- consumer side ------------------------------------------------------
+
+    def _latest_since(self, seq: int, c: LiveClient) -> List[Tuple[int, bytes]]:
+        return sorted((x for k, x in self._latest.items() if x[0] > seq and c.wants(k)), key=lambda x: x[0])
+
+    def _catch_up(self, last_event_id: Optional[int], c: LiveClient) -> List[Tuple[int, bytes]]:
+        """
+        Frames a (re)connecting client needs: the backlog tail if `last_event_id`
+        is still covered by it, otherwise the latest frame per key.
+        """
+        if last_event_id is None or last_event_id > self._seq:
+            return self._latest_since(0, c)
+        if self._backlog and self._backlog[0][0] <= last_event_id + 1:
+            return [(seq, frame) for seq, key, frame in self._backlog if seq > last_event_id and c.wants(key)]
+        return self._latest_since(last_event_id, c)
+
+    async def stream(
+        self,
+        *,
+        last_event_id: Optional[int] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        keys: Optional[Collection[str]] = None,
+        client: Optional[LiveClient] = None,
+    ) -> AsyncIterator[bytes]:
+        c = client or self.open(keys)
+        try:
+            pending: Iterable[Tuple[int, bytes]] = self._catch_up(last_event_id, c)
+            while True:
+                for seq, frame in pending:
+                    if seq > c.delivered:
+                        c.delivered = seq
+                        yield frame
+                pending = ()
+
+                if c.lagged:
+                    c.lagged = False
+                    pending = self._latest_since(c.delivered, c)
+                    continue
+
+                try:
+                    seq, frame = await asyncio.wait_for(c.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        break
+                    yield HEARTBEAT_FRAME
+                    continue
+                if not frame:
+                    continue
+                if seq == 0:  # state for a key subscribed mid-stream
+                    yield frame
+                    continue
+                pending = ((seq, frame),)
+        finally:
+            self.close(c)
+
+
+def frame_data(frame: bytes) -> bytes:
+    """The JSON payload of an SSE frame (for transports without SSE framing)."""
+    start = frame.find(b"data: ")
+    return frame[start + 6:-2] if start >= 0 else b""
+
+
+def parse_last_event_id(value: Optional[Any], epoch: str = "") -> Optional[int]:
+    """Sequence number from a Last-Event-ID, or None if absent or from another epoch."""
+    if value in (None, ""):
+        return None
+    raw = str(value).strip()
+    if epoch:
+        prefix, _, raw = raw.rpartition(".")
+        if prefix != epoch:
+            return None
+    try:
+        return int(raw)
+    except ValueError:
+        return None
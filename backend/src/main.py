@@ -1,13 +1,18 @@
-from fastapi import FastAPI, HTTPException, Query, Response
+from fastapi import FastAPI, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from starlette.requests import Request
-from starlette.responses import StreamingResponse
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 import asyncio
-import json
 import os
 import time
-from typing import Dict, List, Optional, Any
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Set, Tuple
+
+import numpy as np
 
 # ---- App + CORS -------------------------------------------------------------
 
@@ -17,6 +22,16 @@ app = FastAPI(title="EAs Dashboard API", version="0.1.0")
 origins_env = os.getenv("CORS_ORIGINS", "http://localhost:5173")
 origins = [o.strip() for o in origins_env.split(",") if o.strip()]
 
+from .metrics import POLL_CYCLE_SECONDS, REGISTRY, SNAPSHOT_STORE_ERRORS, RequestTimingMiddleware  # noqa: E402
+
+# Compress larger bodies (/snapshots/latest, history) for clients that accept gzip;
+# SSE is never buffered by this middleware
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1024")), compresslevel=6)
+
+# Per-request latency histogram + Server-Timing header (cheap; on by default)
+if os.getenv("METRICS_REQUEST_TIMING", "1") == "1":
+    app.add_middleware(RequestTimingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -32,14 +47,22 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_ENABLED = bool(SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY)
 
-supabase_client: Optional[Any] = None
+from .supabase_rest import SupabaseError, SupabaseREST, eq, gte, lt, lte, not_null  # noqa: E402
+
+# One pooled keep-alive client for the whole process; connected on startup,
+# closed on shutdown. Every query carries its own timeout.
+supabase_client: Optional[SupabaseREST] = None
 if SUPABASE_ENABLED:
-    try:
-        from supabase import create_client  # type: ignore
-        supabase_client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)  # type: ignore
-    except Exception:
-        supabase_client = None
-        SUPABASE_ENABLED = False
+    supabase_client = SupabaseREST(
+        SUPABASE_URL,  # type: ignore[arg-type]
+        SUPABASE_SERVICE_ROLE_KEY,  # type: ignore[arg-type]
+        timeout=float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "5")),
+        max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")),
+    )
+
+@app.exception_handler(SupabaseError)
+async def _supabase_error(request: Request, exc: SupabaseError):
+    return JSONResponse(status_code=502, content={"detail": str(exc)})
 
 @app.get("/health")
 def health():
@@ -50,17 +73,31 @@ def root():
     return {
         "service": "EAs Dashboard API",
         "status": "ok",
-        "endpoints": ["/health", "/accounts", "/groups", "/snapshots/latest", "/live"],
+        "endpoints": [
+            "/health", "/accounts", "/groups", "/snapshots/latest", "/snapshots/changes", "/live",
+            "/accounts/{login}/positions", "/accounts/{login}/history", "/groups/{name}/history",
+            "/groups/{name}/summary",
+            "/bridge/status", "/metrics",
+        ],
     }
 
 # ---- MT5 bridge wiring ------------------------------------------------------
 
 from .mt5_bridge import (  # noqa: E402
-    MT5Manager,
     load_accounts_json,
-    snapshot_to_dict,
     MT5_ENABLED,
 )
+from .collector import circuit_gauge, policy_from_env, pool_from_env, store_path  # noqa: E402
+from .live_hub import HEARTBEAT_FRAME, LiveHub, frame_data, parse_last_event_id  # noqa: E402
+from .changes import ChangeLog  # noqa: E402
+from .aggregates import ALL_ACCOUNTS, SORTS, GroupIndex  # noqa: E402
+from .cache import AsyncTTLCache, EncodedJSON, encode_bytes, encode_json, json_response  # noqa: E402
+from .downsample import downsample, step_sum  # noqa: E402
+from .positions import diff_positions  # noqa: E402
+from .risk import RiskConfig, RiskTracker  # noqa: E402
+from .scheduler import PollScheduler  # noqa: E402
+from .snapshot_store import SnapshotStore  # noqa: E402
+from . import wire  # noqa: E402
 
 # Load accounts.json only when MT5 is enabled (dev/local)
 ACCOUNTS_BY_LOGIN: Dict[int, dict] = load_accounts_json() if MT5_ENABLED else {}
@@ -81,124 +118,547 @@ ACCOUNTS_LIST: List[dict] = sorted(
     key=lambda x: (x["label"] or "").lower(),
 )
 
-MANAGER = MT5Manager()
+# BRIDGE_COLLECTOR=inline (default): this process polls MT5 itself, so run a
+# single worker. BRIDGE_COLLECTOR=external: `python -m src.collector` polls and
+# writes to the shared SNAPSHOT_STORE; any number of API workers follow it.
+EXTERNAL_COLLECTOR = MT5_ENABLED and os.getenv("BRIDGE_COLLECTOR", "inline") == "external"
+STORE: Optional[SnapshotStore] = SnapshotStore(store_path()) if EXTERNAL_COLLECTOR else None
+
+# One worker process (and MT5 session) per terminal_path — local, inline only
+# (MT5 calls run under deadlines; hung workers are restarted, failing terminals
+# are skipped by a circuit breaker)
+POOL = pool_from_env(ACCOUNTS_BY_LOGIN.values() if not EXTERNAL_COLLECTOR else [])
 SNAPSHOTS: Dict[int, dict] = {}  # in-memory cache (local only)
 POLL_TASK: Optional[asyncio.Task] = None
 
+# Per-account deadlines: fast while active, slow while idle, backoff on failure
+# (one partition per terminal, each polled by its own loop)
+SCHEDULER = PollScheduler(
+    ACCOUNTS_BY_LOGIN.keys() if not EXTERNAL_COLLECTOR else [], policy_from_env(), partition_of=POOL.terminal_of
+)
+
+# Per-group totals and sort orders, updated as snapshots arrive
+INDEX = GroupIndex()
+# (an optional "group" per account in accounts.json scopes /live?group=)
+INDEX.sync_accounts(
+    {**a, "group_name": ACCOUNTS_BY_LOGIN[a["login"]].get("group")} for a in ACCOUNTS_LIST
+)
+
+# Streaming drawdown / daily P&L / limit distances per account (keyed by login
+# hint) for local snapshots, seeded in the background on startup from the
+# metrics push_snapshots persists (RISK_STATE_TABLE = its PUSH_RISK_TABLE), else
+# from stored history. Supabase-backed reads serve those persisted metrics
+# as they are, so every worker reports the same figures.
+RISK = RiskTracker(RiskConfig.from_env())
+RISK_REBUILD = os.getenv("RISK_REBUILD", "1") == "1"
+RISK_STATE_TABLE = os.getenv("RISK_STATE_TABLE", "")
+
+# Single producer for /live: events are encoded once and shared by all clients.
+# Event ids carry a per-process epoch so resuming on another worker (or after a
+# restart) falls back to the full state.
+HUB = LiveHub(
+    queue_size=int(os.getenv("LIVE_CLIENT_QUEUE", "256")),
+    backlog=int(os.getenv("LIVE_BACKLOG", "2048")),
+    heartbeat=float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15")),
+    epoch=uuid.uuid4().hex[:8],
+)
+
+# Latest /snapshots/latest-shaped row per account with a version, for pollers
+# that can't hold the stream open (/snapshots/changes). Fed by local snapshots,
+# or in the cloud by every Supabase load; a row only counts as changed when its
+# figures do. Wherever several workers serve the API, versions come from the
+# data so any worker can answer any cursor: the snapshot time in ms (cloud) or
+# the store generation (external collector). The inline poller runs in a
+# single worker and counts its own updates.
+if EXTERNAL_COLLECTOR:
+    CHANGES = ChangeLog(epoch="g" + STORE.id(), shared=True)
+elif MT5_ENABLED:
+    CHANGES = ChangeLog(epoch=HUB.epoch)
+else:
+    CHANGES = ChangeLog(epoch="t", shared=True)
+CHANGES_MAX_WAIT = float(os.getenv("CHANGES_MAX_WAIT_SECONDS", "25"))
+
+
+def _record_change(row: dict, version: Optional[int] = None):
+    snap = row["snapshot"]
+    CHANGES.update(
+        row["login_hint"],
+        row,
+        version=version,
+        fingerprint=(snap["balance"], snap["equity"], snap["margin"], snap["margin_free"], row["net_return_pct"]),
+    )
+
+
+# Last (snapshot, ticket -> position) sent on the live stream, per login
+_LIVE_STATE: Dict[int, Tuple[dict, Dict[int, dict]]] = {}
+
+
+def _publish_snapshot(login: int, s: dict):
+    """
+    Push one account to the live hub. The first event for an account is a full
+    `positions_snapshot`; after that only `positions_delta` events keyed by
+    ticket are sent, and nothing at all when neither equity nor positions moved.
+    """
+    snapshot = {
+        "balance": s.get("balance"),
+        "equity": s.get("equity"),
+        "margin": s.get("margin"),
+        "margin_free": s.get("margin_free"),
+    }
+    positions = {int(p["ticket"]): p for p in (s.get("positions") or [])}
+    ts = round(float(s.get("timestamp") or time.time()), 3)
+    state = {
+        "type": "positions_snapshot",
+        "account": str(login),
+        "positions": list(positions.values()),
+        "snapshot": snapshot,
+        "risk": s.get("risk"),
+        "ts": ts,
+    }
+
+    prev = _LIVE_STATE.get(login)
+    _LIVE_STATE[login] = (snapshot, positions)
+    if prev is None:
+        HUB.publish(str(login), state)
+        return
+
+    opened, modified, closed = diff_positions(prev[1], positions)
+    if not (opened or modified or closed) and snapshot == prev[0]:
+        return
+    evt = {
+        "type": "positions_delta",
+        "account": str(login),
+        "snapshot": snapshot,
+        "opened": opened,
+        "modified": modified,
+        "closed": closed,
+        "risk": s.get("risk"),
+        "ts": ts,
+    }
+    HUB.publish(str(login), evt, state=state)
+
+
+def _update_risk(login: int, s: dict) -> Optional[dict]:
+    """Fold a local snapshot into RISK and attach the metrics to it as s["risk"]."""
+    if s.get("equity") is None:
+        return None
+    acc = ACCOUNTS_BY_LOGIN.get(int(login)) or {}
+    s["risk"] = RISK.update(
+        str(login), float(s.get("timestamp") or time.time()), float(s["equity"]), acc.get("account_size")
+    )
+    return s["risk"]
+
+
+def _apply_snapshot(login: int, s: dict, version: Optional[int] = None):
+    """
+    A fresh local snapshot: cache it, fold it into the index and risk state,
+    publish it. `version` is its store generation (external collector only).
+    """
+    _update_risk(login, s)
+    SNAPSHOTS[login] = s
+    INDEX.update(str(login), balance=s.get("balance"), equity=s.get("equity"), updated_at=s.get("timestamp"))
+    _publish_snapshot(login, s)
+    _record_change(_snapshot_row(login, s), version)
+    _resolve_waiters(login, s)
+
+
+def _snapshot_row(login: int, s: dict) -> dict:
+    """A local snapshot in the /snapshots/latest row shape."""
+    size = _num((ACCOUNTS_BY_LOGIN.get(int(login)) or {}).get("account_size"))
+    equity = _num(s.get("equity"))
+    return {
+        "login_hint": str(login),
+        "snapshot": {
+            "balance": s.get("balance"),
+            "equity": s.get("equity"),
+            "margin": s.get("margin"),
+            "margin_free": s.get("margin_free"),
+        },
+        "net_return_pct": (equity - size) / size * 100.0 if equity is not None and size else None,
+        "risk": s.get("risk"),
+        "updated_at": s.get("timestamp"),
+    }
+
+
+# Requests waiting for an account's next snapshot. Whichever poll (or store
+# read) brings it resolves them all, so concurrent readers share the poller's
+# fetch instead of each asking the terminal worker for its own.
+_WAITERS: Dict[int, List[asyncio.Future]] = {}
+# Per terminal: cuts that terminal's poll loop sleep short when one of its accounts is expedited
+_POLL_WAKE: Dict[str, asyncio.Event] = {path: asyncio.Event() for path in POOL.terminals}
+SNAPSHOT_WAIT_SECONDS = float(os.getenv("SNAPSHOT_WAIT_SECONDS", "15"))
+
+
+def _resolve_waiters(login: int, s: Optional[dict] = None, error: Optional[str] = None):
+    for fut in _WAITERS.pop(login, ()):
+        if fut.done():  # timed out already
+            continue
+        if error is None:
+            fut.set_result(s)
+        else:
+            fut.set_exception(RuntimeError(error))
+
+
+async def _snapshot_within(login: int, max_age: float, deadline: float) -> dict:
+    """
+    Snapshot of `login` taken at most `max_age` seconds ago. Served from
+    SNAPSHOTS when fresh enough; otherwise joins the account's in-flight fetch,
+    or moves it to the front of the poll schedule, and waits for the result
+    until `deadline` (loop time). Raises TimeoutError, or RuntimeError with the
+    fetch error.
+    """
+    loop = asyncio.get_running_loop()
+    oldest = time.time() - max_age
+    while True:
+        s = SNAPSHOTS.get(login)
+        if s is not None and float(s.get("timestamp") or 0) >= oldest:
+            return s
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise asyncio.TimeoutError()
+        fut = loop.create_future()
+        _WAITERS.setdefault(login, []).append(fut)
+        if not EXTERNAL_COLLECTOR:  # the external collector keeps its own schedule
+            SCHEDULER.expedite(login)
+            wake = _POLL_WAKE.get(POOL.terminal_of(login))
+            if wake is not None:
+                wake.set()
+        try:
+            await asyncio.wait_for(fut, remaining)
+        except asyncio.TimeoutError:
+            waiters = _WAITERS.get(login)
+            if waiters and fut in waiters:
+                waiters.remove(fut)
+            raise
+
 
 async def _poll_snapshots():
     """
-    Periodically refresh account snapshots using MT5Manager (local only).
-    On Heroku (MT5_DISABLED), this just sleeps.
+    Refresh account snapshots as the scheduler makes them due (local only).
+    Every terminal gets its own loop, so a slow or hung terminal only delays
+    its own accounts while the others keep their cadence.
+    Risk state is rebuilt alongside; samples polled before it is done are
+    merged into it. On Heroku (MT5_DISABLED), this just sleeps.
     """
-    interval = int(os.getenv("BRIDGE_POLL_SECONDS", "10"))
+    idle_sleep = float(os.getenv("BRIDGE_POLL_SECONDS", "10"))
+    if not MT5_ENABLED or not POOL.terminals:
+        while True:
+            await asyncio.sleep(idle_sleep)
+
+    rebuild = asyncio.create_task(_rebuild_risk())
+
+    # one thread per terminal, so hung fetches cannot starve the default executor
+    executor = ThreadPoolExecutor(max_workers=len(POOL.terminals), thread_name_prefix="mt5-poll")
+    try:
+        await asyncio.gather(*(_poll_terminal(path, executor) for path in POOL.terminals))
+    finally:
+        rebuild.cancel()
+        executor.shutdown(wait=False)
+
+
+async def _poll_terminal(path: str, executor: ThreadPoolExecutor):
+    """Poll loop of one terminal: fetch its due accounts, apply each outcome, sleep until the next deadline."""
+    loop = asyncio.get_running_loop()
+    wake = _POLL_WAKE[path]
     while True:
-        if not MT5_ENABLED:
-            await asyncio.sleep(interval)
-            continue
+        due = SCHEDULER.pop_due(partition=path)
+        if due:
+            t0 = time.perf_counter()
+            try:
+                snaps, errors = await loop.run_in_executor(executor, POOL.fetch_terminal, path, due)
+            except Exception as e:
+                snaps, errors = {}, {login: str(e) for login in due}
+            POLL_CYCLE_SECONDS.observe(time.perf_counter() - t0)
+            for login in due:
+                snap = snaps.get(login)
+                if snap is None:
+                    SCHEDULER.record_failure(login, errors.get(login) or "no result")
+                    _resolve_waiters(login, error=errors.get(login) or "no result")
+                    continue
+                _apply_snapshot(login, snap)
+                SCHEDULER.record_success(login, snap)
 
-        for row in ACCOUNTS_LIST:
-            acc = ACCOUNTS_BY_LOGIN.get(int(row["login"]))
-            if not acc:
-                continue
+        wait = SCHEDULER.seconds_until_next(partition=path)
+        try:
+            await asyncio.wait_for(wake.wait(), min(1.0, wait) if wait is not None else 1.0)
+        except asyncio.TimeoutError:
+            pass
+        wake.clear()
+
+
+async def _follow_store():
+    """
+    External-collector mode: mirror the shared snapshot store into this
+    worker's SNAPSHOTS and live hub. Checking the generation is a PRAGMA when
+    nothing changed; only rows newer than the last seen generation are read.
+    Read errors are counted in eas_snapshot_store_errors_total and logged
+    when they start, change or clear. Risk state is rebuilt alongside.
+    """
+    interval = float(os.getenv("SNAPSHOT_STORE_POLL_SECONDS", "0.25"))
+    seen = 0
+    failing: Optional[str] = None
+    rebuild = asyncio.create_task(_rebuild_risk())
+    try:
+        while True:
             try:
-                snap = await asyncio.to_thread(
-                    MANAGER.fetch_snapshot,
-                    label=acc["label"],
-                    login=int(acc["login"]),
-                    password=acc["password"],
-                    server=acc["server"],
-                    currency=acc.get("currency", ""),
-                    terminal_path=acc["terminal_path"],
-                )
-                SNAPSHOTS[int(acc["login"])] = snapshot_to_dict(snap)
-            except Exception:
-                pass
-        await asyncio.sleep(interval)
+                current = STORE.generation()
+                if current < seen:  # store was recreated: cursors into the old one are void
+                    seen = 0
+                    CHANGES.reset("g" + STORE.id())
+                if current != seen:
+                    seen, changed = await asyncio.to_thread(STORE.changes_since, seen)
+                    for login, snap in changed.items():
+                        _apply_snapshot(login, snap, seen)
+                if failing is not None:
+                    print(f"[OK] snapshot store {STORE.path} readable again")
+                    failing = None
+            except Exception as e:
+                SNAPSHOT_STORE_ERRORS.inc()
+                if str(e) != failing:
+                    print(f"[WARN] reading snapshot store {STORE.path} failed, serving stale snapshots: {e}")
+                    failing = str(e)
+            await asyncio.sleep(interval)
+    finally:
+        rebuild.cancel()
+
+
+# ---- Read caches ------------------------------------------------------------
+
+# Every open tab polls these endpoints, so Supabase-backed responses are cached
+# (encoded once, with an ETag) and concurrent misses share one upstream query.
+# Loaders are coroutines on the shared client, so a miss never holds a thread.
+TTL_SNAPSHOTS = float(os.getenv("CACHE_TTL_SNAPSHOTS", "2"))
+TTL_GROUPS = float(os.getenv("CACHE_TTL_GROUPS", "30"))
+TTL_ACCOUNTS = float(os.getenv("CACHE_TTL_ACCOUNTS", "30"))
+TTL_ACCOUNT_MAP = float(os.getenv("CACHE_TTL_ACCOUNT_MAP", "300"))
+
+SNAPSHOTS_CACHE = AsyncTTLCache(TTL_SNAPSHOTS)
+GROUPS_CACHE = AsyncTTLCache(TTL_GROUPS)
+ACCOUNTS_CACHE = AsyncTTLCache(TTL_ACCOUNTS)
+ACCOUNT_MAP_CACHE = AsyncTTLCache(TTL_ACCOUNT_MAP)  # accounts rows keyed by id (changes rarely)
+DIRECTORY_CACHE = AsyncTTLCache(TTL_ACCOUNTS)  # group membership feeding INDEX
+
+
+async def _account_map() -> Dict[str, dict]:
+    """Supabase 'accounts' rows keyed by str(id), cached separately with a long TTL."""
+    async def load() -> Dict[str, dict]:
+        rows = await supabase_client.select("accounts", "id,name,broker,mt5_login,base_currency,account_size")
+        return {str(a["id"]): a for a in rows}
+    return await ACCOUNT_MAP_CACHE.get_or_load("by_id", load)
 
 
 # ---- REST endpoints ---------------------------------------------------------
 
+async def _load_accounts(group: Optional[str]) -> List[dict]:
+    if group:
+        rows = await supabase_client.select(
+            "v_accounts_with_group",
+            "name,broker,mt5_login,base_currency,account_size,group_name",
+            filters=[eq("group_name", group)],
+            order="name",
+        )
+    else:
+        rows = await supabase_client.select(
+            "accounts", "name,broker,mt5_login,base_currency,account_size", order="name"
+        )
+
+    return [_account_row(r) for r in rows]
+
+
+def _account_row(r: dict) -> dict:
+    return {
+        "label": r.get("name"),
+        "login": 0,
+        "login_hint": str(r.get("mt5_login") or r.get("id")),
+        "server": r.get("broker") or "",
+        "currency": r.get("base_currency") or "USD",
+        "account_size": r.get("account_size"),
+    }
+
+
+async def _load_directory() -> int:
+    """Every account with its group, synced into INDEX; returns the account count."""
+    rows = await supabase_client.select(
+        "v_accounts_with_group", "id,name,broker,mt5_login,base_currency,account_size,group_name", order="name"
+    )
+    INDEX.sync_accounts({**_account_row(r), "group_name": r.get("group_name")} for r in rows)
+    return len(rows)
+
+
+async def _refresh_index():
+    """
+    Cloud: make sure INDEX reflects current membership and the latest
+    snapshots (both cached loads, so this is usually free). Local: the
+    poller keeps INDEX current by itself.
+    """
+    if MT5_ENABLED or not supabase_client:
+        return
+    await DIRECTORY_CACHE.get_or_load("all", _load_directory)
+    await SNAPSHOTS_CACHE.get_or_load("latest", _load_snapshot_encodings)
+
+
 @app.get("/accounts")
-def list_accounts(group: Optional[str] = Query(default=None)) -> List[dict]:
+async def list_accounts(
+    request: Request,
+    group: Optional[str] = Query(default=None),
+    sort: Optional[str] = Query(default=None, pattern="^(" + "|".join(SORTS) + ")$"),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None),
+) -> Response:
     """
     List accounts without secrets.
     - Local (MT5_ENABLED=1): from accounts.json
     - Cloud (MT5_ENABLED=0): from Supabase 'accounts' or view 'v_accounts_with_group'
+
+    With `sort` (alpha | equity_asc | equity_desc | net_asc | net_desc),
+    `limit` or `cursor`, rows come from the server-side index instead and
+    also carry balance, equity, net_return_pct and updated_at. Accounts
+    without a value sort last. When there are more rows, `X-Next-Cursor`
+    holds the cursor for the next page.
     """
+    if sort or limit or cursor:
+        await _refresh_index()
+        try:
+            rows, next_cursor = INDEX.page(group or ALL_ACCOUNTS, sort or "alpha", limit or 1000, cursor)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Group not found")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        resp = json_response(request, encode_json(rows), 0)
+        if next_cursor:
+            resp.headers["X-Next-Cursor"] = next_cursor
+        return resp
+
     if MT5_ENABLED:
-        return ACCOUNTS_LIST
+        if group:
+            members = INDEX.members(group)
+            return json_response(
+                request, encode_json([a for a in ACCOUNTS_LIST if str(a["login"]) in members]), TTL_ACCOUNTS
+            )
+        return json_response(request, encode_json(ACCOUNTS_LIST), TTL_ACCOUNTS)
 
     if not supabase_client:
-        return []
+        return json_response(request, encode_json([]), 0)
 
-    if group:
-        resp = supabase_client.from_("v_accounts_with_group").select(
-            "name,broker,mt5_login,base_currency,account_size,group_name"
-        ).eq("group_name", group).order("name").execute()
-    else:
-        resp = supabase_client.table("accounts").select(
-            "name,broker,mt5_login,base_currency,account_size"
-        ).order("name").execute()
+    async def load():
+        return encode_json(await _load_accounts(group))
 
-    out: List[dict] = []
-    for r in (resp.data or []):
-        out.append({
-            "label": r.get("name"),
-            "login": 0,
-            "login_hint": str(r.get("mt5_login") or r.get("id")),
-            "server": r.get("broker") or "",
-            "currency": r.get("base_currency") or "USD",
-            "account_size": r.get("account_size"),
-        })
+    encoded = await ACCOUNTS_CACHE.get_or_load(("accounts", group or ""), load)
+    return json_response(request, encoded, TTL_ACCOUNTS)
+
+
+async def _fetch_live(login: int, max_age: float, timeout: float) -> dict:
+    """_snapshot_within() for one request, with its errors mapped to HTTP."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    try:
+        return await _snapshot_within(login, max_age, deadline)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="No snapshot within the deadline")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/accounts/snapshots")
+async def get_snapshots(
+    logins: str = Query(..., description="Comma-separated MT5 logins"),
+    max_age: float = Query(default=5.0, ge=0),
+    timeout: float = Query(default=2.0, gt=0, le=60),
+) -> dict:
+    """
+    Snapshots for many accounts (local MT5 only) within one deadline: every
+    account whose snapshot is fresh enough or arrives within `timeout`, plus
+    the logins still pending and the ones whose fetch failed.
+    """
+    if not MT5_ENABLED:
+        raise HTTPException(status_code=503, detail="Live MT5 is disabled on this deployment.")
+    try:
+        wanted = list(dict.fromkeys(int(x) for x in logins.split(",") if x.strip()))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="logins must be comma-separated integers")
+
+    deadline = asyncio.get_running_loop().time() + timeout
+    tasks = {
+        login: asyncio.ensure_future(_snapshot_within(login, max_age, deadline))
+        for login in wanted
+        if login in ACCOUNTS_BY_LOGIN
+    }
+    if tasks:
+        await asyncio.wait(tasks.values())  # each one gives up at the deadline
+
+    out: Dict[str, Any] = {
+        "snapshots": {},
+        "pending": [],
+        "errors": {str(login): "Account not found" for login in wanted if login not in tasks},
+    }
+    for login, task in tasks.items():
+        exc = task.exception()
+        if exc is None:
+            out["snapshots"][str(login)] = task.result()
+        elif isinstance(exc, asyncio.TimeoutError):
+            out["pending"].append(str(login))
+        else:
+            out["errors"][str(login)] = str(exc)
     return out
 
 
 @app.get("/accounts/{login}/snapshot")
-def get_snapshot(login: int) -> dict:
-    """Fetch a live snapshot for one account (local MT5 only)."""
+async def get_snapshot(
+    login: int,
+    max_age: float = Query(default=0.0, ge=0),
+    timeout: float = Query(default=SNAPSHOT_WAIT_SECONDS, gt=0, le=60),
+) -> dict:
+    """
+    Snapshot for one account (local MT5 only) taken at most `max_age` seconds
+    ago; the default 0 means one taken after the request arrived. Served from
+    the poller's cache when fresh enough, otherwise by the poller's next fetch.
+    """
     if not MT5_ENABLED:
         raise HTTPException(status_code=503, detail="Live MT5 is disabled on this deployment.")
-    acc = ACCOUNTS_BY_LOGIN.get(int(login))
-    if not acc:
+    if int(login) not in ACCOUNTS_BY_LOGIN:
         raise HTTPException(status_code=404, detail="Account not found")
-    try:
-        snap = MANAGER.fetch_snapshot(
-            label=acc["label"],
-            login=int(acc["login"]),
-            password=acc["password"],
-            server=acc["server"],
-            currency=acc.get("currency", ""),
-            terminal_path=acc["terminal_path"],
-        )
-        return snapshot_to_dict(snap)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    return await _fetch_live(int(login), max_age, timeout)
 
 
-@app.get("/groups")
-def groups_summary() -> List[dict]:
+@app.get("/accounts/{login}/positions")
+async def get_positions(login: str) -> dict:
     """
-    Returns [{ name, count, sort_index }], including 'All Accounts'.
+    Open positions for one account, from the poller's latest snapshot
+    (waiting for its first fetch if the poller has not seen the account yet).
+    Cloud deployments have no positions source and return an empty list.
     """
-    if not SUPABASE_ENABLED or not supabase_client:
-        return [
-            {"name": "All Accounts", "count": len(ACCOUNTS_LIST), "sort_index": 0},
-            {"name": "E2T Demos", "count": 0, "sort_index": 1},
-            {"name": "Nish Algos", "count": 0, "sort_index": 2},
-        ]
+    if not MT5_ENABLED:
+        return {"login_hint": login, "snapshot": None, "positions": [], "updated_at": None}
+    try:
+        key = int(login)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Account not found")
+    if key not in ACCOUNTS_BY_LOGIN:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    s = await _fetch_live(key, float("inf"), SNAPSHOT_WAIT_SECONDS)
+    return {
+        "login_hint": login,
+        "snapshot": {
+            "balance": s.get("balance"),
+            "equity": s.get("equity"),
+            "margin": s.get("margin"),
+            "margin_free": s.get("margin_free"),
+        },
+        "positions": s.get("positions") or [],
+        "risk": s.get("risk") or RISK.metrics(str(key)),
+        "updated_at": s.get("timestamp"),
+    }
 
-    counts = supabase_client.from_("v_account_counts_by_group").select(
-        "group_name,account_count"
-    ).execute()
 
-    tabs = supabase_client.table("account_groups").select(
-        "name,sort_index"
-    ).execute()
+async def _load_groups() -> List[dict]:
+    counts, tabs = await asyncio.gather(
+        supabase_client.select("v_account_counts_by_group", "group_name,account_count"),
+        supabase_client.select("account_groups", "name,sort_index"),
+    )
 
-    sort_map = {t["name"]: t["sort_index"] for t in (tabs.data or [])}
+    sort_map = {t["name"]: t["sort_index"] for t in tabs}
     out: List[dict] = []
-    for row in (counts.data or []):
+    for row in counts:
         name = row.get("group_name") or "All Accounts"
         out.append({
             "name": name,
@@ -213,8 +673,119 @@ def groups_summary() -> List[dict]:
     return out
 
 
+@app.get("/groups")
+async def groups_summary(request: Request) -> Response:
+    """
+    Returns [{ name, count, sort_index }], including 'All Accounts'.
+    Local: the groups of accounts.json (its optional "group" per account).
+    """
+    if not SUPABASE_ENABLED or not supabase_client:
+        counts = INDEX.counts()
+        names = sorted((n for n in counts if n != ALL_ACCOUNTS), key=str.lower)
+        return json_response(request, encode_json(
+            [{"name": n, "count": counts[n], "sort_index": i} for i, n in enumerate([ALL_ACCOUNTS, *names])]
+        ), TTL_GROUPS)
+
+    async def load():
+        return encode_json(await _load_groups())
+
+    encoded = await GROUPS_CACHE.get_or_load("groups", load)
+    return json_response(request, encoded, TTL_GROUPS)
+
+
+@app.get("/groups/{name}/summary")
+async def group_summary(name: str) -> dict:
+    """
+    Aggregates for one group ('All Accounts' = every account), read from the
+    incrementally maintained index:
+    { group, count, reporting, total_balance, total_equity, total_account_size,
+      net_return_pct, best: {login_hint, label, equity, net_return_pct}, worst }
+    `net_return_pct` is total equity over total account size of the accounts
+    that report equity; best/worst rank accounts by their own net %.
+    """
+    await _refresh_index()
+    summary = INDEX.summary(name)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return summary
+
+
+async def _load_risk_rows() -> Dict[str, dict]:
+    """Risk metrics per account id as push_snapshots persists them (RISK_STATE_TABLE); {} without one."""
+    if not RISK_STATE_TABLE:
+        return {}
+    rows = await supabase_client.select(RISK_STATE_TABLE)
+    return {
+        str(r.get("account_id")): {k: v for k, v in r.items() if k not in ("account_id", "updated_at")}
+        for r in rows
+    }
+
+
+async def _load_latest_snapshots() -> List[dict]:
+    snaps, by_id, risks = await asyncio.gather(
+        supabase_client.select(
+            "latest_equity_snapshots",
+            "account_id,balance,equity,margin,free_margin,profit,net_return_pct,timestamp",
+        ),
+        _account_map(),
+        _load_risk_rows(),
+    )
+
+    out: List[dict] = []
+    for s in snaps:
+        acc = by_id.get(str(s["account_id"]))
+        if not acc:
+            continue
+        hint = str(acc.get("mt5_login") or acc.get("id"))
+        INDEX.update(
+            hint,
+            balance=_num(s.get("balance")),
+            equity=_num(s.get("equity")),
+            updated_at=s.get("timestamp"),
+            net_return_pct=_num(s.get("net_return_pct")),
+        )
+        row = {
+            "login_hint": hint,
+            "snapshot": {
+                "balance": s.get("balance"),
+                "equity": s.get("equity"),
+                "margin": s.get("margin"),
+                "margin_free": s.get("free_margin"),
+            },
+            "net_return_pct": s.get("net_return_pct"),
+            "risk": risks.get(str(s["account_id"])),
+            "updated_at": s.get("timestamp"),
+        }
+        if not MT5_ENABLED:  # locally the poller (or the store) feeds the change log
+            _record_change(row, max(1, int(_parse_time(s.get("timestamp"), 0.0) * 1000)))
+        out.append(row)
+    return out
+
+
+def _num(v: Any) -> Optional[float]:
+    return float(v) if v is not None else None
+
+
+async def _load_snapshot_encodings() -> Dict[str, EncodedJSON]:
+    return _encode_snapshots(await _load_latest_snapshots())
+
+
+def _encode_snapshots(rows: List[dict]) -> Dict[str, EncodedJSON]:
+    """Every wire format of one /snapshots/latest result, encoded once per load."""
+    columnar = wire.snapshots_columnar(rows)
+    out = {
+        wire.FORMAT_JSON: encode_json(rows),
+        wire.FORMAT_COLUMNAR: encode_json(columnar, wire.COLUMNAR_MEDIA_TYPE),
+    }
+    if wire.msgpack_available():
+        out[wire.FORMAT_MSGPACK] = encode_bytes(wire.msgpack_dumps(columnar), wire.MSGPACK_MEDIA_TYPE)
+    return out
+
+
 @app.get("/snapshots/latest")
-def latest_snapshots() -> List[dict]:
+async def latest_snapshots(
+    request: Request, format_: Optional[str] = Query(default=None, alias="format")
+) -> Response:
     """
     Returns latest equity metrics per account from Supabase.
     Shape:
@@ -223,75 +794,512 @@ def latest_snapshots() -> List[dict]:
         "login_hint": "52512991",
         "snapshot": { "balance":..., "equity":..., "margin":..., "margin_free":... },
         "net_return_pct": 0.25,           # may be null
+        "risk": { "hwm", "drawdown_pct", "daily_pnl", "max_loss_remaining", ... },
         "updated_at": "2025-11-04T22:10:15.123Z"
       },
       ...
     ]
+    `?format=columnar` (or Accept: application/vnd.eas.columnar+json) returns
+    one array per field instead: {"count", "login_hint": [...], "balance": [...],
+    "equity", "margin", "margin_free", "net_return_pct", "updated_at": [epoch s],
+    "risk": [{...} | null]}.
+    `?format=msgpack` (or Accept: application/msgpack) is the same columnar
+    payload as MessagePack.
+    Cached for CACHE_TTL_SNAPSHOTS seconds; unchanged bodies return 304.
     """
+    try:
+        fmt = wire.negotiate_format(format_, request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if fmt == wire.FORMAT_MSGPACK and not wire.msgpack_available():
+        raise HTTPException(status_code=406, detail="MessagePack is not available on this deployment.")
+
     if not SUPABASE_ENABLED or not supabase_client:
-        return []
+        return json_response(request, _encode_snapshots([])[fmt], 0, vary="Accept")
+
+    encoded = await SNAPSHOTS_CACHE.get_or_load("latest", _load_snapshot_encodings)
+    return json_response(request, encoded[fmt], TTL_SNAPSHOTS, vary="Accept")
+
+
+@app.get("/snapshots/changes")
+async def snapshot_changes(
+    since: Optional[str] = Query(default=None, description="Cursor from the previous response"),
+    wait: float = Query(default=0.0, ge=0, description="Seconds to hold the request for the next change"),
+    group: Optional[str] = Query(default=None),
+    logins: Optional[str] = Query(default=None, description="Comma-separated MT5 logins"),
+) -> dict:
+    """
+    Accounts whose latest figures changed after the `since` cursor, in the
+    /snapshots/latest row shape, and the cursor to send next time:
+    { "cursor": "...", "reset": false, "changes": [ {login_hint, snapshot, ...} ] }
+    Cursors come from the data (snapshot times, or the store generation), so
+    any worker can answer them, across restarts too; only the inline poller's
+    are tied to its process. Without a usable cursor every account is
+    returned and `reset` is true. With `wait` (capped at
+    CHANGES_MAX_WAIT_SECONDS) an up-to-date poller is held until something
+    changes instead of getting an empty list right away. `group` / `logins`
+    limit the feed like /live.
+    """
+    cloud = not MT5_ENABLED and supabase_client is not None
+    version = CHANGES.parse_cursor(since)
+    reset = version is None
+    version = version or 0
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(wait, CHANGES_MAX_WAIT)
+    while True:
+        # cloud: shared with /snapshots/latest, so at most one Supabase read per TTL
+        await _refresh_index()
+        rows = CHANGES.since(version, _live_keys(group, logins))
+        remaining = deadline - loop.time()
+        if rows or remaining <= 0:
+            break
+        # nothing up to here is in scope; only later changes can be (the
+        # cursor may be ahead of this worker if another one answered it)
+        version = max(version, CHANGES.version)
+        # local snapshots arrive on their own; Supabase has to be re-read
+        await CHANGES.wait(version, min(remaining, max(TTL_SNAPSHOTS, 1.0)) if cloud else remaining)
+    return {"cursor": CHANGES.cursor(max(version, CHANGES.version)), "reset": reset, "changes": rows}
+
 
-    acc_res = supabase_client.table("accounts").select(
-        "id,name,broker,mt5_login,base_currency,account_size"
-    ).execute()
-    snap_res = supabase_client.table("latest_equity_snapshots").select(
-        "account_id,balance,equity,margin,free_margin,profit,net_return_pct,timestamp"
-    ).execute()
+# ---- Equity history ---------------------------------------------------------
 
-    by_id = {str(a["id"]): a for a in (acc_res.data or [])}
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "1000"))
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "5000"))
+HISTORY_CONCURRENCY = int(os.getenv("HISTORY_CONCURRENCY", "8"))  # accounts fetched at once per request
+
+# OHLC tiers written by tools/compact_history.py (see tools/rollups.py), finest
+# first. With HISTORY_ROLLUPS=1 history reads use the coarsest tier that still
+# resolves the requested number of points, fall back to coarser tiers for the
+# part of a window that has been pruned from the finer one, and to finer tiers
+# (and raw rows) for the part after the tier's checkpoint.
+HISTORY_ROLLUPS = os.getenv("HISTORY_ROLLUPS", "0") == "1"
+ROLLUP_TIERS = (("1m", 60), ("15m", 900), ("1d", 86400))
+
+
+def _parse_time(value: Optional[str], default: float) -> float:
+    """Epoch seconds from an ISO-8601 string or a plain number."""
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {value}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+async def _account_ids_by_login() -> Dict[str, str]:
+    return {
+        str(a.get("mt5_login") or a.get("id")): str(a["id"]) for a in (await _account_map()).values()
+    }
+
+
+def _history_tier(t0: float, t1: float, points: int) -> Optional[str]:
+    """Coarsest rollup tier with at least `points` buckets in [t0, t1]; None = raw rows."""
+    if not HISTORY_ROLLUPS:
+        return None
+    step = (t1 - t0) / max(1, points)
+    tier = None
+    for name, seconds in ROLLUP_TIERS:
+        if seconds <= step:
+            tier = name
+    return tier
+
+
+async def _fetch_tier_rows(account_id: str, tier: Optional[str], t0: float, t1: float, closed: bool) -> List[dict]:
+    """{timestamp, equity} rows of one tier (None = raw) in [t0, t1] ([t0, t1) unless `closed`), oldest first."""
+    upper = lte if closed else lt
+    if tier is None:
+        # (timestamp, equity) is the page key, so timestamp ties are neither skipped nor repeated
+        return await supabase_client.select_all(
+            "equity_snapshots",
+            "timestamp,equity",
+            filters=[
+                eq("account_id", account_id), not_null("equity"),
+                gte("timestamp", _iso(t0)), upper("timestamp", _iso(t1)),
+            ],
+            keys=("timestamp", "equity"),
+            page_size=HISTORY_PAGE_SIZE,
+        )
+    # a bar is plotted at its bucket start with the bucket's closing equity
+    rows = await supabase_client.select_all(
+        "equity_rollups",
+        "bucket,close",
+        filters=[
+            eq("account_id", account_id), eq("tier", tier),
+            gte("bucket", _iso(t0)), upper("bucket", _iso(t1)),
+        ],
+        keys=("bucket",),
+        page_size=HISTORY_PAGE_SIZE,
+    )
+    return [{"timestamp": r["bucket"], "equity": r.get("close")} for r in rows]
+
+
+async def _rollup_checkpoints(account_id: str) -> Dict[str, float]:
+    """Per tier, the time before which tools/compact_history.py has completed it."""
+    rows = await supabase_client.select(
+        "equity_rollup_checkpoints", "tier,until", filters=[eq("account_id", account_id)]
+    )
+    return {r["tier"]: _parse_time(str(r["until"]), 0.0) for r in rows}
+
+
+async def _fetch_equity_rows(account_id: str, t0: float, t1: float, tier: Optional[str] = None) -> List[dict]:
+    """
+    Equity rows for one account in [t0, t1], oldest first, from `tier` (None =
+    raw equity_snapshots). With HISTORY_ROLLUPS, a rollup tier only serves the
+    window up to its checkpoint; the rest is filled from the finer tiers and
+    finally raw rows. A start of the window that is missing (pruned, or not
+    compacted yet) is filled from the next coarser tiers.
+    """
+    levels: List[Tuple[Optional[str], float]] = [(None, 0.0), *ROLLUP_TIERS]
+    names = [name for name, _ in levels]
+    if tier not in names:
+        raise ValueError(f"unknown history tier: {tier}")
+    if not HISTORY_ROLLUPS:
+        levels = levels[:1]
+    i = names.index(tier)
+
+    # tail: from the served tier down to raw rows, each up to its checkpoint
+    cps = await _rollup_checkpoints(account_id) if i > 0 else {}
     out: List[dict] = []
-    for s in (snap_res.data or []):
-        acc = by_id.get(str(s["account_id"]))
-        if not acc:
+    start = t0
+    for name, _ in reversed(levels[: i + 1]):
+        end = t1 if name is None else max(start, min(t1, cps.get(name, start)))
+        closed = end >= t1
+        if end > start or closed:
+            out += await _fetch_tier_rows(account_id, name, start, end, closed)
+        start = end
+        if closed:
+            break
+
+    # head: coarser tiers, up to the first row found so far
+    end, closed = (_parse_time(str(out[0]["timestamp"]), t1), False) if out else (t1, True)
+    for name, seconds in levels[i + 1:]:
+        # a gap shorter than one bucket of this tier is not worth a query
+        if end - t0 < seconds:
+            break
+        rows = await _fetch_tier_rows(account_id, name, t0, end, closed)
+        out = rows + out
+        if rows:
+            end, closed = _parse_time(str(rows[0]["timestamp"]), end), False
+    return out
+
+
+def _rows_to_series(rows: List[dict]) -> Tuple[np.ndarray, np.ndarray]:
+    ts: List[float] = []
+    vals: List[float] = []
+    for r in rows:
+        if r.get("equity") is None:
             continue
-        out.append({
-            "login_hint": str(acc.get("mt5_login") or acc.get("id")),
-            "snapshot": {
-                "balance": s.get("balance"),
-                "equity": s.get("equity"),
-                "margin": s.get("margin"),
-                "margin_free": s.get("free_margin"),
-            },
-            "net_return_pct": s.get("net_return_pct"),
-            "updated_at": s.get("timestamp"),
-        })
-    # discourage caches
-    Response(headers={"Cache-Control": "no-store"})
+        ts.append(datetime.fromisoformat(str(r["timestamp"]).replace("Z", "+00:00")).timestamp())
+        vals.append(float(r["equity"]))
+    return np.asarray(ts, dtype=np.float64), np.asarray(vals, dtype=np.float64)
+
+
+def _curve_payload(t: np.ndarray, v: np.ndarray, points: int, method: str, compact: bool, **meta) -> dict:
+    idx = downsample(t, v, points, method)
+    t, v = t[idx], v[idx]
+    out = {**meta, "method": method, "count": int(len(idx))}
+    if compact:
+        out["t"] = t.tolist()
+        out["v"] = v.tolist()
+    else:
+        out["points"] = [{"t": a, "v": b} for a, b in zip(t.tolist(), v.tolist())]
     return out
 
 
+def _history_window(from_: Optional[str], to: Optional[str]) -> Tuple[float, float]:
+    t1 = _parse_time(to, time.time())
+    t0 = _parse_time(from_, t1 - 86400)
+    if t0 >= t1:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    return t0, t1
+
+
+@app.get("/accounts/{login}/history")
+async def account_history(
+    login: str,
+    from_: Optional[str] = Query(default=None, alias="from"),
+    to: Optional[str] = Query(default=None),
+    points: int = Query(default=500, ge=2),
+    method: str = Query(default="lttb", pattern="^(lttb|minmax)$"),
+    compact: bool = Query(default=False),
+) -> dict:
+    """
+    Equity curve for one account, downsampled server-side to at most `points`
+    points (LTTB or min/max buckets). `from`/`to` take ISO-8601 or epoch
+    seconds (default: the last 24h). `compact=true` returns parallel `t`/`v`
+    arrays instead of a list of {t, v} objects. Times are epoch seconds.
+    `tier` reports where the points came from ("raw" or a rollup tier).
+    """
+    t0, t1 = _history_window(from_, to)
+    points = min(points, HISTORY_MAX_POINTS)
+    meta = {"login_hint": login, "from": t0, "to": t1}
+    if not SUPABASE_ENABLED or not supabase_client:
+        return _curve_payload(np.empty(0), np.empty(0), points, method, compact, **meta)
+
+    account_id = (await _account_ids_by_login()).get(str(login))
+    if account_id is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    tier = _history_tier(t0, t1, points)
+    meta["tier"] = tier or "raw"
+    rows = await _fetch_equity_rows(account_id, t0, t1, tier)
+
+    def build() -> dict:
+        t, v = _rows_to_series(rows)
+        return _curve_payload(t, v, points, method, compact, **meta)
+
+    # Parsing and downsampling large windows is CPU work; keep it off the loop
+    return await asyncio.to_thread(build)
+
+
+@app.get("/groups/{name}/history")
+async def group_history(
+    name: str,
+    from_: Optional[str] = Query(default=None, alias="from"),
+    to: Optional[str] = Query(default=None),
+    points: int = Query(default=500, ge=2),
+    method: str = Query(default="lttb", pattern="^(lttb|minmax)$"),
+    compact: bool = Query(default=False),
+) -> dict:
+    """
+    Total equity of every account in a group ('All Accounts' = all), summed as
+    step series on the union of their timestamps, then downsampled like
+    /accounts/{login}/history. Unknown groups are a 404, as in /summary.
+    """
+    t0, t1 = _history_window(from_, to)
+    await _refresh_index()
+    if name not in INDEX.counts():
+        raise HTTPException(status_code=404, detail="Group not found")
+    points = min(points, HISTORY_MAX_POINTS)
+    meta = {"group": name, "from": t0, "to": t1}
+    if not SUPABASE_ENABLED or not supabase_client:
+        return _curve_payload(np.empty(0), np.empty(0), points, method, compact, **meta)
+
+    if name == "All Accounts":
+        ids_by_login = await _account_ids_by_login()
+        account_ids = list(ids_by_login.values())
+    else:
+        ids_by_login, members = await asyncio.gather(_account_ids_by_login(), _load_accounts(name))
+        logins = [str(r.get("login_hint")) for r in members]
+        account_ids = [ids_by_login[x] for x in logins if x in ids_by_login]
+
+    sem = asyncio.Semaphore(max(1, HISTORY_CONCURRENCY))
+    tier = _history_tier(t0, t1, points)
+    meta["tier"] = tier or "raw"
+
+    async def fetch(account_id: str) -> List[dict]:
+        async with sem:
+            return await _fetch_equity_rows(account_id, t0, t1, tier)
+
+    per_account = await asyncio.gather(*(fetch(a) for a in account_ids))
+
+    def build() -> dict:
+        t, v = step_sum([_rows_to_series(rows) for rows in per_account])
+        return _curve_payload(t, v, points, method, compact, accounts=len(account_ids), **meta)
+
+    return await asyncio.to_thread(build)
+
+
+# ---- Risk analytics ---------------------------------------------------------
+
+async def _equity_peak(account_id: str) -> Optional[float]:
+    """Highest equity on record: raw rows, plus the rollup highs that outlive pruned raw rows."""
+    queries = {"equity": supabase_client.select(
+        "equity_snapshots", "equity",
+        filters=[eq("account_id", account_id), not_null("equity")], order="equity.desc", limit=1,
+    )}
+    if HISTORY_ROLLUPS:
+        queries["high"] = supabase_client.select(
+            "equity_rollups", "high",
+            filters=[eq("account_id", account_id), not_null("high")], order="high.desc", limit=1,
+        )
+    results = await asyncio.gather(*queries.values())
+    peaks = [float(rows[0][column]) for column, rows in zip(queries, results) if rows]
+    return max(peaks) if peaks else None
+
+
+async def _rebuild_risk():
+    """
+    Seed RISK so the high-water mark and the day's starting equity survive
+    restarts. With RISK_STATE_TABLE that is one query for every account.
+    Accounts missing there are rebuilt from their highest equity on record
+    plus today's raw rows (and the last one before the broker-day rollover),
+    so only their max drawdown is limited to today. Best effort: without
+    Supabase, or on errors, tracking simply starts from the next snapshot.
+    """
+    if not supabase_client or not RISK_REBUILD:
+        return
+    t1 = time.time()
+    day_start = RISK.day_start(t1)
+    sem = asyncio.Semaphore(max(1, HISTORY_CONCURRENCY))
+
+    async def one(acc: dict):
+        account_id = str(acc["id"])
+        async with sem:
+            before, today, peak = await asyncio.gather(
+                supabase_client.select(
+                    "equity_snapshots", "timestamp,equity",
+                    filters=[eq("account_id", account_id), not_null("equity"), lt("timestamp", _iso(day_start))],
+                    order="timestamp.desc", limit=1,
+                ),
+                _fetch_tier_rows(account_id, None, day_start, t1, True),
+                _equity_peak(account_id),
+            )
+        hint = str(acc.get("mt5_login") or acc.get("id"))
+
+        def build():
+            t, v = _rows_to_series(before + today)
+            RISK.rebuild(hint, t, v, acc.get("account_size"), peak=peak)
+
+        await asyncio.to_thread(build)
+
+    try:
+        by_id = await _account_map()
+        pending = dict(by_id)
+        if RISK_STATE_TABLE:
+            for row in await supabase_client.select(RISK_STATE_TABLE):
+                acc = pending.pop(str(row.get("account_id")), None)
+                if acc is not None:
+                    RISK.restore(str(acc.get("mt5_login") or acc.get("id")), row, acc.get("account_size"))
+        results = await asyncio.gather(*(one(a) for a in pending.values()), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            print(f"[WARN] risk state rebuild failed for {len(failed)} account(s): {failed[0]}")
+    except Exception as e:
+        print(f"[WARN] risk state rebuild failed, starting from the next snapshots: {e}")
+
+
+# ---- Bridge status ----------------------------------------------------------
+
+@app.get("/bridge/status")
+def bridge_status() -> dict:
+    """Per-account poll schedule (next due time, last success age, failure streak) and per-terminal circuit state."""
+    labels = {int(a["login"]): a["label"] for a in ACCOUNTS_LIST}
+    if EXTERNAL_COLLECTOR:
+        status = STORE.status() or {}
+        terminals, accounts = status.get("terminals", []), status.get("accounts", [])
+        circuits = status.get("circuits", {})
+    else:
+        terminals, accounts, circuits = POOL.terminals, SCHEDULER.status(), POOL.circuits()
+    for row in accounts:
+        row["label"] = labels.get(row["login"])
+    out = {"mt5_enabled": MT5_ENABLED, "terminals": terminals, "circuits": circuits, "accounts": accounts}
+    if EXTERNAL_COLLECTOR:
+        out["collector"] = {
+            "mode": "external",
+            "store": STORE.path,
+            "generation": STORE.generation(),
+            "status_age": time.time() - status["written_at"] if status.get("written_at") else None,
+        }
+    return out
+
+
+# ---- Metrics ----------------------------------------------------------------
+
+REGISTRY.gauge("eas_sse_clients", "Connected /live clients", callback=lambda: HUB.client_count)
+circuit_gauge(POOL)
+REGISTRY.gauge(
+    "eas_snapshot_age_seconds",
+    "Age of the latest cached snapshot per account",
+    ("login",),
+    callback=lambda: {
+        (str(login),): time.time() - float(s.get("timestamp") or 0) for login, s in list(SNAPSHOTS.items())
+    },
+)
+
+
+@app.get("/metrics")
+def metrics() -> Response:
+    """Prometheus text exposition format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 # ---- SSE (local only) -------------------------------------------------------
 
+def _live_keys(group: Optional[str], logins: Any) -> Optional[Set[str]]:
+    """
+    Hub keys for a group name and/or logins (a list or a comma-separated
+    string); None when neither is given, meaning every account.
+    """
+    if not group and not logins:
+        return None
+    if isinstance(logins, str):
+        logins = logins.split(",")
+    keys = {str(x).strip() for x in (logins or []) if str(x).strip()}
+    if group:
+        keys |= INDEX.members(group)
+    return keys
+
+
 @app.get("/live")
-async def live(request: Request):
+async def live(
+    request: Request,
+    last_event_id: Optional[str] = Query(default=None),
+    group: Optional[str] = Query(default=None),
+    logins: Optional[str] = Query(default=None, description="Comma-separated MT5 logins"),
+):
     """
     Local-only SSE stream (Heroku has MT5 disabled, so this will be quiet there).
+    Frames come pre-encoded from the shared hub; a reconnecting browser resumes
+    from its `Last-Event-ID` instead of getting a full replay. `group` and/or
+    `logins` limit the stream to those accounts (default: all of them).
+    """
+    resume = parse_last_event_id(request.headers.get("last-event-id") or last_event_id, HUB.epoch)
+    return StreamingResponse(
+        HUB.stream(last_event_id=resume, is_disconnected=request.is_disconnected, keys=_live_keys(group, logins)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/live/ws")
+async def live_ws(websocket: WebSocket, group: Optional[str] = None, logins: Optional[str] = None):
     """
-    async def event_gen():
+    The /live events over a WebSocket, one JSON event per text message.
+    Starts with the accounts given by `group` / `logins` (none otherwise) and
+    takes {"action": "subscribe" | "unsubscribe", "group"?: str, "logins"?: [...]}
+    messages to change them; newly subscribed accounts get their latest state.
+    """
+    await websocket.accept()
+    client = HUB.open(_live_keys(group, logins) or set())
+
+    async def pump():
+        async for frame in HUB.stream(client=client):
+            if frame is not HEARTBEAT_FRAME:
+                await websocket.send_text(frame_data(frame).decode("utf-8"))
+
+    task = asyncio.create_task(pump())
+    try:
         while True:
-            if await request.is_disconnected():
-                break
-            now = int(time.time())
-            for row in ACCOUNTS_LIST:
-                s = SNAPSHOTS.get(int(row["login"]))
-                if not s:
-                    continue
-                evt = {
-                    "type": "positions_snapshot",
-                    "account": str(row["login"]),
-                    "positions": [],
-                    "snapshot": {
-                        "balance": s.get("balance"),
-                        "equity": s.get("equity"),
-                        "margin": s.get("margin"),
-                        "margin_free": s.get("margin_free"),
-                    },
-                    "ts": now,
-                }
-                yield f"data: {json.dumps(evt)}\n\n"
-            await asyncio.sleep(5)
-
-    return StreamingResponse(event_gen(), media_type="text/event-stream")
+            try:
+                msg = await websocket.receive_json()
+                action = msg.get("action")
+                keys = _live_keys(msg.get("group"), msg.get("logins")) or set()
+            except (ValueError, AttributeError):
+                await websocket.send_json({"type": "error", "detail": "Expected a JSON object"})
+                continue
+            if action == "subscribe":
+                HUB.subscribe(client, keys)
+            elif action == "unsubscribe":
+                HUB.unsubscribe(client, keys)
+            else:
+                await websocket.send_json({"type": "error", "detail": "action must be subscribe or unsubscribe"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        task.cancel()
+        HUB.close(client)
 
 
 # ---- Lifecycle --------------------------------------------------------------
@@ -299,16 +1307,28 @@ async def live(request: Request):
 @app.on_event("startup")
 async def _on_startup():
     global POLL_TASK
+    if supabase_client is not None:
+        await supabase_client.start()
+    if EXTERNAL_COLLECTOR:
+        if POLL_TASK is None:
+            POLL_TASK = asyncio.create_task(_follow_store())
+        return
+    if MT5_ENABLED:
+        await asyncio.to_thread(POOL.start)
     if POLL_TASK is None:
         POLL_TASK = asyncio.create_task(_poll_snapshots())
 
 @app.on_event("shutdown")
-def _on_shutdown():
+async def _on_shutdown():
     global POLL_TASK
     try:
-        MANAGER.close()
+        POOL.close()
     except Exception:
         pass
     if POLL_TASK is not None:
         POLL_TASK.cancel()
         POLL_TASK = None
+    if supabase_client is not None:
+        await supabase_client.close()
+    if STORE is not None:
+        STORE.close()
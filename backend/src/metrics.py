@@ -0,0 +1,244 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Minimal Prometheus text-format metrics (no external dependency). Updates are
+# a dict lookup plus an add under a per-metric lock, so it is fine to leave on
+# in production.
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """
+    Set directly, or computed at scrape time by `callback`, which returns either
+    a number (unlabelled) or a {label_values_tuple: value} dict.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], object]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _samples(self) -> List[str]:
+        if self.callback is not None:
+            got = self.callback()
+            items = list(got.items()) if isinstance(got, dict) else [((), got)]
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [
+            f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}"
+            for k, v in items
+            if v is not None
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        out: List[str] = []
+        for key, row in items:
+            cumulative = 0.0
+            for le, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += n
+                le_label = 'le="%s"' % _fmt_value(le)
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le_label)} {_fmt_value(cumulative)}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(row[-1])}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {_fmt_value(cumulative)}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def _add(self, m: _Metric):
+        self._metrics.append(m)
+        return m
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (), callback=None) -> Gauge:
+        return self._add(Gauge(name, help, labelnames, callback))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            try:
+                lines.extend(m.render())
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---- Metric catalogue -------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "eas_http_request_seconds", "Time to response start per endpoint", ("method", "route", "status")
+)
+MT5_CALL_SECONDS = REGISTRY.histogram(
+    "eas_mt5_call_seconds", "Latency of MetaTrader5 calls made by the collector workers", ("call", "terminal")
+)
+MT5_TERMINAL_REINITS = REGISTRY.counter(
+    "eas_mt5_terminal_reinits_total", "MT5 terminal (re)initializations", ("terminal",)
+)
+MT5_LOGINS = REGISTRY.counter("eas_mt5_logins_total", "MT5 account logins", ("terminal",))
+MT5_FAILURES = REGISTRY.counter("eas_mt5_failures_total", "Failed account fetches", ("terminal",))
+MT5_TIMEOUTS = REGISTRY.counter(
+    "eas_mt5_timeouts_total", "MT5 workers killed for missing their call deadline", ("terminal",)
+)
+POLL_CYCLE_SECONDS = REGISTRY.histogram(
+    "eas_poll_cycle_seconds", "Duration of one poller dispatch (the due accounts of one terminal)"
+)
+SNAPSHOT_STORE_ERRORS = REGISTRY.counter(
+    "eas_snapshot_store_errors_total", "Failed reads of the shared snapshot store by an API worker"
+)
+SUPABASE_QUERY_SECONDS = REGISTRY.histogram(
+    "eas_supabase_query_seconds", "Supabase query latency per table", ("table",)
+)
+
+
+# ---- ASGI middleware --------------------------------------------------------
+
+class RequestTimingMiddleware:
+    """
+    Pure ASGI middleware: records time-to-response-start per route template
+    (so long-lived streams like /live are not counted for their whole life)
+    and adds a `Server-Timing` header.
+    """
+
+    def __init__(self, app, histogram: Histogram = HTTP_REQUEST_SECONDS):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        observed = False
+
+        async def send_wrapper(message):
+            nonlocal observed
+            if message["type"] == "http.response.start" and not observed:
+                observed = True
+                elapsed = time.perf_counter() - t0
+                route = scope.get("route")
+                self.histogram.observe(
+                    elapsed,
+                    method=scope.get("method", ""),
+                    route=getattr(route, "path", "unmatched"),
+                    status=message.get("status", 0),
+                )
+                headers = list(message.get("headers") or [])
+                headers.append((b"server-timing", f"app;dur={elapsed * 1000:.1f}".encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
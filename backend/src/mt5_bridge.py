@@ -2,8 +2,10 @@ import json
 import os
 import threading
 import time
-from dataclasses import dataclass, asdict
-from typing import Dict, Optional
+from dataclasses import dataclass, asdict, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .positions import position_to_dict
 
 # Toggle MT5 via env; on Heroku this must be "0"
 MT5_ENABLED = os.getenv("MT5_ENABLED", "0") == "1"
@@ -28,21 +30,44 @@ class AccountSnapshot:
     currency: str
     server: str
     timestamp: float
+    positions: List[dict] = field(default_factory=list)
 
 
 class MT5Manager:
     """
     Manages a single MT5 session per process.
     Safely re-initializes when switching between different terminal paths.
+
+    `mt5_module` lets callers pass their own MetaTrader5-compatible module
+    (e.g. a fake one in tests); by default the globally imported module is used.
     """
 
-    def __init__(self):
+    def __init__(self, mt5_module: Optional[Any] = None):
         self._lock = threading.Lock()
+        self._mt5 = mt5_module if mt5_module is not None else (mt5 if MT5_ENABLED else None)
         self._current_terminal: Optional[str] = None
         self._current_login: Optional[int] = None
+        # instrumentation, collected by drain_stats()
+        self._calls: List[Tuple[str, float]] = []
+        self._reinits = 0
+        self._logins = 0
+
+    def _timed(self, name: str, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._calls.append((name, time.perf_counter() - t0))
+
+    def drain_stats(self) -> Dict[str, Any]:
+        """Call timings and re-init/login counts since the previous drain."""
+        out = {"calls": self._calls, "reinits": self._reinits, "logins": self._logins}
+        self._calls, self._reinits, self._logins = [], 0, 0
+        return out
 
     def _ensure_terminal(self, terminal_path: str):
-        if not MT5_ENABLED or mt5 is None:
+        mt5 = self._mt5
+        if mt5 is None:
             raise RuntimeError("MT5 is disabled on this deployment.")
         # If terminal path changed, re-init
         if self._current_terminal != terminal_path:
@@ -50,18 +75,21 @@ class MT5Manager:
                 mt5.shutdown()
             except Exception:
                 pass
-            ok = mt5.initialize(path=terminal_path)
+            self._reinits += 1
+            ok = self._timed("initialize", mt5.initialize, path=terminal_path)
             if not ok:
                 raise RuntimeError(f"MT5 initialize failed: {mt5.last_error()}")
             self._current_terminal = terminal_path
             self._current_login = None  # force re-login
 
     def _ensure_login(self, login: int, password: str, server: str):
-        if not MT5_ENABLED or mt5 is None:
+        mt5 = self._mt5
+        if mt5 is None:
             raise RuntimeError("MT5 is disabled on this deployment.")
         if self._current_login == login:
             return
-        if not mt5.login(login=login, password=password, server=server):
+        self._logins += 1
+        if not self._timed("login", mt5.login, login=login, password=password, server=server):
             raise RuntimeError(f"MT5 login failed for {login}: {mt5.last_error()}")
         self._current_login = login
 
@@ -78,9 +106,13 @@ class MT5Manager:
         with self._lock:
             self._ensure_terminal(terminal_path)
             self._ensure_login(login, password, server)
-            ai = mt5.account_info()
+            ai = self._timed("account_info", self._mt5.account_info)
             if ai is None:
-                raise RuntimeError(f"account_info() returned None for {login}: {mt5.last_error()}")
+                raise RuntimeError(f"account_info() returned None for {login}: {self._mt5.last_error()}")
+            # same session as account_info, so both describe the same login
+            raw_positions = self._timed("positions_get", self._mt5.positions_get)
+            if raw_positions is None:
+                raise RuntimeError(f"positions_get() returned None for {login}: {self._mt5.last_error()}")
             snap = AccountSnapshot(
                 label=label,
                 login=login,
@@ -93,27 +125,30 @@ class MT5Manager:
                 currency=currency or getattr(ai, "currency", ""),
                 server=server,
                 timestamp=time.time(),
+                positions=[position_to_dict(p) for p in raw_positions],
             )
             return snap
 
     def close(self):
         try:
-            if MT5_ENABLED and mt5 is not None:
-                mt5.shutdown()
+            if self._mt5 is not None:
+                self._mt5.shutdown()
         except Exception:
             pass
+        self._current_terminal = None
+        self._current_login = None
 
 
 def load_accounts_json() -> Dict[int, dict]:
     """
-    Loads backend/../accounts.json into a dict keyed by login (int).
+    Loads backend/accounts.json (or $ACCOUNTS_JSON) into a dict keyed by login (int).
     Returns {} if not present (e.g., on Heroku) or MT5 is disabled.
     """
     if not MT5_ENABLED:
         return {}
 
     backend_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    acc_path = os.path.join(backend_dir, "accounts.json")
+    acc_path = os.getenv("ACCOUNTS_JSON") or os.path.join(backend_dir, "accounts.json")
     if not os.path.exists(acc_path):
         return {}
 
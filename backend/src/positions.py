@@ -0,0 +1,55 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# Open positions as plain dicts, plus ticket-keyed diffs for the live stream so
+# a tick only ships what actually changed.
+
+_SIDES = {0: "buy", 1: "sell"}
+
+# fields that may change while a position is open
+_MUTABLE_FIELDS = ("volume", "lots", "price_current", "sl", "tp", "profit", "swap", "comment")
+
+
+def _opt(v: Any) -> Optional[float]:
+    """MT5 reports 'not set' SL/TP as 0.0."""
+    return float(v) if v else None
+
+
+def position_to_dict(p: Any) -> Dict[str, Any]:
+    """Normalize one MetaTrader5 TradePosition."""
+    return {
+        "ticket": int(p.ticket),
+        "symbol": p.symbol,
+        "type": _SIDES.get(int(p.type), str(p.type)),
+        "volume": float(p.volume),
+        "lots": float(p.volume),
+        "price_open": float(p.price_open),
+        "price_current": float(getattr(p, "price_current", 0.0)),
+        "sl": _opt(getattr(p, "sl", 0.0)),
+        "tp": _opt(getattr(p, "tp", 0.0)),
+        "profit": float(p.profit),
+        "swap": float(getattr(p, "swap", 0.0)),
+        "comment": getattr(p, "comment", "") or None,
+        "magic": int(getattr(p, "magic", 0)) or None,
+        "time": int(getattr(p, "time", 0)),
+    }
+
+
+def diff_positions(
+    prev: Dict[int, dict], curr: Dict[int, dict]
+) -> Tuple[List[dict], List[dict], List[int]]:
+    """
+    (opened, modified, closed) between two ticket -> position maps.
+    `opened` holds full positions, `modified` only the ticket plus changed
+    fields, `closed` just the tickets.
+    """
+    opened = [p for t, p in curr.items() if t not in prev]
+    closed = [t for t in prev if t not in curr]
+    modified: List[dict] = []
+    for t, p in curr.items():
+        old = prev.get(t)
+        if old is None:
+            continue
+        changed = {k: p.get(k) for k in _MUTABLE_FIELDS if p.get(k) != old.get(k)}
+        if changed:
+            modified.append({"ticket": t, **changed})
+    return opened, modified, closed
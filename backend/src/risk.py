@@ -0,0 +1,265 @@
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Dict, Hashable, Optional
+
+import numpy as np
+
+# Streaming prop-style risk metrics per account: high-water mark, current and
+# max drawdown, P&L since the broker-day rollover and the distance to the
+# daily-loss / max-loss limits (both set as a % of account_size). Each new
+# equity sample updates a handful of numbers (O(1) per account). So a restart
+# does not forget the high-water mark or today's starting equity, `restore()`
+# reloads persisted metrics and `rebuild()` derives the state from a stored
+# equity series with numpy.
+#
+# Kept free of app imports so tools/ can use it too.
+
+
+@dataclass
+class RiskConfig:
+    daily_loss_pct: float = 5.0      # daily loss limit, % of account_size
+    max_loss_pct: float = 10.0       # max loss limit, % of account_size
+    trailing: bool = False           # max-loss floor trails the high-water mark
+    day_tz: str = "America/New_York"
+    rollover_hour: int = 17          # broker day starts at 17:00 New York
+
+    @classmethod
+    def from_env(cls) -> "RiskConfig":
+        return cls(
+            daily_loss_pct=float(os.getenv("RISK_DAILY_LOSS_PCT", "5")),
+            max_loss_pct=float(os.getenv("RISK_MAX_LOSS_PCT", "10")),
+            trailing=os.getenv("RISK_DRAWDOWN_MODE", "static") == "trailing",
+            day_tz=os.getenv("RISK_DAY_TZ", "America/New_York"),
+            rollover_hour=int(os.getenv("RISK_DAY_ROLLOVER_HOUR", "17")),
+        )
+
+
+def _zone(name: str) -> tzinfo:
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception:  # no tz database (e.g. Windows without tzdata)
+        return timezone.utc
+
+
+class BrokerDay:
+    """Start of the broker day containing a timestamp; cached, so the common case is two compares."""
+
+    def __init__(self, tz: str = "America/New_York", rollover_hour: int = 17):
+        self.tz = _zone(tz)
+        self.rollover_hour = rollover_hour
+        self._start = self._end = 0.0
+
+    def start(self, ts: float) -> float:
+        if self._start <= ts < self._end:
+            return self._start
+        local = datetime.fromtimestamp(ts, self.tz)
+        day = (local - timedelta(hours=self.rollover_hour)).date()
+        start = datetime(day.year, day.month, day.day, self.rollover_hour, tzinfo=self.tz)
+        end = start + timedelta(days=1)
+        # wall-clock arithmetic in zoneinfo; .timestamp() resolves DST offsets
+        self._start, self._end = start.timestamp(), end.timestamp()
+        return self._start
+
+
+class RiskState:
+    __slots__ = (
+        "account_size", "equity", "ts", "hwm", "max_drawdown", "max_drawdown_pct",
+        "day_start_ts", "day_start_equity",
+    )
+
+    def __init__(self, account_size: Optional[float]):
+        self.account_size = account_size
+        self.equity: Optional[float] = None
+        self.ts = 0.0
+        self.hwm: Optional[float] = None
+        self.max_drawdown = 0.0
+        self.max_drawdown_pct = 0.0
+        self.day_start_ts = 0.0
+        self.day_start_equity: Optional[float] = None
+
+
+def _r(v: Optional[float], nd: int = 2) -> Optional[float]:
+    return None if v is None else round(float(v), nd)
+
+
+def _epoch(value) -> float:
+    """Epoch seconds from a number or an ISO-8601 string (0 when missing)."""
+    if value is None or value == "":
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+class RiskTracker:
+    """
+    Risk state keyed by account. `update()` folds in one sample and returns
+    the account's metrics; `restore()` seeds (or merges into) the state from
+    metrics saved earlier, `rebuild()` from a whole series at once.
+    """
+
+    def __init__(self, config: Optional[RiskConfig] = None):
+        self.config = config or RiskConfig()
+        self.day = BrokerDay(self.config.day_tz, self.config.rollover_hour)
+        self._states: Dict[Hashable, RiskState] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _size(account_size) -> Optional[float]:
+        try:
+            s = float(account_size)
+        except (TypeError, ValueError):
+            return None
+        return s if s > 0 else None
+
+    def update(self, key: Hashable, ts: float, equity: float, account_size=None) -> dict:
+        with self._lock:
+            return self._update(key, ts, equity, account_size)
+
+    def _update(self, key: Hashable, ts: float, equity: float, account_size) -> dict:
+        st = self._states.get(key)
+        if st is None:
+            st = self._states[key] = RiskState(self._size(account_size))
+        elif account_size is not None:
+            st.account_size = self._size(account_size)
+        if ts < st.ts:  # out-of-order sample: nothing to learn from it
+            return self._metrics(st)
+
+        day_start = self.day.start(ts)
+        if day_start != st.day_start_ts:
+            # equity at the rollover is the last sample seen before it
+            st.day_start_equity = st.equity if st.equity is not None else equity
+            st.day_start_ts = day_start
+
+        if st.hwm is None:
+            st.hwm = max(equity, st.account_size or equity)
+        elif equity > st.hwm:
+            st.hwm = equity
+        dd = st.hwm - equity
+        if dd > st.max_drawdown:
+            st.max_drawdown = dd
+        dd_pct = dd / st.hwm * 100.0 if st.hwm > 0 else 0.0
+        if dd_pct > st.max_drawdown_pct:
+            st.max_drawdown_pct = dd_pct
+
+        st.equity, st.ts = equity, ts
+        return self._metrics(st)
+
+    def day_start(self, ts: float) -> float:
+        """Start of the broker day containing `ts`."""
+        with self._lock:
+            return self.day.start(ts)
+
+    def rebuild(self, key: Hashable, ts: np.ndarray, equity: np.ndarray, account_size=None, *, peak=None):
+        """
+        Vectorized equivalent of calling update() for every sample of a series
+        (sorted by time). `peak` is the highest equity seen before the series
+        starts, if known. Merges with any state streamed in the meantime.
+        """
+        ts = np.asarray(ts, dtype=np.float64)
+        equity = np.asarray(equity, dtype=np.float64)
+        if ts.size == 0:
+            return
+        size = self._size(account_size)
+
+        first = max(equity[0], size or equity[0], equity[0] if peak is None else float(peak))
+        hwm = np.maximum.accumulate(np.concatenate(([first], equity[1:])))
+        dd = hwm - equity
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dd_pct = np.where(hwm > 0, dd / hwm * 100.0, 0.0)
+
+        b = RiskState(size)
+        b.equity, b.ts, b.hwm = float(equity[-1]), float(ts[-1]), float(hwm[-1])
+        b.max_drawdown, b.max_drawdown_pct = max(0.0, float(dd.max())), max(0.0, float(dd_pct.max()))
+        with self._lock:  # BrokerDay caches the current day
+            b.day_start_ts = self.day.start(b.ts)
+        i = int(np.searchsorted(ts, b.day_start_ts, side="left"))
+        b.day_start_equity = float(equity[i - 1] if i > 0 else equity[0])
+
+        with self._lock:
+            self._merge(key, b, size)
+
+    def restore(self, key: Hashable, row: dict, account_size=None):
+        """
+        Seed `key` from metrics persisted earlier: a dict as returned by
+        update(), plus the "updated_at" of its sample. Merges like rebuild().
+        """
+        if row.get("hwm") is None or row.get("drawdown") is None:
+            return
+        size = self._size(account_size)
+        b = RiskState(size)
+        b.hwm = float(row["hwm"])
+        b.equity = b.hwm - float(row["drawdown"])
+        b.ts = _epoch(row.get("updated_at"))
+        b.max_drawdown = float(row.get("max_drawdown") or 0.0)
+        b.max_drawdown_pct = float(row.get("max_drawdown_pct") or 0.0)
+        b.day_start_ts = float(row.get("day_start") or 0.0)
+        day_start_equity = row.get("day_start_equity")
+        b.day_start_equity = b.equity if day_start_equity is None else float(day_start_equity)
+        with self._lock:
+            self._merge(key, b, size)
+
+    def _merge(self, key: Hashable, b: RiskState, size: Optional[float]):
+        cur = self._states.get(key)
+        if cur is None or cur.equity is None or cur.ts <= b.ts:
+            self._states[key] = b
+            return
+        # Samples were streamed after the history ends: keep them and fold in
+        # the past. Drawdowns of those streamed samples were measured against
+        # their own peak, so only the current one is re-measured against the
+        # merged high-water mark.
+        cur.account_size = size if size is not None else cur.account_size
+        cur.hwm = max(cur.hwm, b.hwm)
+        dd = cur.hwm - cur.equity
+        cur.max_drawdown = max(cur.max_drawdown, b.max_drawdown, dd)
+        cur.max_drawdown_pct = max(
+            cur.max_drawdown_pct, b.max_drawdown_pct, dd / cur.hwm * 100.0 if cur.hwm > 0 else 0.0
+        )
+        if cur.day_start_ts == b.day_start_ts:
+            cur.day_start_equity = b.day_start_equity
+
+    def metrics(self, key: Hashable) -> Optional[dict]:
+        with self._lock:
+            return self._metrics(self._states.get(key))
+
+    def _metrics(self, st: Optional[RiskState]) -> Optional[dict]:
+        if st is None or st.equity is None:
+            return None
+        cfg = self.config
+        size = st.account_size
+        dd = st.hwm - st.equity
+        daily_pnl = st.equity - st.day_start_equity
+        out = {
+            "hwm": _r(st.hwm),
+            "drawdown": _r(dd),
+            "drawdown_pct": _r(dd / st.hwm * 100.0 if st.hwm > 0 else 0.0, 4),
+            "max_drawdown": _r(st.max_drawdown),
+            "max_drawdown_pct": _r(st.max_drawdown_pct, 4),
+            "day_start": st.day_start_ts,
+            "day_start_equity": _r(st.day_start_equity),
+            "daily_pnl": _r(daily_pnl),
+            "daily_pnl_pct": _r(daily_pnl / size * 100.0, 4) if size else None,
+            "daily_loss_remaining": None,
+            "daily_loss_remaining_pct": None,
+            "max_loss_floor": None,
+            "max_loss_remaining": None,
+            "max_loss_remaining_pct": None,
+            "breached": False,
+        }
+        if size:
+            daily_left = size * cfg.daily_loss_pct / 100.0 + daily_pnl
+            floor = (st.hwm if cfg.trailing else size) - size * cfg.max_loss_pct / 100.0
+            max_left = st.equity - floor
+            out.update(
+                daily_loss_remaining=_r(daily_left),
+                daily_loss_remaining_pct=_r(daily_left / size * 100.0, 4),
+                max_loss_floor=_r(floor),
+                max_loss_remaining=_r(max_left),
+                max_loss_remaining_pct=_r(max_left / size * 100.0, 4),
+                breached=daily_left <= 0 or max_left <= 0,
+            )
+        return out
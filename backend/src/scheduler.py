@@ -0,0 +1,187 @@
+import heapq
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Deadline-based poll scheduler. Every account has its own next-due time set
+# by policy: fast while it has open positions or its equity is moving, slow
+# while idle, and exponential backoff with jitter after failures. Accounts can
+# be partitioned (by terminal), each partition with its own heap, so one poll
+# loop per partition dispatches only its own accounts. The clock is injectable
+# so the whole thing can be driven by a simulated clock.
+
+
+@dataclass
+class PollPolicy:
+    fast_interval: float = 2.0        # open positions or equity moving
+    slow_interval: float = 10.0       # idle accounts
+    equity_epsilon: float = 0.0       # equity change that counts as "moving"
+    backoff_base: float = 5.0         # first retry delay after a failure
+    backoff_max: float = 300.0
+    jitter: float = 0.2               # +/- fraction applied to backoff delays
+
+
+@dataclass
+class AccountSchedule:
+    login: int
+    next_due: float
+    interval: float = 0.0
+    last_attempt: Optional[float] = None
+    last_success: Optional[float] = None
+    failures: int = 0                 # current failure streak
+    last_error: Optional[str] = None
+    last_equity: Optional[float] = None
+    in_flight: bool = False
+
+
+class PollScheduler:
+    """
+    Min-heap of (next_due, login) per partition. `pop_due()` hands out the
+    accounts whose deadline passed; each must be answered with
+    `record_success()` or `record_failure()`, which schedules its next
+    deadline. With `partition_of` (login -> partition key), `pop_due()`,
+    `next_due()` and `seconds_until_next()` look at one partition at a time;
+    without it every account is in partition None. Safe to share between
+    threads.
+    """
+
+    def __init__(
+        self,
+        logins: Iterable[int],
+        policy: Optional[PollPolicy] = None,
+        *,
+        partition_of: Optional[Callable[[int], Hashable]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ):
+        self.policy = policy or PollPolicy()
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._heaps: Dict[Hashable, List[Tuple[float, int]]] = {}
+        self._partition: Dict[int, Hashable] = {}
+        self._accounts: Dict[int, AccountSchedule] = {}
+        now = clock()
+        for login in logins:
+            login = int(login)
+            self._partition[login] = partition_of(login) if partition_of is not None else None
+            self._accounts[login] = AccountSchedule(login=login, next_due=now)
+            heapq.heappush(self._heaps.setdefault(self._partition[login], []), (now, login))
+
+    def _schedule(self, acc: AccountSchedule, due: float):
+        acc.next_due = due
+        heapq.heappush(self._heaps[self._partition[acc.login]], (due, acc.login))
+
+    # ---- dispatch -----------------------------------------------------------
+
+    def pop_due(
+        self, now: Optional[float] = None, limit: Optional[int] = None, *, partition: Hashable = None
+    ) -> List[int]:
+        """Logins of `partition` whose deadline has passed, earliest first; marks them in flight."""
+        with self._lock:
+            now = self._clock() if now is None else now
+            heap = self._heaps.get(partition, [])
+            out: List[int] = []
+            while heap and heap[0][0] <= now and (limit is None or len(out) < limit):
+                due, login = heapq.heappop(heap)
+                acc = self._accounts.get(login)
+                # stale heap entry (rescheduled since) or already handed out
+                if acc is None or acc.in_flight or due != acc.next_due:
+                    continue
+                acc.in_flight = True
+                acc.last_attempt = now
+                out.append(login)
+            return out
+
+    def next_due(self, *, partition: Hashable = None) -> Optional[float]:
+        with self._lock:
+            return self._next_due(partition)
+
+    def _next_due(self, partition: Hashable) -> Optional[float]:
+        heap = self._heaps.get(partition, [])
+        while heap:
+            due, login = heap[0]
+            acc = self._accounts.get(login)
+            if acc is None or acc.in_flight or due != acc.next_due:
+                heapq.heappop(heap)
+                continue
+            return due
+        return None
+
+    def seconds_until_next(self, now: Optional[float] = None, *, partition: Hashable = None) -> Optional[float]:
+        with self._lock:
+            due = self._next_due(partition)
+            if due is None:
+                return None
+            now = self._clock() if now is None else now
+            return max(0.0, due - now)
+
+    def expedite(self, login: int, now: Optional[float] = None):
+        """Make an account due immediately (no-op while it is in flight)."""
+        with self._lock:
+            acc = self._accounts.get(int(login))
+            if acc is None or acc.in_flight:
+                return
+            now = self._clock() if now is None else now
+            if acc.next_due > now:
+                self._schedule(acc, now)
+
+    # ---- outcomes -----------------------------------------------------------
+
+    def record_success(self, login: int, snapshot: dict, now: Optional[float] = None):
+        with self._lock:
+            acc = self._accounts[int(login)]
+            now = self._clock() if now is None else now
+            p = self.policy
+
+            equity = snapshot.get("equity")
+            moving = (
+                equity is not None
+                and acc.last_equity is not None
+                and abs(float(equity) - acc.last_equity) > p.equity_epsilon
+            )
+            active = bool(snapshot.get("positions")) or moving
+
+            acc.in_flight = False
+            acc.last_success = now
+            acc.failures = 0
+            acc.last_error = None
+            acc.last_equity = float(equity) if equity is not None else acc.last_equity
+            acc.interval = p.fast_interval if active else p.slow_interval
+            self._schedule(acc, now + acc.interval)
+
+    def record_failure(self, login: int, error: str, now: Optional[float] = None):
+        with self._lock:
+            acc = self._accounts[int(login)]
+            now = self._clock() if now is None else now
+            p = self.policy
+
+            acc.in_flight = False
+            acc.failures += 1
+            acc.last_error = error
+            # the exponent is capped: 2 ** 1024 no longer fits in a float
+            delay = min(p.backoff_max, p.backoff_base * (2 ** min(acc.failures - 1, 32)))
+            delay *= 1.0 + self._rng.uniform(-p.jitter, p.jitter)
+            acc.interval = delay
+            self._schedule(acc, now + delay)
+
+    # ---- introspection ------------------------------------------------------
+
+    def status(self, now: Optional[float] = None) -> List[dict]:
+        with self._lock:
+            now = self._clock() if now is None else now
+            out: List[dict] = []
+            for acc in self._accounts.values():
+                out.append({
+                    "login": acc.login,
+                    "next_due_in": None if acc.in_flight else round(acc.next_due - now, 3),
+                    "in_flight": acc.in_flight,
+                    "interval": round(acc.interval, 3),
+                    "last_success_age": None if acc.last_success is None else round(now - acc.last_success, 3),
+                    "failure_streak": acc.failures,
+                    "last_error": acc.last_error,
+                })
+            out.sort(key=lambda x: x["login"])
+            return out
@@ -0,0 +1,128 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+# Snapshots shared between one collector process (the only writer) and any
+# number of API worker processes (readers), in a SQLite database in WAL mode:
+# readers never block the writer or each other. Every write bumps a generation
+# counter and stamps the rows it touched with it, so a reader can cheaply ask
+# "did anything change?" and then fetch only the rows newer than what it has.
+# A random id, set once when the database is created, tells readers apart a
+# store that was replaced (and started counting generations from zero again).
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    login   INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated REAL    NOT NULL,
+    data    TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_version ON snapshots (version);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SnapshotStore:
+    """
+    One connection per process; safe to share between threads. Writers call
+    `write()`, readers poll `generation()` and pull `changes_since()`.
+    """
+
+    def __init__(self, path: str, *, timeout: float = 5.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('id', ?)", (uuid.uuid4().hex[:8],))
+        self._data_version: Optional[int] = None
+        self._generation = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---- writer -------------------------------------------------------------
+
+    def write(self, snapshots: Dict[int, dict], *, status: Optional[dict] = None) -> int:
+        """
+        Upsert `snapshots` (login -> snapshot dict) in one transaction and
+        return the new generation. `status` (collector/scheduler state) is
+        stored alongside but does not bump the generation on its own.
+        """
+        now = time.time()
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN IMMEDIATE")
+            try:
+                gen = self._read_generation()
+                if snapshots:
+                    gen += 1
+                    c.executemany(
+                        "INSERT INTO snapshots (login, version, updated, data) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(login) DO UPDATE SET version=excluded.version, "
+                        "updated=excluded.updated, data=excluded.data",
+                        [(int(login), gen, now, json.dumps(s, separators=(",", ":"))) for login, s in snapshots.items()],
+                    )
+                    c.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (str(gen),)
+                    )
+                if status is not None:
+                    c.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('status', ?)",
+                        (json.dumps({**status, "written_at": now}, separators=(",", ":")),),
+                    )
+                c.execute("COMMIT")
+            except BaseException:
+                c.execute("ROLLBACK")
+                raise
+            self._generation = gen
+            return gen
+
+    # ---- readers ------------------------------------------------------------
+
+    def _read_generation(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def generation(self) -> int:
+        """
+        Current generation. Skips the query entirely when no other connection
+        has committed since the last call (PRAGMA data_version).
+        """
+        with self._lock:
+            dv = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if dv != self._data_version:
+                self._data_version = dv
+                self._generation = self._read_generation()
+            return self._generation
+
+    def changes_since(self, generation: int) -> Tuple[int, Dict[int, dict]]:
+        """(current generation, {login: snapshot} for rows written after `generation`)."""
+        with self._lock:
+            c = self._conn
+            c.execute("BEGIN")
+            try:
+                gen = self._read_generation()
+                rows = c.execute(
+                    "SELECT login, data FROM snapshots WHERE version > ?", (int(generation),)
+                ).fetchall()
+            finally:
+                c.execute("COMMIT")
+        return gen, {int(login): json.loads(data) for login, data in rows}
+
+    def id(self) -> str:
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'id'").fetchone()[0]
+
+    def status(self) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'status'").fetchone()
+        return json.loads(row[0]) if row else None
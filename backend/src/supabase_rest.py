@@ -0,0 +1,158 @@
+import asyncio
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+import httpx
+
+from .metrics import SUPABASE_QUERY_SECONDS
+
+# Async data access for the Supabase REST (PostgREST) API. One pooled,
+# keep-alive httpx.AsyncClient is shared by every request handler, so
+# independent queries can run concurrently with asyncio.gather() instead of
+# occupying a threadpool slot each.
+
+Filter = Tuple[str, str]  # (column, "op.value"), e.g. ("group_name", "eq.E2T Demos")
+
+
+def eq(column: str, value: Any) -> Filter:
+    return column, f"eq.{value}"
+
+
+def gte(column: str, value: Any) -> Filter:
+    return column, f"gte.{value}"
+
+
+def lt(column: str, value: Any) -> Filter:
+    return column, f"lt.{value}"
+
+
+def lte(column: str, value: Any) -> Filter:
+    return column, f"lte.{value}"
+
+
+def not_null(column: str) -> Filter:
+    return column, "not.is.null"
+
+
+def _quote(value: Any) -> str:
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def after(keys: Sequence[str], row: dict) -> Filter:
+    """Rows strictly after `row` in ascending `keys` order (the keyset condition for the next page)."""
+    if len(keys) == 1:
+        return keys[0], f"gt.{row[keys[0]]}"
+    terms = []
+    for i, key in enumerate(keys):
+        parts = [f"{k}.eq.{_quote(row[k])}" for k in keys[:i]] + [f"{key}.gt.{_quote(row[key])}"]
+        terms.append(parts[0] if len(parts) == 1 else "and(" + ",".join(parts) + ")")
+    return "or", "(" + ",".join(terms) + ")"
+
+
+class SupabaseError(RuntimeError):
+    pass
+
+
+class SupabaseREST:
+    """
+    Thin async PostgREST client. Create it at startup (`start()`), close it
+    at shutdown (`close()`); every query has its own deadline.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        *,
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+    ):
+        self.base_url = url.rstrip("/") + "/rest/v1"
+        self.timeout = timeout
+        self._headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Accept": "application/json",
+        }
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._headers,
+                limits=self._limits,
+                timeout=httpx.Timeout(self.timeout),
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        *,
+        filters: Sequence[Filter] = (),
+        order: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> List[dict]:
+        """GET /rest/v1/<table>; `order` uses PostgREST syntax ("name", "timestamp.desc")."""
+        if self._client is None:
+            raise SupabaseError("Supabase client is not started")
+        params: List[Tuple[str, str]] = [("select", columns), *filters]
+        if order:
+            params.append(("order", order))
+        if limit is not None:
+            params.append(("limit", str(limit)))
+        if offset:
+            params.append(("offset", str(offset)))
+
+        t0 = time.perf_counter()
+        try:
+            resp = await asyncio.wait_for(
+                self._client.get(f"/{table}", params=params), timeout or self.timeout
+            )
+        except asyncio.TimeoutError:
+            raise SupabaseError(f"{table}: query timed out after {timeout or self.timeout}s")
+        except httpx.HTTPError as e:
+            raise SupabaseError(f"{table}: {e}")
+        finally:
+            SUPABASE_QUERY_SECONDS.observe(time.perf_counter() - t0, table=table)
+
+        if resp.status_code >= 400:
+            raise SupabaseError(f"{table}: HTTP {resp.status_code}: {resp.text[:200]}")
+        return resp.json()
+
+    async def select_all(
+        self,
+        table: str,
+        columns: str = "*",
+        *,
+        filters: Sequence[Filter] = (),
+        keys: Sequence[str],
+        page_size: int = 1000,
+        timeout: Optional[float] = None,
+    ) -> List[dict]:
+        """
+        Every row matching `filters`, ordered by `keys`, a page at a time. Each
+        page starts right after the last row of the previous one (keyset, not
+        OFFSET), so deep pages cost the same as the first. `keys` must be
+        selected and non-null; rows that tie on all of them are read as one.
+        """
+        out: List[dict] = []
+        page_filters = list(filters)
+        while True:
+            rows = await self.select(
+                table, columns, filters=page_filters, order=",".join(keys), limit=page_size, timeout=timeout
+            )
+            out.extend(rows)
+            if len(rows) < page_size:
+                return out
+            page_filters = [*filters, after(keys, rows[-1])]
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack  # type: ignore
+except Exception:  # optional: only needed for ?format=msgpack
+    msgpack = None
+
+# Alternative encodings for /snapshots/latest. The default JSON shape nests one
+# object per account; the columnar shape is one array per field (numbers as
+# numbers, `updated_at` as epoch seconds), so key names are sent once and the
+# client can use the arrays without re-normalizing every value.
+
+FORMAT_JSON = "json"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_MSGPACK = "msgpack"
+FORMATS = (FORMAT_JSON, FORMAT_COLUMNAR, FORMAT_MSGPACK)
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.eas.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+_ACCEPT_FORMATS = {
+    COLUMNAR_MEDIA_TYPE: FORMAT_COLUMNAR,
+    MSGPACK_MEDIA_TYPE: FORMAT_MSGPACK,
+    "application/x-msgpack": FORMAT_MSGPACK,
+    "application/json": FORMAT_JSON,
+}
+
+SNAPSHOT_FIELDS = ("balance", "equity", "margin", "margin_free")
+
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def negotiate_format(param: Optional[str], accept: Optional[str]) -> str:
+    """
+    `?format=` wins; otherwise the first Accept media type we know (in header
+    order), falling back to plain JSON. Raises ValueError on an unknown format.
+    """
+    if param:
+        fmt = param.strip().lower()
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{param}' (expected one of: {', '.join(FORMATS)})")
+        return fmt
+    for part in (accept or "").split(","):
+        media = part.split(";", 1)[0].strip().lower()
+        if media in _ACCEPT_FORMATS:
+            return _ACCEPT_FORMATS[media]
+    return FORMAT_JSON
+
+
+def _num(v: Any) -> Optional[float]:
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _epoch(v: Any) -> Optional[float]:
+    if v is None or isinstance(v, (int, float)):
+        return v
+    try:
+        return datetime.fromisoformat(str(v).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def snapshots_columnar(rows: List[dict]) -> Dict[str, Any]:
+    """
+    /snapshots/latest rows -> {"count": N, "login_hint": [...], "balance": [...], ...}.
+    `risk` stays one object (or null) per account.
+    """
+    out: Dict[str, Any] = {"count": len(rows), "login_hint": [str(r.get("login_hint")) for r in rows]}
+    for f in SNAPSHOT_FIELDS:
+        out[f] = [_num((r.get("snapshot") or {}).get(f)) for r in rows]
+    out["net_return_pct"] = [_num(r.get("net_return_pct")) for r in rows]
+    out["updated_at"] = [_epoch(r.get("updated_at")) for r in rows]
+    out["risk"] = [r.get("risk") for r in rows]
+    return out
+
+
+def msgpack_dumps(payload: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(payload, use_bin_type=True)
@@ -0,0 +1,12 @@
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKES_DIR = os.path.join(BACKEND_DIR, "bench", "fakes")
+TOOLS_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "tools")
+
+# `import src.*`, the tools/ scripts and the fake `import MetaTrader5` (also in
+# spawned workers, which inherit sys.path)
+for path in (TOOLS_DIR, FAKES_DIR, BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,50 @@
+import types
+
+import pytest
+
+pytest.importorskip("dotenv")
+supabase = pytest.importorskip("supabase")
+
+import MetaTrader5 as mt5  # noqa: E402  (the fake, see conftest)
+import backfill_history as bf  # noqa: E402
+from supabase_stub import FAKE_KEY, StubData, SupabaseStub  # noqa: E402
+
+LOGIN = 50_000_000
+T1 = 1_760_000_000.0
+
+
+@pytest.fixture
+def fake_mt5(monkeypatch):
+    monkeypatch.setattr(mt5, "_LATENCY", 0.0)
+    monkeypatch.setattr(mt5, "_JITTER", 0.0)
+    mt5.initialize(path="T0")
+    mt5.login(LOGIN, password="x", server="Fake-Server")
+    yield mt5
+    mt5.shutdown()
+
+
+def test_chunked_fetch_returns_the_same_deals_as_one_window(fake_mt5, monkeypatch):
+    # dense enough that any second missed between chunks loses deals
+    monkeypatch.setattr(mt5, "_DEALS_PER_DAY", 20_000)
+    t0 = T1 - 3 * 86400
+    times, amounts = bf.fetch_deals(t0, T1, 600)
+    whole_times, whole_amounts = bf.fetch_deals(t0, T1, 4 * 86400)
+    assert times.size == whole_times.size == 60_000
+    assert (times == whole_times).all()
+    assert amounts.sum() == pytest.approx(whole_amounts.sum())
+
+
+def test_rerunning_a_backfill_inserts_nothing(fake_mt5, monkeypatch):
+    monkeypatch.setattr(bf, "_current_terminal", "T0")
+    stub = SupabaseStub(StubData(1, history_seconds=0)).start()
+    try:
+        sb = supabase.create_client(stub.url, FAKE_KEY)
+        acct = stub.data.tables["accounts"][0]
+        account = {"login": LOGIN, "password": "x", "server": "Fake-Server", "terminal_path": "T0", "label": "A"}
+        args = types.SimpleNamespace(chunk_days=1.0, server_utc_offset=0.0, interval=900.0, batch=500, dry_run=False)
+        t1 = bf.time.time()
+        first = bf.backfill_account(sb, account, acct, args, t1 - 20 * 86400, t1)
+        assert first > 0 and len(stub.data.tables["equity_snapshots"]) == first
+        assert bf.backfill_account(sb, account, acct, args, t1 - 20 * 86400, t1) == 0
+    finally:
+        stub.stop()
@@ -0,0 +1,44 @@
+import pytest
+
+from src.changes import ChangeLog
+
+
+def test_process_local_cursors_do_not_survive_another_process():
+    log = ChangeLog(epoch="abc")
+    log.update("1", {"v": 1})
+    log.update("2", {"v": 2})
+    assert log.cursor() == "abc.2"
+    assert log.parse_cursor("abc.1") == 1
+    assert log.since(1) == [{"v": 2}]
+    assert log.parse_cursor("abc.3") is None  # ahead of us
+    assert log.parse_cursor("xyz.1") is None  # another process
+
+
+def test_shared_cursors_are_answered_by_any_log_of_the_same_data():
+    a, b = ChangeLog(epoch="t", shared=True), ChangeLog(epoch="t", shared=True)
+    a.update("1", {"v": 1}, version=100)
+    a.update("2", {"v": 2}, version=200)
+    # b has only caught up to the first row; a cursor from a is not a reset
+    b.update("1", {"v": 1}, version=100)
+    version = b.parse_cursor(a.cursor())
+    assert version == 200
+    assert b.since(version) == []
+    b.update("2", {"v": 2.5}, version=250)
+    assert b.since(version) == [{"v": 2.5}]
+
+
+def test_shared_versions_arriving_out_of_order_stay_sorted():
+    log = ChangeLog(shared=True)
+    log.update("a", "a@300", version=300)
+    log.update("b", "b@100", version=100)
+    log.update("c", "c@200", version=200)
+    assert log.version == 300
+    assert log.since(0) == ["b@100", "c@200", "a@300"]
+    assert log.since(150) == ["c@200", "a@300"]
+
+
+def test_shared_updates_need_a_version():
+    with pytest.raises(ValueError):
+        ChangeLog(shared=True).update("a", "row")
+    with pytest.raises(ValueError):
+        ChangeLog().update("a", "row", version=5)
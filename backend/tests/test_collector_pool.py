@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+from src.collector import run
+from src.collector_pool import CollectorPool
+from src.scheduler import PollPolicy, PollScheduler
+from src.snapshot_store import SnapshotStore
+
+
+def _accounts(terminals: int, per_terminal: int):
+    return [
+        {
+            "label": f"Account {t}-{i}",
+            "login": 50_000_000 + t * 100 + i,
+            "password": "x",
+            "server": "Fake-Server",
+            "currency": "USD",
+            "terminal_path": f"T{t}",
+        }
+        for t in range(terminals)
+        for i in range(per_terminal)
+    ]
+
+
+@pytest.fixture
+def fast_fake_mt5(monkeypatch):
+    # read by the fake MetaTrader5 module inside each worker process
+    monkeypatch.setenv("FAKE_MT5_LATENCY_MS", "1")
+    monkeypatch.setenv("FAKE_MT5_JITTER_MS", "0")
+
+
+def test_fetch_terminal_pins_accounts_to_their_terminal_worker(fast_fake_mt5):
+    accounts = _accounts(terminals=2, per_terminal=3)
+    pool = CollectorPool(accounts, call_timeout=10.0, init_timeout=30.0)
+    try:
+        assert sorted(pool.terminals) == ["T0", "T1"]
+        for path in pool.terminals:
+            mine = [a for a in accounts if a["terminal_path"] == path]
+            assert all(pool.terminal_of(a["login"]) == path for a in mine)
+            snaps, errors = pool.fetch_terminal(path, [a["login"] for a in mine])
+            assert errors == {}
+            assert sorted(snaps) == sorted(a["login"] for a in mine)
+            for a in mine:
+                s = snaps[a["login"]]
+                assert s["label"] == a["label"] and s["equity"] is not None
+                assert len(s["positions"]) == 2
+
+        # workers (and their sessions) are reused across calls
+        other = accounts[-1]["login"]  # pinned to T1
+        snaps, errors = pool.fetch_terminal("T0", [accounts[0]["login"], other, 123])
+        assert list(snaps) == [accounts[0]["login"]]
+        assert errors == {other: "Account not found", 123: "Account not found"}
+        assert all(c["restarts"] == 0 for c in pool.circuits().values())
+    finally:
+        pool.close()
+
+
+def test_hung_terminal_does_not_hold_up_the_others(fast_fake_mt5, monkeypatch, tmp_path):
+    monkeypatch.setenv("FAKE_MT5_HANG_TERMINALS", "T1")
+    accounts = _accounts(terminals=2, per_terminal=2)
+    healthy = {a["login"] for a in accounts if a["terminal_path"] == "T0"}
+    pool = CollectorPool(accounts, call_timeout=3.0, init_timeout=3.0)
+    scheduler = PollScheduler((a["login"] for a in accounts), PollPolicy(), partition_of=pool.terminal_of)
+    store = SnapshotStore(str(tmp_path / "snapshots.db"))
+    stop = threading.Event()
+    runner = threading.Thread(target=run, args=(store, pool, scheduler), kwargs={"stop": stop})
+    t0 = time.monotonic()
+    runner.start()
+    try:
+        got: set = set()
+        while set(got) != healthy and time.monotonic() - t0 < 2.5:
+            got = set(store.changes_since(0)[1])
+            time.sleep(0.05)
+        # T0's snapshots land while T1 is still inside its 3s deadline
+        assert got == healthy
+        assert time.monotonic() - t0 < 3.0
+    finally:
+        stop.set()
+        runner.join()
+        pool.close()
+        store.close()
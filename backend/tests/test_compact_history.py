@@ -0,0 +1,54 @@
+import types
+
+import pytest
+
+pytest.importorskip("dotenv")
+supabase = pytest.importorskip("supabase")
+
+import compact_history as ch  # noqa: E402
+from supabase_stub import FAKE_KEY, StubData, SupabaseStub, _iso  # noqa: E402
+
+NOW = 1_760_000_000.0
+
+
+def _tied_rows(data: StubData):
+    account_id = data.tables["accounts"][0]["id"]
+    start = (NOW // 86400 - 1) * 86400
+    # several rows per second, so page boundaries fall inside runs of ties
+    data.tables["equity_snapshots"] = [
+        {"id": i + 1, "account_id": account_id, "timestamp": _iso(start + i // 7), "equity": 1000.0 + i, "balance": 1000.0}
+        for i in range(3 * ch.PAGE)
+    ]
+    return account_id, data.tables["equity_snapshots"]
+
+
+def test_raw_pages_return_every_row_once():
+    data = StubData(1, history_seconds=0)
+    account_id, rows = _tied_rows(data)
+    stub = SupabaseStub(data).start()
+    try:
+        sb = supabase.create_client(stub.url, FAKE_KEY)
+        got = ch._select_all(
+            lambda: sb.table("equity_snapshots").select("id,timestamp").eq("account_id", account_id),
+            ("timestamp", "id"),
+        )
+        assert [r["id"] for r in got] == [r["id"] for r in rows]
+    finally:
+        stub.stop()
+
+
+def test_raw_rows_with_tied_timestamps_are_rolled_up_exactly_once():
+    data = StubData(1, history_seconds=0)
+    account_id, rows = _tied_rows(data)
+    stub = SupabaseStub(data).start()
+    try:
+        args = types.SimpleNamespace(
+            raw_days=0.0, keep_1m_days=0.0, keep_15m_days=0.0, settle=300.0, chunk_hours=24.0, dry_run=False
+        )
+        ch.Compactor(supabase.create_client(stub.url, FAKE_KEY), args).compact_account(account_id, NOW)
+        bars = [r for r in data.tables["equity_rollups"] if r["tier"] == "1m"]
+        assert sum(int(r["samples"]) for r in bars) == len(rows)
+        assert max(float(r["high"]) for r in bars) == rows[-1]["equity"]
+        assert min(float(r["low"]) for r in bars) == rows[0]["equity"]
+    finally:
+        stub.stop()
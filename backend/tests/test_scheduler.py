@@ -0,0 +1,118 @@
+import random
+
+from src.scheduler import PollPolicy, PollScheduler
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def _scheduler(logins, **policy):
+    clock = FakeClock()
+    policy = PollPolicy(**{"fast_interval": 2.0, "slow_interval": 10.0, "jitter": 0.0, **policy})
+    return PollScheduler(logins, policy, clock=clock, rng=random.Random(0)), clock
+
+
+def test_every_account_is_due_at_start_and_handed_out_once():
+    s, clock = _scheduler([1, 2, 3])
+    assert s.pop_due() == [1, 2, 3]
+    assert s.pop_due() == []  # in flight
+    assert s.next_due() is None
+
+
+def test_active_accounts_poll_fast_idle_ones_slow():
+    s, clock = _scheduler([1, 2])
+    s.pop_due()
+    s.record_success(1, {"equity": 100.0, "positions": [{"ticket": 1}]})
+    s.record_success(2, {"equity": 100.0, "positions": []})
+
+    clock.advance(2.0)
+    assert s.pop_due() == [1]
+    s.record_success(1, {"equity": 100.0, "positions": [{"ticket": 1}]})
+    clock.advance(7.9)
+    assert s.pop_due() == [1]
+    clock.advance(0.1)
+    assert s.pop_due() == [2]
+
+
+def test_moving_equity_counts_as_active():
+    s, clock = _scheduler([1])
+    s.pop_due()
+    s.record_success(1, {"equity": 100.0})  # first sample: nothing to compare with
+    assert s.seconds_until_next() == 10.0
+    clock.advance(10.0)
+    s.pop_due()
+    s.record_success(1, {"equity": 101.0})
+    assert s.seconds_until_next() == 2.0
+
+
+def test_failures_back_off_exponentially_up_to_the_cap():
+    s, clock = _scheduler([1], backoff_base=5.0, backoff_max=30.0)
+    delays = []
+    for _ in range(5):
+        assert s.pop_due() == [1]
+        s.record_failure(1, "boom")
+        delays.append(s.seconds_until_next())
+        clock.advance(delays[-1])
+    assert delays == [5.0, 10.0, 20.0, 30.0, 30.0]
+
+    s.pop_due()
+    s.record_success(1, {"equity": 1.0})
+    status = s.status()[0]
+    assert status["failure_streak"] == 0 and status["last_error"] is None
+
+
+def test_a_long_failure_streak_keeps_the_account_scheduled():
+    s, clock = _scheduler([1], backoff_base=5.0, backoff_max=300.0)
+    for _ in range(1100):
+        assert s.pop_due() == [1]
+        s.record_failure(1, "login failed")
+        clock.advance(s.seconds_until_next())
+    assert s.status()[0]["failure_streak"] == 1100
+    assert s.seconds_until_next() == 0.0 and s.pop_due() == [1]
+
+
+def test_jitter_stays_within_bounds():
+    clock = FakeClock()
+    policy = PollPolicy(backoff_base=10.0, jitter=0.2)
+    s = PollScheduler(range(200), policy, clock=clock, rng=random.Random(0))
+    due = s.pop_due()
+    for login in due:
+        s.record_failure(login, "boom")
+    delays = [row["interval"] for row in s.status()]
+    assert all(8.0 <= d <= 12.0 for d in delays)
+    assert len(set(delays)) > 1  # retries are spread out
+
+
+def test_expedite_moves_an_account_to_now():
+    s, clock = _scheduler([1])
+    s.pop_due()
+    s.record_success(1, {"equity": 1.0})
+    clock.advance(3.0)
+    assert s.pop_due() == []
+    s.expedite(1)
+    assert s.pop_due() == [1]
+    s.expedite(1)  # in flight: no-op
+    assert s.pop_due() == []
+
+
+def test_partitions_are_dispatched_independently():
+    clock = FakeClock()
+    policy = PollPolicy(fast_interval=2.0, slow_interval=10.0, jitter=0.0)
+    s = PollScheduler([1, 2, 3], policy, partition_of=lambda login: "T0" if login < 3 else "T1", clock=clock)
+    assert s.pop_due(partition="T1") == [3]
+    assert s.pop_due() == []  # every account is in a named partition
+    assert s.pop_due(partition="T0") == [1, 2]
+    s.record_success(3, {"equity": 1.0})
+    # T0 still in flight: its partition has nothing due, T1 does in 10s
+    assert s.seconds_until_next(partition="T0") is None
+    assert s.seconds_until_next(partition="T1") == 10.0
+    s.expedite(3)
+    assert s.pop_due(partition="T1") == [3]
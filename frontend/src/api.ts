@@ -79,22 +79,84 @@ export async function fetchSnapshot(login_hint: string | number): Promise<Snapsh
   };
 }
 
+/** Server-side running risk metrics for one account (limits need account_size) */
+export type RiskMetrics = {
+  hwm: number;
+  drawdown: number;
+  drawdown_pct: number;
+  max_drawdown: number;
+  max_drawdown_pct: number;
+  day_start: number;
+  day_start_equity: number;
+  daily_pnl: number;
+  daily_pnl_pct: number | null;
+  daily_loss_remaining: number | null;
+  daily_loss_remaining_pct: number | null;
+  max_loss_floor: number | null;
+  max_loss_remaining: number | null;
+  max_loss_remaining_pct: number | null;
+  breached: boolean;
+};
+
+export type LatestSnapshot = {
+  login_hint: string;
+  snapshot: { balance: number | null; equity: number | null; margin: number | null; margin_free: number | null };
+  net_return_pct: number | null;
+  risk?: RiskMetrics | null;
+  updated_at: string | number | null;
+};
+
+/** /snapshots/latest?format=columnar: one array per field, numbers already numeric */
+type ColumnarSnapshots = {
+  count: number;
+  login_hint: string[];
+  balance: (number | null)[];
+  equity: (number | null)[];
+  margin: (number | null)[];
+  margin_free: (number | null)[];
+  net_return_pct: (number | null)[];
+  updated_at: (number | null)[];
+  risk?: (RiskMetrics | null)[];
+};
+
+const COLUMNAR = "application/vnd.eas.columnar+json";
+
+function fromColumnar(c: ColumnarSnapshots): LatestSnapshot[] {
+  const out: LatestSnapshot[] = new Array(c.count);
+  for (let i = 0; i < c.count; i++) {
+    out[i] = {
+      login_hint: c.login_hint[i],
+      snapshot: {
+        balance: c.balance[i],
+        equity: c.equity[i],
+        margin: c.margin[i],
+        margin_free: c.margin_free[i],
+      },
+      net_return_pct: c.net_return_pct[i],
+      risk: c.risk?.[i] ?? null,
+      updated_at: c.updated_at[i],
+    };
+  }
+  return out;
+}
+
 /** Latest metrics per account (normalized) */
-export async function fetchLatestSnapshots(): Promise<
-  {
-    login_hint: string;
-    snapshot: { balance: number | null; equity: number | null; margin: number | null; margin_free: number | null };
-    net_return_pct: number | null;
-    updated_at: string | number | null;
-  }[]
-> {
-  const res = await fetch(`${API}/snapshots/latest`, { headers: { Accept: "application/json" } });
+export async function fetchLatestSnapshots(): Promise<LatestSnapshot[]> {
+  const res = await fetch(`${API}/snapshots/latest?format=columnar`, { headers: { Accept: COLUMNAR } });
   if (!res.ok) {
     const txt = await res.text().catch(() => "");
     throw new Error(`GET /snapshots/latest failed (${res.status}): ${txt}`);
   }
+  // Older backends ignore the format and send the nested JSON rows
+  if ((res.headers.get("content-type") || "").startsWith(COLUMNAR)) {
+    return fromColumnar((await res.json()) as ColumnarSnapshots);
+  }
   const raw = (await res.json()) as any[];
-  return raw.map((r) => ({
+  return raw.map(toLatest);
+}
+
+function toLatest(r: any): LatestSnapshot {
+  return {
     login_hint: String(r.login_hint),
     snapshot: {
       balance: toNum(r?.snapshot?.balance),
@@ -103,8 +165,43 @@ export async function fetchLatestSnapshots(): Promise<
       margin_free: toNum(r?.snapshot?.margin_free),
     },
     net_return_pct: toNum(r?.net_return_pct),
+    risk: r?.risk ?? null,
     updated_at: r?.updated_at ?? null,
-  }));
+  };
+}
+
+/** Accounts changed since `cursor`; `reset` means `changes` is the full set */
+export type SnapshotChanges = { cursor: string; reset: boolean; changes: LatestSnapshot[] };
+
+/**
+ * Change feed for pollers: pass the previous `cursor` (null the first time).
+ * With `wait` the server holds the request up to that many seconds for the
+ * next change. Resolves to null when the backend has no change feed.
+ */
+export async function fetchSnapshotChanges(
+  cursor: string | null,
+  opts: { wait?: number; group?: string; logins?: string[]; signal?: AbortSignal } = {}
+): Promise<SnapshotChanges | null> {
+  const q = new URLSearchParams();
+  if (cursor) q.set("since", cursor);
+  if (opts.wait) q.set("wait", String(opts.wait));
+  if (opts.group) q.set("group", opts.group);
+  if (opts.logins?.length) q.set("logins", opts.logins.join(","));
+  const res = await fetch(`${API}/snapshots/changes?${q}`, {
+    headers: { Accept: "application/json" },
+    signal: opts.signal,
+  });
+  if (res.status === 404) return null;
+  if (!res.ok) {
+    const txt = await res.text().catch(() => "");
+    throw new Error(`GET /snapshots/changes failed (${res.status}): ${txt}`);
+  }
+  const r = (await res.json()) as any;
+  return {
+    cursor: String(r.cursor),
+    reset: !!r.reset,
+    changes: Array.isArray(r.changes) ? r.changes.map(toLatest) : [],
+  };
 }
 
 /** Compatibility shim */
@@ -117,14 +214,52 @@ export async function fetchAccount(login_hint: string | number): Promise<Account
 export type Position = {
   ticket: number;
   symbol: string;
+  type: string; // "buy" | "sell"
   volume: number;
-  type: string;
+  lots: number;
   price_open: number;
+  price_current?: number;
+  sl?: number | null;
+  tp?: number | null;
   profit: number;
+  swap?: number;
+  comment?: string | null;
+  magic?: number | null;
+  time?: number;
 };
 
-export async function fetchAccountPositions(_login_hint: string | number): Promise<Position[]> {
-  return [];
+export type AccountPositions = {
+  login_hint: string;
+  snapshot: { balance: number | null; equity: number | null; margin: number | null; margin_free: number | null } | null;
+  positions: Position[];
+  risk?: RiskMetrics | null;
+  updated_at: string | number | null;
+};
+
+/** Open positions + latest snapshot for one account */
+export async function fetchAccountPositions(login_hint: string | number): Promise<AccountPositions> {
+  const res = await fetch(`${API}/accounts/${encodeURIComponent(String(login_hint))}/positions`, {
+    headers: { Accept: "application/json" },
+  });
+  if (!res.ok) {
+    const txt = await res.text().catch(() => "");
+    throw new Error(`GET /accounts/${login_hint}/positions failed (${res.status}): ${txt}`);
+  }
+  const r = (await res.json()) as any;
+  return {
+    login_hint: String(r?.login_hint ?? login_hint),
+    snapshot: r?.snapshot
+      ? {
+          balance: toNum(r.snapshot.balance),
+          equity: toNum(r.snapshot.equity),
+          margin: toNum(r.snapshot.margin),
+          margin_free: toNum(r.snapshot.margin_free),
+        }
+      : null,
+    positions: Array.isArray(r?.positions) ? (r.positions as Position[]) : [],
+    risk: r?.risk ?? null,
+    updated_at: r?.updated_at ?? null,
+  };
 }
 
 export type GroupSummary = { name: string; count: number; sort_index: number };
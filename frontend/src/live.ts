@@ -1,5 +1,5 @@
 // frontend/src/live.ts
-import { fetchLatestSnapshots } from "./api";
+import { fetchLatestSnapshots, fetchSnapshotChanges, type LatestSnapshot, type RiskMetrics } from "./api";
 
 export type LiveEvent = {
   type: "positions_snapshot";
@@ -12,6 +12,19 @@ export type LiveEvent = {
     margin_free: number | null;
     currency?: string;
   };
+  risk?: RiskMetrics | null;
+  ts: number;
+};
+
+/** Incremental update from the SSE stream, keyed by position ticket */
+type PositionsDelta = {
+  type: "positions_delta";
+  account: string;
+  snapshot?: LiveEvent["snapshot"];
+  opened: any[];
+  modified: ({ ticket: number } & Record<string, unknown>)[];
+  closed: number[];
+  risk?: RiskMetrics | null;
   ts: number;
 };
 
@@ -19,38 +32,77 @@ type Unsub = () => void;
 
 const LIVE_URL = import.meta.env.VITE_LIVE_URL || ""; // SSE (local MT5 only)
 const POLL_MS = 2000;
+const LONG_POLL_S = 20; // /snapshots/changes holds an idle poll this long
+const SSE_MAX_FAILURES = 5; // consecutive failed reconnects before polling instead
+
+/** Limit the stream to a server-side group and/or some accounts (default: all) */
+export type LiveScope = { group?: string; logins?: string[] };
 
-function toNum(v: unknown): number | null {
-  if (v === null || v === undefined) return null;
-  const n = Number(v);
-  return Number.isFinite(n) ? n : null;
+function scopedUrl(base: string, scope?: LiveScope): string {
+  const q = new URLSearchParams();
+  if (scope?.group) q.set("group", scope.group);
+  if (scope?.logins?.length) q.set("logins", scope.logins.join(","));
+  const qs = q.toString();
+  return qs ? `${base}${base.includes("?") ? "&" : "?"}${qs}` : base;
 }
 
-export function subscribe(cb: (e: LiveEvent) => void): Unsub {
+export function subscribe(cb: (e: LiveEvent) => void, scope?: LiveScope): Unsub {
   let es: EventSource | null = null;
   let pollTimer: number | null = null;
+  let polling = false;
   let closed = false;
+  const abort = new AbortController();
+  // ticket -> position per account, rebuilt from full snapshots + deltas
+  const books = new Map<string, Map<number, any>>();
 
-  async function startPolling() {
+  function applyFull(evt: LiveEvent) {
+    const book = new Map<number, any>();
+    for (const p of evt.positions || []) book.set(Number(p.ticket), p);
+    books.set(evt.account, book);
+    cb(evt);
+  }
+
+  function applyDelta(d: PositionsDelta) {
+    const book = books.get(d.account);
+    if (!book) return; // no baseline yet; the next full snapshot will carry it
+    for (const t of d.closed || []) book.delete(Number(t));
+    for (const p of d.opened || []) book.set(Number(p.ticket), p);
+    for (const m of d.modified || []) {
+      const cur = book.get(Number(m.ticket));
+      if (cur) book.set(Number(m.ticket), { ...cur, ...m });
+    }
+    cb({
+      type: "positions_snapshot",
+      account: d.account,
+      positions: Array.from(book.values()),
+      snapshot: d.snapshot,
+      risk: d.risk,
+      ts: d.ts,
+    });
+  }
+
+  function emitRows(rows: LatestSnapshot[], only: Set<string> | null) {
+    const now = Math.floor(Date.now() / 1000);
+    for (const r of rows) {
+      if (only && !only.has(String(r.login_hint))) continue;
+      cb({
+        type: "positions_snapshot",
+        account: String(r.login_hint),
+        positions: [],
+        snapshot: { ...r.snapshot },
+        risk: r.risk ?? null,
+        ts: now,
+      });
+    }
+  }
+
+  // Older backends: download every account every POLL_MS
+  function startFullPolling() {
     if (closed) return;
+    const only = scope?.logins?.length ? new Set(scope.logins) : null;
     const tick = async () => {
       try {
-        const rows = await fetchLatestSnapshots();
-        const now = Math.floor(Date.now() / 1000);
-        for (const r of rows) {
-          cb({
-            type: "positions_snapshot",
-            account: String(r.login_hint),
-            positions: [],
-            snapshot: {
-              balance: toNum((r as any)?.snapshot?.balance),
-              equity: toNum((r as any)?.snapshot?.equity),
-              margin: toNum((r as any)?.snapshot?.margin),
-              margin_free: toNum((r as any)?.snapshot?.margin_free),
-            },
-            ts: now,
-          });
-        }
+        emitRows(await fetchLatestSnapshots(), only);
       } catch {
         /* ignore transient errors */
       }
@@ -59,28 +111,67 @@ export function subscribe(cb: (e: LiveEvent) => void): Unsub {
     pollTimer = window.setInterval(tick, POLL_MS) as unknown as number;
   }
 
+  // Long-poll the change feed: only accounts that changed come back, and an
+  // idle dashboard waits on one open request instead of re-downloading.
+  async function startPolling() {
+    if (closed || polling) return;
+    polling = true;
+    let cursor: string | null = null;
+    while (!closed) {
+      try {
+        const res = await fetchSnapshotChanges(cursor, {
+          wait: cursor ? LONG_POLL_S : 0,
+          group: scope?.group,
+          logins: scope?.logins,
+          signal: abort.signal,
+        });
+        if (!res) {
+          startFullPolling();
+          return;
+        }
+        cursor = res.cursor;
+        emitRows(res.changes, null);
+      } catch {
+        if (closed) return;
+        await new Promise((r) => setTimeout(r, POLL_MS)); // transient error: back off, keep the cursor
+      }
+    }
+  }
+
   const canUseSSE = typeof window !== "undefined" && !!LIVE_URL && LIVE_URL.startsWith("http");
   if (canUseSSE) {
     try {
-      es = new EventSource(LIVE_URL, { withCredentials: false });
+      es = new EventSource(scopedUrl(LIVE_URL, scope), { withCredentials: false });
       es.onmessage = (msg) => {
         if (!msg?.data) return;
         try {
           const evt = JSON.parse(String(msg.data));
-          if (evt && evt.type === "positions_snapshot") cb(evt as LiveEvent);
+          if (evt && evt.type === "positions_snapshot") applyFull(evt as LiveEvent);
+          else if (evt && evt.type === "positions_delta") applyDelta(evt as PositionsDelta);
         } catch {}
       };
-      es.onerror = () => {
+      // The browser reconnects on its own and resumes from Last-Event-ID (the
+      // server replays what was missed, or full snapshots if it can't). Fall
+      // back to polling only if it gives up or keeps failing.
+      let opened = false;
+      let failures = 0;
+      const fallBack = () => {
         try { es?.close(); } catch {}
         es = null;
-        if (!pollTimer) startPolling();
+        startPolling();
+      };
+      es.onopen = () => {
+        opened = true;
+        failures = 0;
       };
+      es.onerror = () => {
+        if (!es) return;
+        failures += 1;
+        if (es.readyState === EventSource.CLOSED || failures >= SSE_MAX_FAILURES) fallBack();
+      };
+      // fall back only if the stream never opened
       setTimeout(() => {
-        if (!pollTimer) {
-          try { es?.close(); } catch {}
-          es = null;
-          startPolling();
-        }
+        if (es && !opened) fallBack();
       }, 3000);
     } catch {
       startPolling();
@@ -91,6 +182,7 @@ export function subscribe(cb: (e: LiveEvent) => void): Unsub {
 
   return () => {
     closed = true;
+    abort.abort();
     try { es?.close(); } catch {}
     es = null;
     if (pollTimer) { clearInterval(pollTimer); pollTimer = null; }
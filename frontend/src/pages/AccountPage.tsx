@@ -17,7 +17,7 @@ export default function AccountPage() {
       .then(({ snapshot, positions, updated_at }) => {
         setSnapshot(snapshot);
         setPositions(positions || []);
-        setUpdatedAt(updated_at);
+        setUpdatedAt(updated_at ?? undefined);
       })
       .catch((err) => setError(err.message));
     const unsub = subscribe((evt: LiveEvent) => {
@@ -26,7 +26,7 @@ export default function AccountPage() {
       setSnapshot(evt.snapshot);
       setPositions(Array.isArray(evt.positions) ? evt.positions : []);
       setUpdatedAt(evt.ts);
-    });
+    }, { logins: [loginHint] });
     setGroupState(getGroup(loginHint));
     return () => unsub();
   }, [loginHint]);
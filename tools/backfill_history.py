@@ -0,0 +1,284 @@
+"""
+Backfill equity_snapshots from MT5 deal history.
+
+    cd tools
+    python backfill_history.py --days 90
+    python backfill_history.py --from 2025-01-01 --to 2025-03-31 --login 12345678 --dry-run
+
+Live sampling (push_snapshots.py) can only record the present, so a new
+account or a collector outage leaves holes that never fill. For each account
+this pulls history_deals_get in --chunk-days windows from the start of the
+range up to now, rebuilds the balance curve backwards from the current
+balance with numpy cumulative sums, samples it on an --interval grid plus at
+every deal, and bulk-inserts only the points that fall in gaps of the rows
+already stored (at least --interval away from every existing row), so live
+samples are never doubled and re-running the same range inserts nothing.
+History already rolled up by compact_history.py is left alone.
+
+Deal history has no floating P&L: backfilled rows carry equity = balance and
+no margin figures. MT5 reports deal times in trade-server time; pass
+--server-utc-offset (hours) when the server is not on UTC.
+"""
+import os, json, time, argparse
+from typing import Dict, Any, Optional, List, Tuple
+from datetime import datetime, timezone
+import dotenv
+import numpy as np
+
+dotenv.load_dotenv()
+
+ACCOUNTS_JSON = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend", "accounts.json"))
+
+import MetaTrader5 as mt5
+
+from snapshot_uploader import AccountMap
+
+_current_terminal: Optional[str] = None
+
+def ensure_init(term_path: str):
+    """(Re)initialize MT5 only when switching to a different terminal."""
+    global _current_terminal
+    if _current_terminal == term_path:
+        return
+    try:
+        mt5.shutdown()
+    except Exception:
+        pass
+    _current_terminal = None
+    if not mt5.initialize(path=term_path):
+        raise RuntimeError(f"MT5 initialize failed: {mt5.last_error()}")
+    _current_terminal = term_path
+
+def login(login: int, password: str, server: str):
+    if not mt5.login(login=login, password=password, server=server):
+        raise RuntimeError(f"MT5 login failed for {login}: {mt5.last_error()}")
+
+# ---- Deals -> balance curve ----
+
+def fetch_deals(t0: float, t1: float, chunk_seconds: float, server_offset: float = 0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (times, amounts) of every deal of the logged-in account in [t0, t1]
+    (UTC epoch seconds), oldest first. History is requested in chunks that
+    share their boundaries, deduplicated by ticket.
+    """
+    seen: Dict[int, Tuple[float, float]] = {}
+    start = t0
+    while True:
+        end = min(t1, start + chunk_seconds)
+        deals = mt5.history_deals_get(
+            datetime.fromtimestamp(start + server_offset, tz=timezone.utc),
+            datetime.fromtimestamp(end + server_offset, tz=timezone.utc),
+        )
+        if deals is None:
+            raise RuntimeError(f"history_deals_get failed: {mt5.last_error()}")
+        for d in deals:
+            # balance effect of a deal; deposits/withdrawals carry it in profit
+            seen[int(d.ticket)] = (
+                d.time_msc / 1000.0 - server_offset,
+                float(d.profit) + float(d.commission) + float(d.swap) + float(getattr(d, "fee", 0.0) or 0.0),
+            )
+        if end >= t1:
+            break
+        # windows share their boundary: a deal on it is fetched twice and kept once
+        start = end
+
+    if not seen:
+        return np.empty(0), np.empty(0)
+    arr = np.array(list(seen.values()), dtype=np.float64)
+    order = np.argsort(arr[:, 0], kind="stable")
+    return arr[order, 0], arr[order, 1]
+
+def balance_curve(amounts: np.ndarray, current_balance: float) -> Tuple[float, np.ndarray]:
+    """
+    (opening balance, balance after each deal), anchored on the current
+    balance: every deal from the first one up to now has been fetched, so the
+    balance after deal i is the current balance minus all later deals.
+    """
+    after = current_balance - (amounts.sum() - np.cumsum(amounts))
+    opening = current_balance - float(amounts.sum())
+    return opening, after
+
+def sample_curve(
+    times: np.ndarray, after: np.ndarray, opening: float, t0: float, t1: float, interval: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The step curve sampled on a grid aligned to multiples of `interval` (so
+    re-runs land on the same points) plus the deal times, within [t0, t1].
+    """
+    grid = np.arange(np.ceil(t0 / interval) * interval, t1 + 1e-9, interval)
+    deal_ts = times[(times >= t0) & (times <= t1)]
+    ts = np.union1d(grid, deal_ts)
+    idx = np.searchsorted(times, ts, side="right") - 1
+    bal = np.where(idx >= 0, after[np.maximum(idx, 0)], opening) if times.size else np.full(ts.shape, opening)
+    return ts, bal
+
+def in_gaps(ts: np.ndarray, existing: np.ndarray, min_gap: float) -> np.ndarray:
+    """Mask of the points at least `min_gap` seconds away from every existing timestamp (sorted)."""
+    if existing.size == 0:
+        return np.ones(ts.shape, dtype=bool)
+    i = np.searchsorted(existing, ts)
+    prev = np.abs(ts - existing[np.maximum(i - 1, 0)])
+    nxt = np.abs(existing[np.minimum(i, existing.size - 1)] - ts)
+    return np.minimum(prev, nxt) >= min_gap
+
+# ---- Supabase ----
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+def _epoch(value: str) -> float:
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+def existing_timestamps(supabase, account_id: str, t0: float, t1: float, page: int = 1000) -> np.ndarray:
+    """
+    Stored timestamps in [t0, t1], sorted. Paged by keyset on the timestamp:
+    only distinct values matter here, so rows tied with the last one of a page
+    can be skipped.
+    """
+    out: List[float] = []
+    after: Optional[str] = None
+    while True:
+        q = supabase.table("equity_snapshots").select("timestamp").eq("account_id", account_id).lte(
+            "timestamp", _iso(t1)
+        )
+        q = q.gte("timestamp", _iso(t0)) if after is None else q.gt("timestamp", after)
+        rows = q.order("timestamp").limit(page).execute().data or []
+        out.extend(_epoch(r["timestamp"]) for r in rows)
+        if len(rows) < page:
+            break
+        after = rows[-1]["timestamp"]
+    return np.sort(np.asarray(out, dtype=np.float64))
+
+def compacted_until(supabase, account_id: str) -> float:
+    """
+    End of the history compact_history.py has rolled up for an account; raw
+    rows before it may have been pruned on purpose, so they are not gaps.
+    """
+    try:
+        res = supabase.table("equity_rollup_checkpoints").select("until").eq("account_id", account_id).eq(
+            "tier", "1m"
+        ).execute()
+    except Exception:  # no rollup tables: history was never compacted
+        return 0.0
+    return _epoch(res.data[0]["until"]) if res.data else 0.0
+
+def build_rows(account_id: str, ts: np.ndarray, bal: np.ndarray, account_size) -> List[Dict[str, Any]]:
+    size = None
+    try:
+        size = float(account_size) if account_size else None
+    except (TypeError, ValueError):
+        pass
+    net = (bal - size) / size * 100.0 if size and size > 0 else None
+    return [
+        {
+            "account_id": account_id,
+            "timestamp": _iso(t),
+            "balance": float(b),
+            "equity": float(b),
+            "margin": None,
+            "free_margin": None,
+            "profit": None,
+            "net_return_pct": float(net[k]) if net is not None else None,
+        }
+        for k, (t, b) in enumerate(zip(ts.tolist(), bal.tolist()))
+    ]
+
+def insert_batches(supabase, rows: List[Dict[str, Any]], batch: int, attempts: int = 3):
+    for i in range(0, len(rows), batch):
+        chunk = rows[i:i + batch]
+        for attempt in range(attempts):
+            try:
+                supabase.table("equity_snapshots").insert(chunk).execute()
+                break
+            except Exception as e:
+                if attempt + 1 == attempts:
+                    raise
+                print(f"[WARN] bulk insert of {len(chunk)} rows failed (attempt {attempt + 1}): {e}")
+                time.sleep(2 ** attempt)
+
+# ---- Main ----
+
+def backfill_account(supabase, account: Dict[str, Any], acct: Dict[str, Any], args, t0: float, t1: float) -> int:
+    ensure_init(account["terminal_path"])
+    login(int(account["login"]), account["password"], account["server"])
+    ai = mt5.account_info()
+    if ai is None:
+        raise RuntimeError(f"account_info() returned None for {account['login']}: {mt5.last_error()}")
+
+    # deals up to now, so the curve can be anchored on the current balance
+    times, amounts = fetch_deals(t0, time.time(), args.chunk_days * 86400, args.server_utc_offset * 3600)
+    opening, after = balance_curve(amounts, float(ai.balance))
+    ts, bal = sample_curve(times, after, opening, max(t0, compacted_until(supabase, acct["id"])), t1, args.interval)
+
+    existing = existing_timestamps(supabase, acct["id"], t0 - args.interval, t1 + args.interval)
+    keep = in_gaps(ts, existing, args.interval)
+    rows = build_rows(acct["id"], ts[keep], bal[keep], acct.get("account_size"))
+    print(
+        f"[OK] {account.get('label')}: {times.size} deals, {ts.size} points, "
+        f"{len(rows)} in gaps ({existing.size} rows already stored)"
+    )
+    if rows and not args.dry_run:
+        insert_batches(supabase, rows, args.batch)
+    return len(rows)
+
+def _parse_date(value: str) -> float:
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--from", dest="from_", help="range start (ISO date/time, UTC); default now - --days")
+    ap.add_argument("--to", help="range end (ISO date/time, UTC); default now")
+    ap.add_argument("--days", type=float, default=30.0)
+    ap.add_argument("--login", type=int, action="append", help="only this MT5 login (repeatable)")
+    ap.add_argument("--interval", type=float, default=900.0, help="grid step in seconds; also the minimum gap filled")
+    ap.add_argument("--chunk-days", type=float, default=30.0, help="history_deals_get window")
+    ap.add_argument("--batch", type=int, default=1000, help="rows per bulk insert")
+    ap.add_argument("--server-utc-offset", type=float,
+                    default=float(os.getenv("MT5_SERVER_UTC_OFFSET_HOURS", "0")), help="hours")
+    ap.add_argument("--accounts", default=ACCOUNTS_JSON)
+    ap.add_argument("--dry-run", action="store_true", help="report what would be inserted")
+    args = ap.parse_args(argv)
+
+    t1 = _parse_date(args.to) if args.to else time.time()
+    t0 = _parse_date(args.from_) if args.from_ else t1 - args.days * 86400
+    if t0 >= t1:
+        ap.error("--from must be before --to")
+
+    from supabase import create_client
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+
+    with open(args.accounts, "r", encoding="utf-8") as f:
+        accounts = json.load(f)
+    if args.login:
+        accounts = [a for a in accounts if int(a["login"]) in set(args.login)]
+    # one terminal at a time, so each terminal is initialized once
+    accounts.sort(key=lambda a: a.get("terminal_path") or "")
+
+    accounts_map = AccountMap(supabase)
+    accounts_map.refresh()
+
+    started = time.monotonic()
+    total = failed = 0
+    for a in accounts:
+        acct = accounts_map.get(str(a["login"]))
+        if not acct:
+            print(f"[WARN] No Supabase account for mt5_login={a['login']}; skipping.")
+            continue
+        try:
+            total += backfill_account(supabase, a, acct, args, t0, t1)
+        except Exception as e:
+            failed += 1
+            print(f"[ERR] {a.get('label')} -> {e}")
+    verb = "would insert" if args.dry_run else "inserted"
+    print(f"[OK] {verb} {total} rows for {len(accounts) - failed}/{len(accounts)} accounts "
+          f"in {time.monotonic() - started:.1f}s")
+    try:
+        mt5.shutdown()
+    except Exception:
+        pass
+
+if __name__ == "__main__":
+    main()
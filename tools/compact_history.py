@@ -0,0 +1,233 @@
+"""
+Roll equity_snapshots up into OHLC tiers and prune old rows.
+
+    cd tools
+    python compact_history.py                      # every account
+    python compact_history.py --raw-days 3 --dry-run
+
+For each account, raw rows roll up into 1-minute bars, those into 15-minute
+bars and those into daily bars (equity open/high/low/close, last balance,
+sample count; see rollups.py). Only closed buckets are written, in chunks;
+after each chunk the tier's checkpoint moves to the end of that chunk, so an
+interrupted run resumes where it stopped (a chunk that was written but not
+checkpointed is simply upserted again). Then rows older than the retention
+of their tier are deleted, but never rows that are not rolled up yet.
+
+Rows arriving more than --settle seconds late (e.g. replayed from the
+push_snapshots spool after a long outage) can land behind a checkpoint and
+are then only kept as raw rows.
+
+Raw rows are read in (timestamp, id) order, so equity_snapshots needs its
+usual `id` primary key.
+
+Expected tables (Postgres):
+
+    create table equity_rollups (
+        account_id uuid not null,
+        tier       text not null,           -- '1m' | '15m' | '1d'
+        bucket     timestamptz not null,    -- bucket start, UTC
+        open double precision, high double precision,
+        low double precision, close double precision,
+        balance    double precision,        -- last balance in the bucket
+        samples    integer not null,
+        primary key (account_id, tier, bucket)
+    );
+    create table equity_rollup_checkpoints (
+        account_id uuid not null,
+        tier       text not null,
+        until      timestamptz not null,    -- tier is complete before this
+        primary key (account_id, tier)
+    );
+
+The API reads the tiers when started with HISTORY_ROLLUPS=1.
+"""
+import os, time, argparse
+from typing import Dict, Any, Optional, List, Tuple
+import dotenv
+
+from rollups import TIERS, TIER_SECONDS, Bars, _epoch, _iso
+
+dotenv.load_dotenv()
+
+ROLLUPS = "equity_rollups"
+CHECKPOINTS = "equity_rollup_checkpoints"
+PAGE = 1000
+BARS_PER_CHUNK = 10_000  # source bars read per chunk when rolling a tier up
+
+def _after(keys: Tuple[str, ...], row: Dict[str, Any]) -> str:
+    """PostgREST or=() body matching the rows after `row` in `keys` order."""
+    terms = []
+    for i, key in enumerate(keys):
+        conds = [f'{k}.eq."{row[k]}"' for k in keys[:i]] + [f'{key}.gt."{row[key]}"']
+        terms.append(conds[0] if len(conds) == 1 else f"and({','.join(conds)})")
+    return ",".join(terms)
+
+def _select_all(query_fn, keys: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """
+    Every row of query_fn() in `keys` order, which must be unique. Paged by
+    keyset: OFFSET pages over a non-unique order can skip or repeat rows.
+    """
+    out: List[Dict[str, Any]] = []
+    last: Optional[Dict[str, Any]] = None
+    while True:
+        q = query_fn()
+        if last is not None:
+            q = q.or_(_after(keys, last))
+        for key in keys:
+            q = q.order(key)
+        rows = q.limit(PAGE).execute().data or []
+        out.extend(rows)
+        if len(rows) < PAGE:
+            return out
+        last = rows[-1]
+
+class Compactor:
+    def __init__(self, supabase, args):
+        self.sb = supabase
+        self.args = args
+
+    # ---- reads / writes ----
+
+    def checkpoints(self, account_id: str) -> Dict[str, float]:
+        res = self.sb.table(CHECKPOINTS).select("tier,until").eq("account_id", account_id).execute()
+        return {r["tier"]: _epoch(r["until"]) for r in (res.data or [])}
+
+    def save_checkpoint(self, account_id: str, tier: str, until: float):
+        if self.args.dry_run:
+            return
+        self.sb.table(CHECKPOINTS).upsert(
+            {"account_id": account_id, "tier": tier, "until": _iso(until)}, on_conflict="account_id,tier"
+        ).execute()
+
+    def first_raw(self, account_id: str) -> Optional[float]:
+        res = self.sb.table("equity_snapshots").select("timestamp").eq("account_id", account_id).order(
+            "timestamp"
+        ).limit(1).execute()
+        return _epoch(res.data[0]["timestamp"]) if res.data else None
+
+    def first_bar(self, account_id: str, tier: str) -> Optional[float]:
+        res = self.sb.table(ROLLUPS).select("bucket").eq("account_id", account_id).eq("tier", tier).order(
+            "bucket"
+        ).limit(1).execute()
+        return _epoch(res.data[0]["bucket"]) if res.data else None
+
+    def raw_bars(self, account_id: str, t0: float, t1: float) -> Bars:
+        return Bars.from_raw(_select_all(
+            lambda: self.sb.table("equity_snapshots").select("id,timestamp,equity,balance").eq(
+                "account_id", account_id
+            ).gte("timestamp", _iso(t0)).lt("timestamp", _iso(t1)),
+            ("timestamp", "id"),
+        ))
+
+    def tier_bars(self, account_id: str, tier: str, t0: float, t1: float) -> Bars:
+        return Bars.from_rows(_select_all(
+            lambda: self.sb.table(ROLLUPS).select("bucket,open,high,low,close,balance,samples").eq(
+                "account_id", account_id
+            ).eq("tier", tier).gte("bucket", _iso(t0)).lt("bucket", _iso(t1)),
+            ("bucket",),
+        ))
+
+    def write_bars(self, account_id: str, tier: str, bars: Bars):
+        if self.args.dry_run or not len(bars):
+            return
+        rows = bars.rows(account_id, tier)
+        for i in range(0, len(rows), PAGE):
+            self.sb.table(ROLLUPS).upsert(rows[i:i + PAGE], on_conflict="account_id,tier,bucket").execute()
+
+    # ---- compaction ----
+
+    def roll(self, account_id: str, tier: str, source: Optional[str], start: float, horizon: float, chunk: float) -> int:
+        """Write `tier` bars for [start, horizon) from `source` (None = raw rows), checkpointing per chunk."""
+        seconds = TIER_SECONDS[tier]
+        written = 0
+        while start < horizon:
+            end = min(horizon, start + chunk)
+            if source is None:
+                bars = self.raw_bars(account_id, start, end)
+            else:
+                bars = self.tier_bars(account_id, source, start, end)
+            out = bars.rollup(seconds)
+            self.write_bars(account_id, tier, out)
+            self.save_checkpoint(account_id, tier, end)
+            written += len(out)
+            start = end
+        return written
+
+    def prune(self, account_id: str, table: str, column: str, before: float, tier: Optional[str] = None) -> bool:
+        if before <= 0:
+            return False
+        if self.args.dry_run:
+            return True
+        q = self.sb.table(table).delete().eq("account_id", account_id)
+        if tier is not None:
+            q = q.eq("tier", tier)
+        q.lt(column, _iso(before)).execute()
+        return True
+
+    def compact_account(self, account_id: str, now: float) -> Dict[str, int]:
+        a = self.args
+        cps = self.checkpoints(account_id)
+        written: Dict[str, int] = {}
+        source: Optional[str] = None
+        ready = now - a.settle  # source data is complete before this
+        for tier, seconds in TIERS:
+            horizon = (ready // seconds) * seconds
+            start = cps.get(tier)
+            if start is None:
+                first = self.first_raw(account_id) if source is None else self.first_bar(account_id, source)
+                if first is None:
+                    break
+                start = (first // seconds) * seconds
+            if source is None:
+                chunk = max(seconds, (a.chunk_hours * 3600 // seconds) * seconds)
+            else:
+                chunk = max(seconds, (TIER_SECONDS[source] * BARS_PER_CHUNK // seconds) * seconds)
+            written[tier] = self.roll(account_id, tier, source, start, horizon, chunk)
+            cps[tier] = max(start, horizon)
+            source, ready = tier, cps[tier]
+
+        # retention: never past what the next tier up has already absorbed
+        keep = {None: a.raw_days, "1m": a.keep_1m_days, "15m": a.keep_15m_days}
+        covered = {None: cps.get("1m", 0.0), "1m": cps.get("15m", 0.0), "15m": cps.get("1d", 0.0)}
+        for tier, days in keep.items():
+            if days <= 0:
+                continue
+            before = min(now - days * 86400, covered[tier])
+            if tier is None:
+                self.prune(account_id, "equity_snapshots", "timestamp", before)
+            else:
+                self.prune(account_id, ROLLUPS, "bucket", before, tier)
+        return written
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--raw-days", type=float, default=float(os.getenv("RETAIN_RAW_DAYS", "7")),
+                    help="keep raw equity_snapshots this long (0 = forever)")
+    ap.add_argument("--keep-1m-days", type=float, default=float(os.getenv("RETAIN_1M_DAYS", "30")))
+    ap.add_argument("--keep-15m-days", type=float, default=float(os.getenv("RETAIN_15M_DAYS", "365")))
+    ap.add_argument("--settle", type=float, default=300.0, help="seconds to wait for late raw rows")
+    ap.add_argument("--chunk-hours", type=float, default=6.0, help="raw rows read per chunk")
+    ap.add_argument("--account", action="append", help="only this account id (repeatable)")
+    ap.add_argument("--dry-run", action="store_true", help="compute, but write and delete nothing")
+    args = ap.parse_args(argv)
+
+    from supabase import create_client
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+
+    ids = args.account or [str(r["id"]) for r in (supabase.table("accounts").select("id").execute().data or [])]
+    c = Compactor(supabase, args)
+    started = time.monotonic()
+    now = time.time()
+    failed = 0
+    for account_id in ids:
+        try:
+            written = c.compact_account(account_id, now)
+            print(f"[OK] {account_id}: " + ", ".join(f"{t} +{n}" for t, n in written.items()) if written
+                  else f"[OK] {account_id}: no history")
+        except Exception as e:
+            failed += 1
+            print(f"[ERR] {account_id} -> {e}")
+    print(f"[OK] compacted {len(ids) - failed}/{len(ids)} accounts in {time.monotonic() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Tuple
+
+# Change-driven persistence for equity_snapshots. A row is written only when a
+# tracked field moved past the deadband since the *last written* row, or when
+# the account has been silent for `max_silence` seconds (heartbeat).
+#
+# Reading the kept rows as a step function (each value holds until the next
+# row) reproduces the sampled series exactly with the default zero deadband
+# (only exact duplicates are dropped), and to within the deadband otherwise.
+# The heartbeat bounds how old the newest row of a live account can be.
+
+
+@dataclass
+class DeadbandConfig:
+    abs_threshold: float = 0.0      # absolute move, in account currency
+    pct_threshold: float = 0.0      # relative move, in percent of the last written value
+    max_silence: float = 60.0       # seconds; force a write at least this often
+    fields: Tuple[str, ...] = ("equity", "balance", "margin")
+
+
+class DeadbandFilter:
+    """Keeps the last written values per account and decides what to persist."""
+
+    def __init__(self, config: DeadbandConfig, *, clock: Callable[[], float] = time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._last: Dict[Any, Tuple[float, Tuple[float, ...]]] = {}
+        self.seen = 0
+        self.written = 0
+
+    def _moved(self, old: float, new: float) -> bool:
+        diff = abs(new - old)
+        abs_thr, pct_thr = self.config.abs_threshold, self.config.pct_threshold
+        if abs_thr <= 0 and pct_thr <= 0:
+            return diff != 0
+        if abs_thr > 0 and diff >= abs_thr:
+            return True
+        if pct_thr > 0:
+            if old == 0:
+                return diff != 0
+            return diff / abs(old) * 100.0 >= pct_thr
+        return False
+
+    def should_write(self, key: Any, row: Dict[str, Any]) -> bool:
+        """True if `row` must be persisted; records it as written if so."""
+        self.seen += 1
+        now = self._clock()
+        values = tuple(float(row.get(f) or 0.0) for f in self.config.fields)
+
+        prev = self._last.get(key)
+        write = (
+            prev is None
+            or now - prev[0] >= self.config.max_silence
+            or any(self._moved(o, n) for o, n in zip(prev[1], values))
+        )
+        if write:
+            self._last[key] = (now, values)
+            self.written += 1
+        return write
+
+    @property
+    def suppressed(self) -> int:
+        return self.seen - self.written
+
+    @property
+    def suppression_ratio(self) -> float:
+        return self.suppressed / self.seen if self.seen else 0.0
@@ -1,7 +1,8 @@
-import os, time, json
-from typing import Dict, Any, Optional
-from datetime import datetime
+import os, sys, time, json
+from typing import Dict, Any, Optional, List
+from datetime import datetime, timezone
 import dotenv
+import numpy as np
 
 dotenv.load_dotenv()
 
@@ -11,39 +12,63 @@ SUPABASE_SERVICE_ROLE_KEY = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
 # Path to your existing accounts.json (contains MT5 logins)
 ACCOUNTS_JSON = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend", "accounts.json"))
 
+# Unsent batches are spooled here while Supabase is unreachable
+SPOOL_PATH = os.getenv(
+    "PUSH_SPOOL_PATH",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), ".spool", "equity_snapshots.jsonl")),
+)
+
 from supabase import create_client
 supabase = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
 import MetaTrader5 as mt5
 
+from snapshot_uploader import AccountMap, BatchUploader, Spool
+from deadband import DeadbandConfig, DeadbandFilter
+
+# Risk analytics shared with the API (backend/src/risk.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend")))
+from src.risk import RiskConfig, RiskTracker
+
+# Optional table for the latest risk metrics per account (upserted on account_id)
+RISK_TABLE = os.getenv("PUSH_RISK_TABLE", "")
+
+_current_terminal: Optional[str] = None
+
 def ensure_init(term_path: str):
+    """(Re)initialize MT5 only when switching to a different terminal."""
+    global _current_terminal
+    if _current_terminal == term_path:
+        return
     try:
         mt5.shutdown()
     except Exception:
         pass
+    _current_terminal = None
     if not mt5.initialize(path=term_path):
         raise RuntimeError(f"MT5 initialize failed: {mt5.last_error()}")
+    _current_terminal = term_path
 
 def login(login: int, password: str, server: str):
     if not mt5.login(login=login, password=password, server=server):
         raise RuntimeError(f"MT5 login failed for {login}: {mt5.last_error()}")
 
-def get_account_row_by_login(mt5_login: str) -> Optional[Dict[str, Any]]:
-    res = supabase.table("accounts").select("id,account_size").eq("mt5_login", mt5_login).limit(1).single().execute()
-    return res.data
+def insert_rows(rows: List[Dict[str, Any]]):
+    supabase.table("equity_snapshots").insert(rows).execute()
+
+def sample_snapshot(account: Dict[str, Any], accounts_map: AccountMap) -> Optional[Dict[str, Any]]:
+    """Read one account from MT5 and build its equity_snapshots row (no network I/O)."""
+    acct = accounts_map.get(str(account["login"]))
+    if not acct:
+        print(f"[WARN] No Supabase account for mt5_login={account['login']}; skipping.")
+        return None
 
-def push_snapshot(account: Dict[str, Any]):
     ensure_init(account["terminal_path"])
     login(int(account["login"]), account["password"], account["server"])
     ai = mt5.account_info()
     if ai is None:
         raise RuntimeError(f"account_info() returned None for {account['login']}: {mt5.last_error()}")
 
-    acct = get_account_row_by_login(str(account["login"]))
-    if not acct:
-        print(f"[WARN] No Supabase account for mt5_login={account['login']}; skipping.")
-        return
-
     balance = float(ai.balance)
     equity = float(ai.equity)
     margin = float(ai.margin)
@@ -60,8 +85,10 @@ def push_snapshot(account: Dict[str, Any]):
         except Exception:
             pass
 
-    payload = {
+    return {
         "account_id": acct["id"],
+        # sampling time, so spooled rows keep their original timestamp on replay
+        "timestamp": datetime.now(timezone.utc).isoformat(),
         "balance": balance,
         "equity": equity,
         "margin": margin,
@@ -69,21 +96,141 @@ def push_snapshot(account: Dict[str, Any]):
         "profit": profit,
         "net_return_pct": net_return_pct,
     }
-    supabase.table("equity_snapshots").insert(payload).execute()
-    print(f"[OK] {account['label']}: eq={equity} net%={net_return_pct} @ {datetime.now().isoformat()}")
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+def _equity_peak(account_id: str) -> Optional[float]:
+    """Highest equity on record: raw rows, plus the rollup highs that outlive pruned raw rows."""
+    peaks: List[float] = []
+    res = supabase.table("equity_snapshots").select("equity").eq("account_id", account_id).filter(
+        "equity", "not.is", "null"
+    ).order("equity", desc=True).limit(1).execute()
+    peaks += [float(r["equity"]) for r in (res.data or [])]
+    if os.getenv("HISTORY_ROLLUPS", "0") == "1":
+        res = supabase.table("equity_rollups").select("high").eq("account_id", account_id).filter(
+            "high", "not.is", "null"
+        ).order("high", desc=True).limit(1).execute()
+        peaks += [float(r["high"]) for r in (res.data or [])]
+    return max(peaks) if peaks else None
+
+def rebuild_risk(tracker: RiskTracker, accounts: List[Dict[str, Any]], accounts_map: AccountMap):
+    """
+    Seed the risk tracker so a restart keeps the high-water mark: from our own
+    last upserts to RISK_TABLE when there is one, otherwise from the highest
+    equity on record plus today's rows (and the last one before the rollover).
+    """
+    accts = {str(acct["id"]): acct for acct in (accounts_map.get(str(a["login"])) for a in accounts) if acct}
+    if RISK_TABLE:
+        for r in supabase.table(RISK_TABLE).select("*").execute().data or []:
+            acct = accts.pop(str(r.get("account_id")), None)
+            if acct is not None:
+                tracker.restore(acct["id"], r, acct.get("account_size"))
+
+    now = time.time()
+    day_start = tracker.day_start(now)
+    page = 1000
+    for acct in accts.values():
+        def query():
+            return supabase.table("equity_snapshots").select("timestamp,equity").eq(
+                "account_id", acct["id"]
+            ).filter("equity", "not.is", "null")
+
+        rows = query().lt("timestamp", _iso(day_start)).order("timestamp", desc=True).limit(1).execute().data or []
+        # keyset pages on (timestamp, equity): OFFSET pages over tied timestamps skip or repeat rows
+        last: Optional[Dict[str, Any]] = None
+        while True:
+            q = query().gte("timestamp", _iso(day_start))
+            if last is not None:
+                q = q.or_(
+                    f'timestamp.gt."{last["timestamp"]}",'
+                    f'and(timestamp.eq."{last["timestamp"]}",equity.gt.{last["equity"]})'
+                )
+            chunk = q.order("timestamp").order("equity").limit(page).execute().data or []
+            rows += chunk
+            if len(chunk) < page:
+                break
+            last = chunk[-1]
+        ts = [datetime.fromisoformat(str(r["timestamp"]).replace("Z", "+00:00")).timestamp() for r in rows]
+        eq = [float(r["equity"]) for r in rows]
+        tracker.rebuild(
+            acct["id"], np.asarray(ts), np.asarray(eq), acct.get("account_size"), peak=_equity_peak(acct["id"])
+        )
+
+def upsert_risk(rows: List[Dict[str, Any]]):
+    supabase.table(RISK_TABLE).upsert(rows, on_conflict="account_id").execute()
 
 def main():
     with open(ACCOUNTS_JSON, "r", encoding="utf-8") as f:
         accounts = json.load(f)
+    # visit accounts terminal by terminal so each terminal is initialized once per cycle
+    accounts.sort(key=lambda a: a.get("terminal_path") or "")
+
+    accounts_map = AccountMap(supabase, refresh_seconds=float(os.getenv("PUSH_ACCOUNT_MAP_REFRESH_SECONDS", "300")))
+    accounts_map.start()
+    uploader = BatchUploader(insert_rows, Spool(SPOOL_PATH))
+    uploader.start()
+    deadband = DeadbandFilter(DeadbandConfig(
+        abs_threshold=float(os.getenv("PUSH_DEADBAND_ABS", "0")),
+        pct_threshold=float(os.getenv("PUSH_DEADBAND_PCT", "0")),
+        max_silence=float(os.getenv("PUSH_MAX_SILENCE_SECONDS", "60")),
+    ))
+
+    risk = RiskTracker(RiskConfig.from_env())
+    try:
+        rebuild_risk(risk, accounts, accounts_map)
+    except Exception as e:
+        print(f"[WARN] risk rebuild from history failed, starting fresh: {e}")
+    risk_uploader: Optional[BatchUploader] = None
+    if RISK_TABLE:
+        risk_uploader = BatchUploader(upsert_risk, Spool(os.path.join(os.path.dirname(SPOOL_PATH), f"{RISK_TABLE}.jsonl")))
+        risk_uploader.start()
+    breached: set = set()
 
     interval = int(os.getenv("PUSH_INTERVAL_SECONDS", "2"))  # every 2 seconds
-    while True:
-        for a in accounts:
-            try:
-                push_snapshot(a)
-            except Exception as e:
-                print(f"[ERR] {a.get('label')} -> {e}")
-        time.sleep(interval)
+    next_tick = time.monotonic()
+    try:
+        while True:
+            rows: List[Dict[str, Any]] = []
+            risk_rows: List[Dict[str, Any]] = []
+            sampled = 0
+            for a in accounts:
+                try:
+                    row = sample_snapshot(a, accounts_map)
+                    if not row:
+                        continue
+                    sampled += 1
+                    acct_id = row["account_id"]
+                    m = risk.update(acct_id, time.time(), row["equity"], (accounts_map.get(str(a["login"])) or {}).get("account_size"))
+                    if m["breached"] and acct_id not in breached:
+                        breached.add(acct_id)
+                        print(f"[WARN] {a.get('label')} breached a loss limit: daily P&L {m['daily_pnl']}, drawdown {m['drawdown_pct']}%")
+                    elif not m["breached"]:
+                        breached.discard(acct_id)
+                    if deadband.should_write(acct_id, row):
+                        rows.append(row)
+                        risk_rows.append({"account_id": acct_id, "updated_at": row["timestamp"], **m})
+                except Exception as e:
+                    print(f"[ERR] {a.get('label')} -> {e}")
+            uploader.submit(rows)
+            if risk_uploader is not None:
+                risk_uploader.submit(risk_rows)
+            print(
+                f"[OK] sampled {sampled}/{len(accounts)}, wrote {len(rows)} "
+                f"(suppressed {deadband.suppression_ratio:.1%} overall) @ {datetime.now().isoformat()}"
+            )
+
+            # fixed cadence: sleep to the next tick, skipping ticks we overran
+            next_tick += interval
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now
+            time.sleep(next_tick - now)
+    finally:
+        accounts_map.stop()
+        uploader.stop()
+        if risk_uploader is not None:
+            risk_uploader.stop()
 
 if __name__ == "__main__":
     main()
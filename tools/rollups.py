@@ -0,0 +1,110 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# OHLC rollups of the equity history, used by compact_history.py. Raw
+# equity_snapshots rows roll up into 1-minute bars, 1-minute bars into
+# 15-minute bars and those into daily bars (UTC), so a coarser tier can be
+# rebuilt from the next finer one after the raw rows are gone. Buckets without
+# rows have no bar: like the raw rows (see deadband.py), the bars read as a
+# step function.
+
+TIERS = (("1m", 60), ("15m", 900), ("1d", 86400))  # finest first
+TIER_SECONDS = dict(TIERS)
+
+
+def _epoch(value: Any) -> float:
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+
+
+def _num(v: Any) -> float:
+    return np.nan if v is None else float(v)
+
+
+def _opt(v: float) -> Optional[float]:
+    return None if np.isnan(v) else float(v)
+
+
+@dataclass
+class Bars:
+    """Parallel arrays, sorted by bucket start (epoch seconds)."""
+
+    bucket: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    balance: np.ndarray     # last balance seen in the bucket (NaN if none)
+    samples: np.ndarray     # raw rows behind the bar
+
+    def __len__(self) -> int:
+        return int(self.bucket.size)
+
+    @classmethod
+    def from_raw(cls, rows: Iterable[Dict[str, Any]]) -> "Bars":
+        """Raw equity_snapshots rows ({timestamp, equity, balance}), oldest first, as one-sample bars."""
+        kept = [r for r in rows if r.get("equity") is not None]
+        ts = np.array([_epoch(r["timestamp"]) for r in kept], dtype=np.float64)
+        eq = np.array([float(r["equity"]) for r in kept], dtype=np.float64)
+        bal = np.array([_num(r.get("balance")) for r in kept], dtype=np.float64)
+        return cls(ts, eq, eq, eq, eq, bal, np.ones(ts.size, dtype=np.int64))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> "Bars":
+        """equity_rollups rows, oldest first."""
+        rows = list(rows)
+
+        def col(name: str) -> np.ndarray:
+            return np.array([_num(r.get(name)) for r in rows], dtype=np.float64)
+
+        return cls(
+            np.array([_epoch(r["bucket"]) for r in rows], dtype=np.float64),
+            col("open"), col("high"), col("low"), col("close"), col("balance"),
+            np.array([int(r.get("samples") or 0) for r in rows], dtype=np.int64),
+        )
+
+    def rollup(self, seconds: float) -> "Bars":
+        """Bars of `seconds` (aligned to the epoch): first open, max high, min low, last close and balance."""
+        if not len(self):
+            return self
+        b = np.floor(self.bucket / seconds) * seconds
+        starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+        ends = np.r_[starts[1:], b.size] - 1
+        # last known balance per bucket: carry the previous value over NaNs first
+        filled = np.where(np.isnan(self.balance), -np.inf, np.arange(b.size))
+        last = np.maximum.accumulate(filled)
+        balance = np.where(last >= 0, self.balance[np.maximum(last, 0).astype(np.int64)], np.nan)
+        return Bars(
+            b[starts],
+            self.open[starts],
+            np.maximum.reduceat(self.high, starts),
+            np.minimum.reduceat(self.low, starts),
+            self.close[ends],
+            balance[ends],
+            np.add.reduceat(self.samples, starts),
+        )
+
+    def rows(self, account_id: str, tier: str) -> List[Dict[str, Any]]:
+        return [
+            {
+                "account_id": account_id,
+                "tier": tier,
+                "bucket": _iso(t),
+                "open": o,
+                "high": h,
+                "low": lo,
+                "close": c,
+                "balance": _opt(bal),
+                "samples": int(n),
+            }
+            for t, o, h, lo, c, bal, n in zip(
+                self.bucket.tolist(), self.open.tolist(), self.high.tolist(), self.low.tolist(),
+                self.close.tolist(), self.balance, self.samples.tolist(),
+            )
+        ]
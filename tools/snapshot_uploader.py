@@ -0,0 +1,244 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Upload side of push_snapshots.py. The MT5 sampling loop only ever calls
+# `BatchUploader.submit(rows)`, which never blocks on the network; a background
+# flusher does the bulk inserts, retries with backoff, and spools batches to an
+# append-only file while Supabase is unreachable.
+
+Row = Dict[str, Any]
+
+
+class AccountMap:
+    """
+    Cached mt5_login -> {"id", "account_size"} map from Supabase 'accounts',
+    refreshed in the background instead of queried per sample.
+    """
+
+    def __init__(self, supabase, refresh_seconds: float = 300.0):
+        self._supabase = supabase
+        self._refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._by_login: Dict[str, Row] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self):
+        res = self._supabase.table("accounts").select("id,mt5_login,account_size").execute()
+        by_login = {str(r["mt5_login"]): r for r in (res.data or []) if r.get("mt5_login") is not None}
+        with self._lock:
+            self._by_login = by_login
+
+    def get(self, mt5_login: str) -> Optional[Row]:
+        with self._lock:
+            return self._by_login.get(str(mt5_login))
+
+    def start(self):
+        self.refresh()
+
+        def loop():
+            while not self._stop.wait(self._refresh_seconds):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"[WARN] account map refresh failed: {e}")
+
+        self._thread = threading.Thread(target=loop, name="account-map", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+class Spool:
+    """
+    Append-only JSONL file of unsent batches (one batch per line). Batches are
+    replayed oldest first; the file is rewritten only when batches are removed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def append(self, rows: List[Row]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rows, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def batches(self) -> List[List[Row]]:
+        if not os.path.exists(self.path):
+            return []
+        out: List[List[Row]] = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    # torn last line from a crash mid-write; drop it
+                    continue
+        return out
+
+    def drop_first(self, n: int):
+        """Remove the first `n` batches (atomically, via a temp file)."""
+        if n <= 0:
+            return
+        rest = self.batches()[n:]
+        if not rest:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for rows in rest:
+                f.write(json.dumps(rows, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self.batches())
+
+
+class BatchUploader:
+    """
+    Background flusher: one bulk insert per submitted batch, retried with
+    exponential backoff + jitter. Batches that cannot be sent go to the spool,
+    and while the spool is non-empty new batches queue up behind it so rows
+    always reach the table in sampling order.
+
+    Only the flusher thread touches the spool. When the queue is full,
+    `submit()` parks batches in an overflow list (and keeps doing so until the
+    flusher has taken it over), and the flusher spools them once everything
+    queued before them is handled.
+    """
+
+    def __init__(
+        self,
+        insert: Callable[[List[Row]], Any],
+        spool: Spool,
+        *,
+        max_attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_queue: int = 1000,
+    ):
+        self._insert = insert
+        self._spool = spool
+        self._max_attempts = max_attempts
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._queue: "queue.Queue[Optional[List[Row]]]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._overflow: List[List[Row]] = []  # submitted while the queue was full, oldest first
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, rows: List[Row]):
+        """Hand a batch to the flusher. Never blocks the caller."""
+        if not rows:
+            return
+        with self._lock:
+            if self._overflow:  # keep order: behind what already overflowed
+                self._overflow.append(rows)
+                return
+            try:
+                self._queue.put_nowait(rows)
+            except queue.Full:
+                self._overflow.append(rows)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="snapshot-uploader", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _sleep_backoff(self, attempt: int):
+        delay = min(self._backoff_max, self._backoff_base * (2 ** attempt))
+        time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def _try_insert(self, rows: List[Row]) -> bool:
+        for attempt in range(self._max_attempts):
+            try:
+                self._insert(rows)
+                return True
+            except Exception as e:
+                print(f"[WARN] bulk insert of {len(rows)} rows failed (attempt {attempt + 1}): {e}")
+                if attempt + 1 < self._max_attempts:
+                    self._sleep_backoff(attempt)
+        return False
+
+    def _spill_overflow(self) -> bool:
+        """
+        Spool the overflow once the queue ahead of it is empty, so it lands
+        behind every batch submitted before it. True if anything was spooled.
+        """
+        with self._lock:
+            if not self._overflow or not self._queue.empty():
+                return False
+            batches, self._overflow = self._overflow, []
+        for rows in batches:
+            self._spool.append(rows)
+        return True
+
+    def _drain_spool(self) -> bool:
+        """Replay spooled batches in order. True when the spool is empty."""
+        batches = self._spool.batches()
+        sent = 0
+        for rows in batches:
+            try:
+                self._insert(rows)
+            except Exception as e:
+                print(f"[WARN] spool replay paused ({len(batches) - sent} batches pending): {e}")
+                break
+            sent += 1
+        self._spool.drop_first(sent)
+        if sent:
+            print(f"[OK] replayed {sent} spooled batches")
+        return sent == len(batches)
+
+    def _run(self):
+        spooled = bool(self._spool.batches())
+        delay, retry_at = 0.0, 0.0
+        while True:
+            if self._spill_overflow() and not spooled:
+                # the queue backed up, not necessarily an outage: replay right away
+                spooled, delay, retry_at = True, 0.0, 0.0
+            timeout = max(0.0, retry_at - time.monotonic()) if spooled else None
+            try:
+                rows = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                rows = []
+            if rows is None:
+                self._spill_overflow()  # replayed on the next start
+                return
+
+            if spooled:
+                # keep order: new batches go behind whatever is already spooled
+                if rows:
+                    self._spool.append(rows)
+                if time.monotonic() < retry_at:
+                    continue
+                if self._drain_spool():
+                    spooled, delay = False, 0.0
+                else:
+                    delay = min(self._backoff_max, max(self._backoff_base, delay * 2))
+                    retry_at = time.monotonic() + delay * random.uniform(0.5, 1.0)
+                continue
+
+            if rows and not self._try_insert(rows):
+                self._spool.append(rows)
+                spooled, delay = True, self._backoff_base
+                retry_at = time.monotonic() + delay